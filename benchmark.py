@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the algo trading system hot paths
+Runs offline on synthetic OHLCV data
+"""
+
+import os
+import sys
+import time
+sys.path.append('src')
+
+import numpy as np
+import pandas as pd
+
+def make_ohlcv(n=1000, seed=0, freq='B'):
+    """Build a synthetic random-walk OHLCV frame indexed by Date"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2015-01-01', periods=n, freq=freq, name='Date')
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    open_ = close * (1 + rng.normal(0, 0.004, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, n)))
+    volume = rng.integers(100_000, 1_000_000, n).astype(float)
+    return pd.DataFrame({
+        'Open': open_, 'High': high, 'Low': low, 'Close': close,
+        'Adj Close': close, 'Volume': volume
+    }, index=index)
+
+def timeit(func, repeat=5):
+    """Return the best wall time of func over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_backtest_fill_model():
+    """Compare backtest throughput with and without the cost/fill model"""
+    print("\n📈 Backtest fill model...")
+
+    from indicators import add_indicators
+    from strategy import generate_signals
+    from backtest import backtest_signals
+
+    signals_df = generate_signals(add_indicators(make_ohlcv(5000)))
+    bars = len(signals_df)
+
+    runs = [
+        ("cost-free", {}),
+        ("costs+slippage", {'cost_bps': 12, 'slippage_bps': 5}),
+        ("intrabar+next_open", {'cost_bps': 12, 'slippage_bps': 5, 'intrabar': True, 'fill_at': 'next_open'}),
+    ]
+    for name, kwargs in runs:
+        elapsed = timeit(lambda: backtest_signals(signals_df, **kwargs))
+        print(f"   {name:<20} {elapsed * 1000:8.2f} ms  {bars / elapsed:,.0f} bars/sec")
+
+    return True
+
+def bench_robustness():
+    """Time 10k-simulation Monte Carlo runs for a 6-month and a 20-year ticker"""
+    print("\n🎲 Monte Carlo robustness...")
+
+    from indicators import add_indicators
+    from strategy import generate_signals
+    from backtest import backtest_signals
+    from robustness import monte_carlo
+
+    for bars in (126, 5000):
+        signals_df = generate_signals(add_indicators(make_ohlcv(bars)))
+        bt_results = backtest_signals(signals_df)
+        elapsed = timeit(lambda: monte_carlo(bt_results, signals_df['Close'], n_sims=10000, seed=0), repeat=3)
+        print(f"   {bars:>5} bars, {bt_results['total']:>3} trades, 10k sims  {elapsed * 1000:8.2f} ms")
+
+    return True
+
+def bench_logging():
+    """Compare per-signal logging cost of a synchronous FileHandler with the queued handlers"""
+    print("\n📝 Logging overhead per signal...")
+
+    import logging
+    import os
+    import tempfile
+    from utils import setup_logging, shutdown_logging
+
+    n = 20000
+    extra = {'ticker': 'TCS.NS', 'stage': 'signal', 'signal': 'BUY'}
+    logger = logging.getLogger("bench")
+
+    def log_signals():
+        for i in range(n):
+            logger.info(f"Found BUY for TCS.NS on 2025-08-12 @ {3765.5 + i:.2f} (RSI=28.40)", extra=extra)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutdown_logging()
+        root = logging.getLogger()
+        sync_handler = logging.FileHandler(os.path.join(tmp, 'sync.log'), encoding='utf-8')
+        sync_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s: %(message)s"))
+        root.handlers = [sync_handler]
+        root.setLevel(logging.INFO)
+        start = time.perf_counter()
+        log_signals()
+        elapsed = time.perf_counter() - start
+        sync_handler.close()
+        print(f"   {'sync FileHandler':<20} {elapsed / n * 1e6:8.2f} µs/signal")
+
+        for fmt in ('text', 'json'):
+            setup_logging(log_file=os.path.join(tmp, f'queued_{fmt}.log'), fmt=fmt, console=False, force=True)
+            start = time.perf_counter()
+            log_signals()
+            elapsed = time.perf_counter() - start
+            shutdown_logging()
+            drained = time.perf_counter() - start
+            print(f"   {'queued ' + fmt:<20} {elapsed / n * 1e6:8.2f} µs/signal caller side, {drained / n * 1e6:8.2f} µs/signal incl. drain")
+
+    return True
+
+def bench_strategy_engine():
+    """Compare generate_signals with compiled strategies evaluated side by side"""
+    print("\n🧮 Strategy engine...")
+
+    from indicators import add_indicators
+    from strategy import generate_signals, RULE_STRATEGY
+    from strategy_engine import Strategy, col, crossed_above, crossed_below, compile_strategies
+
+    df = add_indicators(make_ohlcv(5000))
+    variants = [
+        Strategy(f"rsi_{low}_{high}",
+                 buy=(col('RSI') < low) | crossed_above(col('SMA20'), col('SMA50')),
+                 sell=(col('RSI') > high) | crossed_below(col('SMA20'), col('SMA50')))
+        for low in range(25, 35, 2) for high in range(60, 72, 2)
+    ]
+
+    single = compile_strategies(RULE_STRATEGY)
+    fused = compile_strategies([RULE_STRATEGY] + variants)
+    runs = [
+        ("generate_signals", lambda: generate_signals(df)),
+        ("engine, 1 strategy", lambda: single.evaluate(df)),
+        (f"engine, {len(fused.strategies)} strategies", lambda: fused.evaluate(df)),
+    ]
+    for name, func in runs:
+        print(f"   {name:<24} {timeit(func) * 1000:8.2f} ms")
+
+    return True
+
+def bench_screener():
+    """Time panel build and cross-sectional screens for a 500-ticker universe"""
+    print("\n🔎 Cross-sectional screens (500 tickers)...")
+
+    from indicators import add_indicators
+    from screener import IndicatorPanel, run_screens
+
+    frames = {f"T{i}.NS": add_indicators(make_ohlcv(126, seed=i)) for i in range(500)}
+    benchmark_close = make_ohlcv(126, seed=10_000)['Close']
+
+    build = timeit(lambda: IndicatorPanel(frames), repeat=3)
+    panel = IndicatorPanel(frames)
+    cold = timeit(lambda: run_screens(panel, benchmark_close), repeat=1)
+    warm = timeit(lambda: run_screens(panel, benchmark_close))
+    print(f"   {'panel build':<24} {build * 1000:8.2f} ms")
+    print(f"   {'screens (first run)':<24} {cold * 1000:8.2f} ms")
+    print(f"   {'screens (cached latest)':<24} {warm * 1000:8.2f} ms")
+
+    return True
+
+def bench_risk():
+    """Compare incremental covariance updates with recomputing from full history"""
+    print("\n🛡️ Risk engine covariance (500 tickers)...")
+
+    from risk import RollingCovariance
+
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i}.NS" for i in range(500)]
+    closes = pd.DataFrame(1000 * np.exp(np.cumsum(rng.normal(0, 0.01, (1000, 500)), axis=0)),
+                          index=pd.bdate_range('2020-01-01', periods=1000), columns=tickers)
+
+    covariance = RollingCovariance(tickers, window=60).update_from_closes(closes.iloc[:-1])
+    new_bar = closes.iloc[-1:]
+    start = time.perf_counter()
+    covariance.update_from_closes(new_bar)
+    covariance.correlation()
+    incremental = time.perf_counter() - start
+    full = timeit(lambda: closes.pct_change().iloc[-60:].corr(), repeat=3)
+    print(f"   {'incremental new bar':<24} {incremental * 1000:8.2f} ms")
+    print(f"   {'full recompute':<24} {full * 1000:8.2f} ms")
+
+    return True
+
+def bench_data_quality():
+    """Time the batch OHLCV repair and the per-bar streaming check"""
+    print("\n🧹 Data quality (1000 bars)...")
+
+    from data_quality import repair_ohlcv, StreamingValidator
+    from market_calendar import trading_days
+
+    df = make_ohlcv(1000)
+    df.index = trading_days('2022-01-01', '2026-12-31')[-1000:]
+    df.iloc[500, df.columns.get_loc('Close')] *= 3
+    df = pd.concat([df, df.iloc[[100]]])
+    batch = timeit(lambda: repair_ohlcv(df, align_calendar=True))
+    clean, report = repair_ohlcv(df)
+    print(f"   {'batch repair':<24} {batch * 1000:8.2f} ms  (bad ticks={report['bad_ticks']}, duplicates={report['duplicates']})")
+
+    validator = StreamingValidator()
+    validator.seed('X', clean.iloc[:500])
+    rows = list(zip(clean.index[500:], clean.iloc[500:].to_dict('records')))
+    start = time.perf_counter()
+    for date, bar in rows:
+        validator.check('X', date, bar)
+    per_bar = (time.perf_counter() - start) / len(rows)
+    print(f"   {'streaming check':<24} {per_bar * 1e6:8.2f} us/bar")
+
+    return True
+
+def bench_feature_store():
+    """Compare a one-bar feature store update with recomputing features from scratch"""
+    print("\n🗄️ Feature store (1000 bars, one new bar)...")
+
+    import tempfile
+    from indicators import add_indicators
+    from feature_store import FeatureStore
+    from ml_model import prepare_features
+
+    df = add_indicators(make_ohlcv(1001))
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore(root)
+        store.update('X', df.iloc[:-1])
+        start = time.perf_counter()
+        store.update('X', df)
+        incremental = time.perf_counter() - start
+        full = timeit(lambda: FeatureStore(root).compute(df))
+        served = timeit(lambda: store.training_matrix('X'))
+        print(f"   {'incremental update':<24} {incremental * 1000:8.2f} ms  ({len(store.columns)} features)")
+        print(f"   {'full recompute':<24} {full * 1000:8.2f} ms")
+        print(f"   {'serve training matrix':<24} {served * 1000:8.2f} ms")
+    legacy = timeit(lambda: prepare_features(df))
+    print(f"   {'prepare_features (5)':<24} {legacy * 1000:8.2f} ms")
+
+    return True
+
+def bench_tuning():
+    """Compare successive halving with scoring every candidate on every fold"""
+    print("\n🎛️ Hyperparameter search (2 tickers, 500 bars)...")
+
+    import tempfile
+    from indicators import add_indicators
+    from feature_store import FeatureStore
+    from tuning import tune, candidate_configs, SEARCH_SPACE
+
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore(root)
+        datasets = {}
+        for seed in range(2):
+            store.update(f'T{seed}', add_indicators(make_ohlcv(500, seed=seed)))
+            datasets[f'T{seed}'] = store.training_matrix(f'T{seed}')[1:]
+        configs = candidate_configs({family: SEARCH_SPACE[family] for family in ('tree', 'boosting')})
+        for label, eta in (('successive halving', 3), ('full grid', None)):
+            start = time.perf_counter()
+            best = tune(datasets, configs, eta=eta, n_jobs=1)
+            elapsed = time.perf_counter() - start
+            picks = ", ".join(f"{t}={c['family']}" for t, c in best.items())
+            print(f"   {label:<24} {elapsed:8.2f} s  ({len(configs)} candidates; {picks})")
+
+    return True
+
+def bench_reporting():
+    """Compare one multi-sheet Excel write with one write per sheet"""
+    print("\n📑 Reporting (Excel, 6 tables)...")
+
+    import tempfile
+    from backtest import backtest_signals
+    from excel_integration import ExcelManager
+    from indicators import add_indicators
+    from reporting import Report, ExcelSink, render_report
+    from strategy import generate_signals
+
+    report = Report()
+    for seed in range(5):
+        signals = generate_signals(add_indicators(make_ohlcv(250, seed=seed)))
+        report.add_backtest(f'T{seed}', backtest_signals(signals), signals['Close'])
+    report.set_summary({'Total Trades': 0})
+    report.set_screens([])
+    report.set_quality(['Ticker'], [])
+
+    with tempfile.TemporaryDirectory() as root:
+        manager = ExcelManager(os.path.join(root, 'report.xlsx'))
+        frames = {name: pd.DataFrame(rows[1:], columns=rows[0]) for name, rows in report.tables().items()}
+        per_sheet = timeit(lambda: [manager.write_sheet(name, frame) for name, frame in frames.items()], repeat=3)
+        start = time.perf_counter()
+        render_report(report, [ExcelSink(manager)])
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        render_report(report, [ExcelSink(manager)])
+        unchanged = time.perf_counter() - start
+    print(f"   {'one write per sheet':<24} {per_sheet * 1000:8.2f} ms")
+    print(f"   {'single-pass render':<24} {single * 1000:8.2f} ms")
+    print(f"   {'re-render, unchanged':<24} {unchanged * 1000:8.2f} ms")
+
+    return True
+
+def bench_tick_aggregator():
+    """Ticks per second into 1m bars for 200 symbols, batched and one tick at a time"""
+    print("\n⏱️ Tick aggregator (200 symbols)...")
+
+    from tick_aggregator import TickAggregator, BarPipeline
+
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    start = pd.Timestamp('2024-01-01 09:15').value
+    timestamps = start + np.sort(rng.integers(0, 6 * 3600 * 10**9, n))
+    timestamps -= (rng.random(n) < 0.05) * rng.integers(0, 1_500_000_000, n)
+    symbols = np.array([f"S{i}.NS" for i in range(200)], dtype=object)[rng.integers(0, 200, n)]
+    prices = 1000 * np.exp(np.cumsum(rng.normal(0, 0.0002, n)))
+    sizes = rng.integers(1, 500, n).astype(float)
+
+    def batched(batch=8192):
+        aggregator = TickAggregator('1m')
+        for i in range(0, n, batch):
+            aggregator.add_ticks(symbols[i:i + batch], timestamps[i:i + batch], prices[i:i + batch], sizes[i:i + batch])
+        aggregator.close_all()
+        return aggregator
+
+    def single():
+        aggregator = TickAggregator('1m')
+        add = aggregator.add_tick
+        for args in zip(symbols.tolist(), timestamps.tolist(), prices.tolist(), sizes.tolist()):
+            add(*args)
+        aggregator.close_all()
+
+    for name, func, repeat in [("add_ticks (8192)", batched, 3), ("add_tick", single, 1)]:
+        elapsed = timeit(func, repeat=repeat)
+        print(f"   {name:<24} {elapsed * 1000:8.2f} ms  {n / elapsed:,.0f} ticks/sec")
+
+    # Signal pipeline cost per completed minute: one new bar for each of the 200 symbols
+    aggregator = batched()
+    pipeline = BarPipeline(aggregator)
+    last_minute = pd.concat([aggregator.history(s, 1).reset_index().assign(Symbol=s) for s in aggregator.names])
+    elapsed = timeit(lambda: pipeline.process(last_minute), repeat=3)
+    print(f"   {'signals, 200 new bars':<24} {elapsed * 1000:8.2f} ms")
+
+    return True
+
+def bench_subscriptions():
+    """Route 200 signals to 500 subscribers: linear scan vs index, sequential vs concurrent sends"""
+    print("\n📨 Subscription router (500 subscribers)...")
+
+    from subscriptions import Subscriber, SubscriptionRouter
+
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i}.NS" for i in range(300)]
+    subscribers = []
+    for i in range(500):
+        watchlist = list(rng.choice(tickers, size=int(rng.integers(5, 30)), replace=False)) if i % 10 else None
+        kinds = [['BUY'], ['SELL'], None][i % 3]
+        filters = {'RSI': [None, 40]} if i % 7 == 0 else None
+        subscribers.append(Subscriber(f"desk{i}", 1000 + i % 250, watchlist, kinds, filters))
+    row = {'Close': 100.0, 'RSI': 35.0, 'SMA20': 99.0, 'SMA50': 98.0}
+    signals = [{'ticker': tickers[int(rng.integers(0, 300))], 'signal': ['BUY', 'SELL'][i % 2],
+                'date': pd.Timestamp('2024-01-02'), 'row': row} for i in range(200)]
+
+    def slow_send(text, chat_id=None, session=None):
+        time.sleep(0.01)
+        return True
+
+    router = SubscriptionRouter(subscribers, send=slow_send, max_workers=32)
+    scan = timeit(lambda: [[s for s in subscribers if s.matches(sig)] for sig in signals])
+    indexed = timeit(lambda: router.route(signals))
+    destinations = len(router.route(signals))
+    sequential = SubscriptionRouter(subscribers, send=slow_send, max_workers=1)
+    one_worker = timeit(lambda: sequential.dispatch(signals), repeat=1)
+    pooled = timeit(lambda: router.dispatch(signals), repeat=1)
+    print(f"   {'match, linear scan':<24} {scan * 1000:8.2f} ms")
+    print(f"   {'match, indexed':<24} {indexed * 1000:8.2f} ms")
+    print(f"   {f'send {destinations} chats, 1 worker':<24} {one_worker * 1000:8.2f} ms  (10 ms per send)")
+    print(f"   {'send, 32 workers':<24} {pooled * 1000:8.2f} ms")
+
+    return True
+
+def bench_resumable_backtest():
+    """Daily scans over a growing history: full re-run vs resuming from saved state"""
+    print("\n⏯️ Resumable backtest (250 daily scans)...")
+
+    from backtest import backtest_signals, resume_backtest
+    from indicators import add_indicators
+    from strategy import generate_signals
+
+    signals_df = generate_signals(add_indicators(make_ohlcv(2500)))
+    ends = range(len(signals_df) - 250, len(signals_df))
+
+    def full():
+        for end in ends:
+            backtest_signals(signals_df.iloc[:end])
+
+    def resumed():
+        state = None
+        for end in ends:
+            _, state = resume_backtest(signals_df.iloc[:end], state)
+
+    for name, func in [("full re-run", full), ("resumed", resumed)]:
+        elapsed = timeit(func, repeat=3)
+        print(f"   {name:<24} {elapsed * 1000:8.2f} ms  {elapsed / len(ends) * 1e6:8.1f} us/scan")
+
+    return True
+
+def check_golden_outputs():
+    """Check indicators, signals and backtests against the golden references before timing them"""
+    print("\n🥇 Golden outputs...")
+
+    from golden import check, FIXTURES
+
+    failures = check()
+    for failure in failures:
+        print(f"   ❌ {failure}")
+    if failures:
+        print(f"   ⚠️ {len(failures)} mismatches: timings below are for code that changed results")
+        return False
+    print(f"   ✅ {len(FIXTURES)} fixtures match")
+    return True
+
+def bench_instrument_store():
+    """Indicators and signals for 500 instruments: one DataFrame each vs one SeriesStore pass"""
+    print("\n🧾 Instrument store (500 instruments x 250 bars)...")
+
+    from indicators import add_indicators
+    from strategy import generate_signals, RULE_STRATEGY
+    from instruments import SeriesStore
+
+    frames = {i: make_ohlcv(250, seed=i) for i in range(500)}
+    per_frame = timeit(lambda: [generate_signals(add_indicators(df)) for df in frames.values()], repeat=1)
+
+    def store_pass():
+        store = SeriesStore.from_frames(frames)
+        store.add_indicators()
+        return store.signals(RULE_STRATEGY)
+
+    in_store = timeit(store_pass, repeat=3)
+    store = SeriesStore.from_frames(frames)
+    print(f"   {'per-instrument frames':<24} {per_frame * 1000:8.1f} ms")
+    print(f"   {'series store':<24} {in_store * 1000:8.1f} ms  ({per_frame / in_store:.0f}x, {store.nbytes / 1e6:.1f} MB)")
+
+    return True
+
+def bench_streaming_backtest():
+    """Backtest 500k minute bars in memory vs streamed in 50k-bar chunks: time and peak memory"""
+    print("\n🌊 Streaming backtest (500k minute bars)...")
+
+    import tracemalloc
+    from indicators import add_indicators
+    from strategy import generate_signals
+    from backtest import backtest_signals, backtest_stream
+
+    total, size = 500_000, 50_000
+    params = {'hold_in_bars': True, 'max_hold_days': 60}
+
+    def chunks():
+        # Each chunk is generated on demand, as a file reader would deliver it
+        rng = np.random.default_rng(0)
+        level = 1000.0
+        for start in range(0, total, size):
+            close = level * np.exp(np.cumsum(rng.normal(0, 0.001, size)))
+            level = close[-1]
+            index = pd.date_range(pd.Timestamp('2005-01-03 09:15') + pd.Timedelta(minutes=start), periods=size,
+                                  freq='min', name='Date')
+            yield pd.DataFrame({'Open': close, 'High': close * 1.0005, 'Low': close * 0.9995, 'Close': close,
+                                'Volume': rng.integers(100, 10_000, size).astype(float)}, index=index)
+
+    def measure(func):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed, peak
+
+    full, full_time, full_peak = measure(
+        lambda: backtest_signals(generate_signals(add_indicators(pd.concat(list(chunks())))), **params))
+    streamed, stream_time, stream_peak = measure(lambda: backtest_stream(chunks(), **params))
+    same = streamed['trades'] == full['trades']
+    print(f"   {'in memory':<24} {full_time:8.2f} s  peak {full_peak / 1e6:7.1f} MB")
+    print(f"   {'50k-bar chunks':<24} {stream_time:8.2f} s  peak {stream_peak / 1e6:7.1f} MB  "
+          f"({full['total']} trades, {'identical' if same else 'DIFFERENT'})")
+
+    return same
+
+def bench_rolling_mean():
+    """Compare the fixed-order rolling_mean with pandas' running-sum rolling mean"""
+    print("\n📏 Rolling mean (fixed-order sum vs pandas)...")
+
+    from indicators import rolling_mean
+
+    # 6 months and 2 years of daily bars, 20 years daily, a year of minute bars
+    for n in (126, 500, 5000, 100_000):
+        values = pd.Series(np.random.default_rng(n).normal(size=n))
+        for window in (14, 50):
+            fixed = timeit(lambda: rolling_mean(values.to_numpy(), window))
+            running = timeit(lambda: values.rolling(window).mean())
+            print(f"   {n:>7} bars, window {window:<3} rolling_mean {fixed * 1000:7.3f} ms   pandas {running * 1000:7.3f} ms")
+
+    return True
+
+def _pickled_round_trip(frames):
+    return frames
+
+def _pickled_signals(frames):
+    from instruments import SeriesStore
+    from strategy import RULE_STRATEGY
+    store = SeriesStore.from_frames(frames).add_indicators()
+    signal = store.signals(RULE_STRATEGY)[RULE_STRATEGY.name]
+    results = {}
+    for instrument_id in frames:
+        frame = store.frame(instrument_id)
+        frame['signal'] = signal[store.rows(instrument_id)]
+        results[instrument_id] = frame
+    return results
+
+def _attach_only(manifest, lo, hi):
+    from shared_data import Attached, attach_store
+    with Attached() as attached:
+        return len(attach_store(manifest, attached, slice(lo, hi)))
+
+def bench_shared_memory():
+    """Dispatch 500 tickers x 1000 bars to 2 worker processes: pickled frames vs shared memory"""
+    print("\n🧠 Shared-memory data plane (500 tickers x 1000 bars, 2 workers)...")
+
+    from concurrent.futures import ProcessPoolExecutor
+    from instruments import SeriesStore
+    from shared_data import SegmentRegistry, publish_store, partition, shared_signals
+
+    frames = {i: make_ohlcv(1000, seed=i) for i in range(500)}
+    store = SeriesStore.from_frames(frames)
+    len(store)
+    batches = [dict(list(frames.items())[i:i + 63]) for i in range(0, 500, 63)]
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        list(pool.map(_pickled_round_trip, [{}] * 4))
+
+        def shared_dispatch():
+            with SegmentRegistry() as registry:
+                manifest = publish_store(store, registry)
+                ranges = partition(manifest['bounds'], 8)
+                return sum(pool.map(_attach_only, [manifest] * len(ranges), *zip(*ranges)))
+
+        pickled = timeit(lambda: list(pool.map(_pickled_round_trip, batches)), repeat=3)
+        shared = timeit(shared_dispatch, repeat=3)
+        pickled_work = timeit(lambda: list(pool.map(_pickled_signals, batches)), repeat=1)
+        shared_work = timeit(lambda: shared_signals(store, workers=2, pool=pool), repeat=1)
+
+    print(f"   {'dispatch, pickled':<24} {pickled * 1000:8.1f} ms  ({store.nbytes / 1e6:.0f} MB each way)")
+    print(f"   {'dispatch, shared':<24} {shared * 1000:8.1f} ms  ({pickled / shared:.1f}x)")
+    print(f"   {'signals, pickled':<24} {pickled_work * 1000:8.1f} ms")
+    print(f"   {'signals, shared':<24} {shared_work * 1000:8.1f} ms  ({pickled_work / shared_work:.1f}x)")
+
+    return True
+
+def bench_alert_latency():
+    """Time to alert and until the scan moves on for 10 signals whose Sheets/Excel writes take 50 ms each"""
+    print("\n⏱️ Alert latency budget (10 signals, 50 ms per write)...")
+
+    from latency import LatencyTrace, DeferredWrites
+
+    def run(budget):
+        writes = DeferredWrites(budget)
+        traces = [LatencyTrace().mark('start').mark('signal') for _ in range(10)]
+        for trace in traces:
+            writes.submit(trace, time.sleep, 0.05)
+        for trace in traces:
+            trace.mark('alert')
+        writes.flush()
+        resumed = time.monotonic() - traces[0].marks[0][1]
+        writes.wait()
+        return max(dict(trace.marks)['alert'] - trace.marks[0][1] for trace in traces), resumed
+
+    for name, budget in (("within budget", 0), ("over budget", 1e-9)):
+        alert, resumed = run(budget)
+        print(f"   {name:<14} last alert after {alert * 1000:6.1f} ms, scan moves on after {resumed * 1000:6.1f} ms")
+
+    return True
+
+def main():
+    """Run all benchmarks"""
+    print("🚀 Starting Algo Trading System Benchmarks")
+
+    try:
+        check_golden_outputs()
+    except Exception as e:
+        print(f"❌ Golden output check crashed: {e}")
+
+    benchmarks = [
+        ("Backtest Fill Model", bench_backtest_fill_model),
+        ("Robustness", bench_robustness),
+        ("Logging", bench_logging),
+        ("Strategy Engine", bench_strategy_engine),
+        ("Screener", bench_screener),
+        ("Risk", bench_risk),
+        ("Data Quality", bench_data_quality),
+        ("Feature Store", bench_feature_store),
+        ("Tuning", bench_tuning),
+        ("Reporting", bench_reporting),
+        ("Tick Aggregator", bench_tick_aggregator),
+        ("Subscriptions", bench_subscriptions),
+        ("Resumable Backtest", bench_resumable_backtest),
+        ("Instrument Store", bench_instrument_store),
+        ("Streaming Backtest", bench_streaming_backtest),
+        ("Rolling Mean", bench_rolling_mean),
+        ("Shared Memory", bench_shared_memory),
+        ("Alert Latency", bench_alert_latency),
+    ]
+
+    for name, func in benchmarks:
+        try:
+            func()
+        except Exception as e:
+            print(f"❌ {name} benchmark crashed: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Golden-output harness for indicators, signals and backtests
+Reference outputs for a fixed set of offline OHLCV fixtures are stored
+under golden/, and the current implementations are checked against them
+within tolerances, so a rewrite or speedup that changes results is caught
+
+    python golden.py            check the implementations against the references
+    python golden.py --update   regenerate the reference outputs
+"""
+
+import json
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import numpy as np
+import pandas as pd
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+FIXTURE_DIR = os.path.join(GOLDEN_DIR, 'fixtures')
+REFERENCE_DIR = os.path.join(GOLDEN_DIR, 'reference')
+
+RTOL = 1e-9
+ATOL = 1e-9
+
+INDICATOR_COLUMNS = ['SMA20', 'SMA50', 'RSI', 'MACD', 'MACD_SIGNAL', 'SMA_diff']
+TRADE_FLOATS = ['entry_price', 'exit_price', 'pnl', 'pnl_pct', 'costs']
+TRADE_EXACT = ['entry_date', 'exit_date', 'days_held', 'exit_reason']
+STAT_FIELDS = ['total', 'wins', 'losses', 'net_pnl', 'win_ratio', 'avg_pnl', 'avg_win', 'avg_loss', 'total_costs']
+
+# Backtest configurations pinned for every fixture: name -> backtest_signals kwargs
+BACKTESTS = {
+    'default': {},
+    'costs_next_open': {'cost_bps': 12, 'slippage_bps': 5, 'fill_at': 'next_open'},
+    'intrabar_bars': {'intrabar': True, 'hold_in_bars': True, 'max_hold_days': 10},
+}
+
+def _walk(n, seed, drift=0.0, vol=0.015, start=1000.0):
+    rng = np.random.default_rng(seed)
+    return start * np.exp(np.cumsum(rng.normal(drift, vol, n)))
+
+def _bars(close, seed, volume=None):
+    """OHLCV frame around a close path, indexed by Date"""
+    rng = np.random.default_rng(seed)
+    n = len(close)
+    open_ = close * (1 + rng.normal(0, 0.004, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, n)))
+    if volume is None:
+        volume = rng.integers(100_000, 1_000_000, n).astype(float)
+    index = pd.date_range('2021-01-01', periods=n, freq='B', name='Date')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close,
+                         'Adj Close': close, 'Volume': volume}, index=index)
+
+def _crash_rebound():
+    down = _walk(130, 41, drift=-0.006, vol=0.012)
+    up = _walk(130, 42, drift=0.006, vol=0.012, start=down[-1])
+    return _bars(np.concatenate([down, up]), 43)
+
+def _flat_then_moves():
+    """Constant closes for 30 bars (no gains or losses, so RSI is 0/0) before a random walk"""
+    close = np.concatenate([np.full(30, 500.0), _walk(120, 61, start=500.0)])
+    return _bars(close, 62, volume=np.full(150, 250_000.0))
+
+def _buy_sell_conflict():
+    """Rally then slide, with a volume spike on the bar where SMA20 crosses below SMA50
+
+    On that bar RSI < 42 with a volume spike (BUY) and the crossover down
+    (SELL) hold together, which pins down that SELL overrides BUY.
+    """
+    rally = _walk(90, 21, drift=0.004, vol=0.01)
+    slide = _walk(60, 22, drift=-0.012, vol=0.008, start=rally[-1])
+    df = _bars(np.concatenate([rally, slide]), 23)
+    sma20, sma50 = df['Close'].rolling(20).mean(), df['Close'].rolling(50).mean()
+    cross = ((sma20 < sma50) & (sma20.shift(1) >= sma50.shift(1))).to_numpy()
+    df.loc[cross, 'Volume'] *= 5
+    return df
+
+# Fixture name -> builder. Fixtures are written once and read back from CSV
+# afterwards, so references never depend on the random generators.
+FIXTURES = {
+    'random_walk': lambda: _bars(_walk(400, 11), 12),
+    'trend_up': lambda: _bars(_walk(250, 31, drift=0.004, vol=0.01), 32),
+    'crash_rebound': _crash_rebound,
+    'flat_then_moves': _flat_then_moves,
+    'short_history': lambda: _bars(_walk(45, 51), 52),
+    'buy_sell_conflict': _buy_sell_conflict,
+}
+
+def load_fixture(name):
+    """OHLCV fixture as written on disk, creating it on first use"""
+    path = os.path.join(FIXTURE_DIR, f'{name}.csv')
+    if not os.path.exists(path):
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        FIXTURES[name]().to_csv(path)
+    return pd.read_csv(path, index_col='Date', parse_dates=True, float_precision='round_trip')
+
+def rule_masks(df):
+    """(buy, sell) masks of the rule strategy, written out independently of strategy.py"""
+    rsi = df['RSI'].to_numpy()
+    sma20, sma50 = df['SMA20'].to_numpy(), df['SMA50'].to_numpy()
+    close, volume = df['Close'].to_numpy(), df['Volume'].to_numpy()
+    prev20, prev50 = np.roll(sma20, 1), np.roll(sma50, 1)
+    prev20[0] = prev50[0] = np.nan
+    cross_up = (sma20 > sma50) & (prev20 <= prev50)
+    cross_down = (sma20 < sma50) & (prev20 >= prev50)
+    volume_ma = pd.Series(volume).rolling(20).mean().to_numpy()
+    change_5d = np.full(len(close), np.nan)
+    change_5d[5:] = close[5:] / close[:-5] - 1
+    with np.errstate(invalid='ignore'):
+        buy = (rsi < 30) | ((rsi < 36) & cross_up) | ((rsi < 42) & (volume > volume_ma * 1.3))
+        sell = (rsi > 70) | cross_down | ((change_5d < -0.03) & (rsi > 50))
+    return buy, sell
+
+def _signal_array(values):
+    """Signals as an object array of 'BUY'/'SELL'/None"""
+    return np.array([v if v in ('BUY', 'SELL') else None for v in values], dtype=object)
+
+def _generate_signals(df):
+    from strategy import generate_signals
+    return generate_signals(df)['signal']
+
+def _engine_signals(df):
+    from strategy import RULE_STRATEGY
+    from strategy_engine import compile_strategies
+    return compile_strategies(RULE_STRATEGY).evaluate(df)[RULE_STRATEGY.name]
+
+def _add_indicators(df):
+    from indicators import add_indicators
+    return add_indicators(df)
+
+def _series_store(df, fields):
+    """Store holding df as instrument 1 between two unrelated instruments, so every window must stop at its edges"""
+    from instruments import SeriesStore
+    return SeriesStore.from_frames({0: df[fields] * 1.5, 1: df, 2: df[fields].iloc[:60] * 0.5}, fields)
+
+def _store_indicators(df):
+    from instruments import OHLCV_FIELDS
+    return _series_store(df, OHLCV_FIELDS).add_indicators().frame(1)
+
+def _store_signals(df):
+    from strategy import RULE_STRATEGY
+    store = _series_store(df, [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])])
+    return store.signals(RULE_STRATEGY)[RULE_STRATEGY.name][store.rows(1)]
+
+def _backtest(df, **kwargs):
+    from backtest import backtest_signals
+    return backtest_signals(df, **kwargs)
+
+# Implementations checked against the references; each signal implementation
+# is checked on the reference indicators, and backtests on the reference signals
+INDICATOR_IMPLEMENTATIONS = {'add_indicators': _add_indicators, 'series_store': _store_indicators}
+SIGNAL_IMPLEMENTATIONS = {'generate_signals': _generate_signals, 'strategy_engine': _engine_signals,
+                          'series_store': _store_signals}
+BACKTEST_IMPLEMENTATIONS = {'backtest_signals': _backtest}
+
+def _trade_record(trade):
+    record = {k: float(trade[k]) for k in TRADE_FLOATS}
+    record.update(entry_date=pd.Timestamp(trade['entry_date']).strftime('%Y-%m-%d'),
+                  exit_date=pd.Timestamp(trade['exit_date']).strftime('%Y-%m-%d'),
+                  days_held=int(trade['days_held']), exit_reason=trade['exit_reason'])
+    return record
+
+def _backtest_record(results):
+    return {'stats': {k: float(results[k]) for k in STAT_FIELDS},
+            'trades': [_trade_record(t) for t in results['trades']]}
+
+def _paths(name):
+    base = os.path.join(REFERENCE_DIR, name)
+    return {'indicators': base + '.indicators.csv', 'signals': base + '.signals.csv',
+            'backtests': base + '.backtests.json'}
+
+def update(names=None):
+    """Regenerate reference outputs from the current implementations"""
+    os.makedirs(REFERENCE_DIR, exist_ok=True)
+    for name in names or FIXTURES:
+        df = load_fixture(name)
+        indicators = _add_indicators(df)
+        signals = _signal_array(_generate_signals(indicators))
+        buy, sell = rule_masks(indicators)
+        signals_df = indicators.assign(signal=signals)
+
+        paths = _paths(name)
+        indicators[INDICATOR_COLUMNS].to_csv(paths['indicators'])
+        pd.DataFrame({'signal': signals}, index=df.index).to_csv(paths['signals'])
+        record = {
+            'rows': len(df),
+            'warmup': {c: int(np.argmax(indicators[c].notna().to_numpy())) if indicators[c].notna().any()
+                       else len(df) for c in INDICATOR_COLUMNS},
+            'conflict_dates': [d.strftime('%Y-%m-%d') for d in df.index[buy & sell]],
+            'backtests': {bt: _backtest_record(_backtest(signals_df, **kwargs)) for bt, kwargs in BACKTESTS.items()},
+        }
+        with open(paths['backtests'], 'w') as f:
+            json.dump(record, f, indent=1)
+        print(f"📝 {name}: {len(df)} bars, {int(pd.notna(signals).sum())} signals, "
+              f"{len(record['conflict_dates'])} BUY/SELL conflicts")
+
+def load_reference(name):
+    """(indicators frame, signals array, record) stored for a fixture"""
+    paths = _paths(name)
+    indicators = pd.read_csv(paths['indicators'], index_col='Date', parse_dates=True,
+                             float_precision='round_trip')
+    signals = pd.read_csv(paths['signals'], index_col='Date', parse_dates=True)['signal']
+    with open(paths['backtests']) as f:
+        record = json.load(f)
+    return indicators, _signal_array(signals.to_numpy()), record
+
+def compare_values(label, expected, actual, dates, rtol=RTOL, atol=ATOL):
+    """Failures comparing float arrays: NaN positions must match exactly, values within tolerance"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.shape != actual.shape:
+        return [f"{label}: {actual.shape[0]} rows, expected {expected.shape[0]}"]
+    failures = []
+    nan_diff = np.flatnonzero(np.isnan(expected) != np.isnan(actual))
+    if len(nan_diff):
+        i = nan_diff[0]
+        failures.append(f"{label}: NaN mismatch on {len(nan_diff)} rows, first {dates[i]:%Y-%m-%d} "
+                        f"(expected {float(expected[i])}, got {float(actual[i])})")
+    both = ~np.isnan(expected) & ~np.isnan(actual)
+    close = np.isclose(actual[both], expected[both], rtol=rtol, atol=atol)
+    if not close.all():
+        bad = np.flatnonzero(both)[~close]
+        worst = bad[np.argmax(np.abs(actual[bad] - expected[bad]))]
+        failures.append(f"{label}: {len(bad)} values outside tolerance, worst {dates[worst]:%Y-%m-%d} "
+                        f"(expected {float(expected[worst])!r}, got {float(actual[worst])!r})")
+    return failures
+
+def _compare_signals(label, expected, actual, dates, record):
+    failures = []
+    if len(actual) != len(expected):
+        return [f"{label}: {len(actual)} rows, expected {len(expected)}"]
+    diff = np.flatnonzero(expected != actual)
+    if len(diff):
+        i = diff[0]
+        failures.append(f"{label}: {len(diff)} signals differ, first {dates[i]:%Y-%m-%d} "
+                        f"(expected {expected[i]}, got {actual[i]})")
+    by_date = dict(zip(dates.strftime('%Y-%m-%d'), actual))
+    overridden = [d for d in record['conflict_dates'] if by_date.get(d) != 'SELL']
+    if overridden:
+        failures.append(f"{label}: BUY and SELL both true but not SELL on {', '.join(overridden)}")
+    warmup = min(record['warmup']['RSI'], len(actual))
+    early = [a for a in actual[:warmup] if a is not None]
+    if early:
+        failures.append(f"{label}: {len(early)} signals during the {warmup}-bar RSI warm-up")
+    return failures
+
+def _compare_backtest(label, expected, actual, rtol=RTOL, atol=ATOL):
+    failures = []
+    for key in STAT_FIELDS:
+        if not np.isclose(actual['stats'][key], expected['stats'][key], rtol=rtol, atol=atol):
+            failures.append(f"{label}: {key} {actual['stats'][key]!r}, expected {expected['stats'][key]!r}")
+    for i, (exp, act) in enumerate(zip(expected['trades'], actual['trades'])):
+        wrong = [k for k in TRADE_EXACT if exp[k] != act[k]]
+        wrong += [k for k in TRADE_FLOATS if not np.isclose(act[k], exp[k], rtol=rtol, atol=atol)]
+        if wrong:
+            failures.append(f"{label}: trade {i} entered {exp['entry_date']} differs in {', '.join(wrong)}")
+            break
+    if len(expected['trades']) != len(actual['trades']):
+        failures.append(f"{label}: {len(actual['trades'])} trades, expected {len(expected['trades'])}")
+    return failures
+
+def check(names=None, rtol=RTOL, atol=ATOL, indicators=None, signals=None, backtests=None):
+    """Check implementations against the references; returns a list of failure messages
+
+    `indicators`, `signals` and `backtests` map implementation name -> function
+    and default to the implementations registered above, so a candidate
+    rewrite can be checked before it replaces the current one.
+    """
+    indicators = INDICATOR_IMPLEMENTATIONS if indicators is None else indicators
+    signals = SIGNAL_IMPLEMENTATIONS if signals is None else signals
+    backtests = BACKTEST_IMPLEMENTATIONS if backtests is None else backtests
+    failures = []
+    for name in names or FIXTURES:
+        if not os.path.exists(_paths(name)['backtests']):
+            failures.append(f"{name}: no reference outputs (run golden.py --update)")
+            continue
+        df = load_fixture(name)
+        ref_indicators, ref_signals, record = load_reference(name)
+        dates = df.index
+
+        for impl, func in indicators.items():
+            out = func(df)
+            for column in INDICATOR_COLUMNS:
+                failures += compare_values(f"{name}/{impl}/{column}", ref_indicators[column].to_numpy(),
+                                           out[column].to_numpy(), dates, rtol, atol)
+
+        base = df.join(ref_indicators)
+        for impl, func in signals.items():
+            failures += _compare_signals(f"{name}/{impl}", ref_signals, _signal_array(func(base)), dates, record)
+
+        signals_df = base.assign(signal=ref_signals)
+        for impl, func in backtests.items():
+            for bt, kwargs in BACKTESTS.items():
+                actual = _backtest_record(func(signals_df, **kwargs))
+                failures += _compare_backtest(f"{name}/{impl}/{bt}", record['backtests'][bt], actual, rtol, atol)
+    return failures
+
+def main():
+    if '--update' in sys.argv[1:]:
+        update()
+        return True
+    failures = check()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        print(f"\n⚠️ {len(failures)} golden-output mismatches")
+        return False
+    print(f"✅ Golden outputs match for {len(FIXTURES)} fixtures")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
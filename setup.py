@@ -86,7 +86,7 @@ def check_dependencies():
     required_packages = [
         'pandas', 'numpy', 'yfinance', 'gspread', 
         'google-auth', 'python-dotenv', 'scikit-learn', 
-        'requests', 'schedule'
+        'requests'
     ]
     
     missing_packages = []
@@ -1,66 +1,202 @@
+import hashlib
+import json
+import os
 from datetime import timedelta
+import numpy as np
 import pandas as pd
 
-def backtest_signals(df, max_hold_days=20):
-    """Backtest the trading signals and return performance metrics"""
-    trades = []
-    position = None
-    entry_idx = None
+from strategy import generate_ml_signals
+from streaming import SignalStream, WARMUP_BARS, BACKTEST_COLUMNS
+from ml_model import walk_forward_probabilities
+
+DAY_NS = 86_400_000_000_000
+
+# Closes hashed to check that a saved backtest state still matches the data it resumes on
+RESUME_CHECK_BARS = 20
+
+EXIT_REASONS = ['SELL_SIGNAL', 'RSI_OVERBOUGHT', 'STOP_LOSS', 'TAKE_PROFIT', 'MAX_DAYS']
+
+def check_exit(entry_price, entry_date, date, close, rsi, signal=None, max_hold_days=20,
+               stop_loss_pct=5, take_profit_pct=10):
+    """Exit reason for an open position on one bar, or None
+    
+    Same rules and precedence as backtest_signals evaluates on Close, for
+    engines that process one bar at a time.
+    """
+    days_held = (date - entry_date).days
+    price_change_pct = ((close - entry_price) / entry_price) * 100
     
-    for idx, row in df.iterrows():
-        sig = row.get('signal')
-        price = row['Close']
-        rsi = row['RSI']
+    if signal == 'SELL':
+        return 'SELL_SIGNAL'
+    if rsi > 70:
+        return 'RSI_OVERBOUGHT'
+    if price_change_pct <= -stop_loss_pct:
+        return 'STOP_LOSS'
+    if price_change_pct >= take_profit_pct:
+        return 'TAKE_PROFIT'
+    if days_held >= max_hold_days:
+        return 'MAX_DAYS'
+    return None
+
+def _prepare_arrays(df):
+    """Extract the numpy arrays the exit search runs on"""
+    n = len(df)
+    sig = df['signal'] if 'signal' in df.columns else pd.Series([None] * n, index=df.index)
+    arrays = {
+        'close': df['Close'].to_numpy(dtype=float),
+        'rsi': df['RSI'].to_numpy(dtype=float),
+        'buy': (sig == 'BUY').to_numpy(dtype=bool),
+        'sell': (sig == 'SELL').to_numpy(dtype=bool),
+        'elapsed_ns': (df.index - df.index[0]).to_numpy().astype('timedelta64[ns]').astype('int64')
+                      if n and isinstance(df.index, pd.DatetimeIndex) else np.zeros(n, dtype='int64'),
+    }
+    for col in ['Open', 'High', 'Low']:
+        if col in df.columns:
+            arrays[col.lower()] = df[col].to_numpy(dtype=float)
+    return arrays
+
+def _find_exit(a, signal_bar, entry_bar, entry_price, max_hold_days, stop_loss_pct,
+               take_profit_pct, intrabar, next_open, hold_in_bars):
+    """Find the first bar after signal_bar that exits the position
+    
+    Scans forward in growing windows so each trade costs a handful of numpy
+    operations instead of one Python iteration per bar. Returns
+    (decision_bar, reason, raw_exit_price, exit_bar) or None if the position
+    is still open at the end of the data.
+    """
+    n = len(a['close'])
+    window = max(2 * max_hold_days, 32)
+    lo = signal_bar + 1
+    stop_level = entry_price * (1 - stop_loss_pct / 100)
+    target_level = entry_price * (1 + take_profit_pct / 100)
+    
+    while lo < n:
+        hi = min(n, lo + window)
+        close = a['close'][lo:hi]
+        rsi = a['rsi'][lo:hi]
+        sell = a['sell'][lo:hi]
+        
+        if hold_in_bars:
+            held = np.arange(lo, hi) - entry_bar
+        else:
+            held = (a['elapsed_ns'][lo:hi] - a['elapsed_ns'][entry_bar]) // DAY_NS
+        
+        price_change_pct = ((close - entry_price) / entry_price) * 100
+        overbought = rsi > 70
+        max_days = held >= max_hold_days
         
-        if position is None:
-            if sig == 'BUY':
-                position = {
-                    'entry_date': idx, 
-                    'entry_price': price, 
-                    'entry_rsi': rsi
-                }
-                entry_idx = idx
+        if intrabar:
+            stop = a['low'][lo:hi] <= stop_level
+            target = a['high'][lo:hi] >= target_level
         else:
-            # Check sell conditions
-            days_held = (idx - position['entry_date']).days
-            price_change_pct = ((price - position['entry_price']) / position['entry_price']) * 100
+            stop = price_change_pct <= -stop_loss_pct
+            target = price_change_pct >= take_profit_pct
+        
+        hit = sell | overbought | stop | target | max_days
+        if hit.any():
+            k = int(np.argmax(hit))
+            j = lo + k
             
-            # More realistic exit conditions
-            if (sig == 'SELL' or 
-                rsi > 70 or 
-                days_held >= max_hold_days or
-                price_change_pct <= -5 or  # Stop loss at 5%
-                price_change_pct >= 10):   # Take profit at 10%
-                
-                exit_price = price
-                pnl = exit_price - position['entry_price']
-                pnl_pct = (pnl / position['entry_price']) * 100
-                
-                # Determine exit reason
-                if sig == 'SELL':
-                    exit_reason = 'SELL_SIGNAL'
-                elif rsi > 70:
-                    exit_reason = 'RSI_OVERBOUGHT'
-                elif price_change_pct <= -5:
-                    exit_reason = 'STOP_LOSS'
-                elif price_change_pct >= 10:
-                    exit_reason = 'TAKE_PROFIT'
-                else:
-                    exit_reason = 'MAX_DAYS'
-                
-                trades.append({
-                    'entry_date': position['entry_date'],
-                    'exit_date': idx,
-                    'entry_price': position['entry_price'],
-                    'exit_price': exit_price,
-                    'pnl': pnl,
-                    'pnl_pct': pnl_pct,
-                    'days_held': days_held,
-                    'exit_reason': exit_reason
-                })
-                position = None
+            if intrabar and stop[k]:
+                # Gap-through: an open below the stop fills at the open
+                return j, 'STOP_LOSS', min(a['open'][j], stop_level), j
+            if intrabar and target[k]:
+                return j, 'TAKE_PROFIT', max(a['open'][j], target_level), j
+            
+            if sell[k]:
+                reason = 'SELL_SIGNAL'
+            elif overbought[k]:
+                reason = 'RSI_OVERBOUGHT'
+            elif stop[k]:
+                reason = 'STOP_LOSS'
+            elif target[k]:
+                reason = 'TAKE_PROFIT'
+            else:
+                reason = 'MAX_DAYS'
+            
+            if next_open:
+                if j + 1 >= n:
+                    return None
+                return j, reason, a['open'][j + 1], j + 1
+            return j, reason, a['close'][j], j
+        
+        lo = hi
+        window *= 2
+    
+    return None
+
+def _simulate(df, max_hold_days=20, cost_bps=0.0, slippage_bps=0.0, intrabar=False,
+              fill_at='close', hold_in_bars=False, stop_loss_pct=5, take_profit_pct=10):
+    """Run the trade loop over a signals frame
+    
+    Returns (trades, resume_bar, open_position). resume_bar is the bar a
+    longer frame would have to restart the loop from: the signal bar of a
+    trade that has not exited (or not entered) by the last bar, else len(df).
+    open_position describes that trade once it has been entered.
+    """
+    if fill_at not in ('close', 'next_open'):
+        raise ValueError(f"Unknown fill_at: {fill_at}")
+    required = ['Close', 'RSI'] + (['Open', 'High', 'Low'] if intrabar else ['Open'] if fill_at == 'next_open' else [])
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        raise ValueError(f"Backtest needs columns {missing} (intrabar={intrabar}, fill_at={fill_at})")
+    if not hold_in_bars and not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("A holding period in calendar days needs a DatetimeIndex; use hold_in_bars=True otherwise")
+    
+    trades = []
+    a = _prepare_arrays(df)
+    n = len(a['close'])
+    next_open = fill_at == 'next_open'
+    slip = slippage_bps / 10000
+    index = df.index
+    
+    buy_bars = np.flatnonzero(a['buy'])
+    next_allowed = 0
     
-    # Calculate summary statistics
+    while True:
+        k = np.searchsorted(buy_bars, next_allowed)
+        if k >= len(buy_bars):
+            return trades, n, None
+        signal_bar = int(buy_bars[k])
+        entry_bar = signal_bar + 1 if next_open else signal_bar
+        if entry_bar >= n:
+            return trades, signal_bar, None
+        
+        raw_entry = a['open'][entry_bar] if next_open else a['close'][entry_bar]
+        entry_price = raw_entry * (1 + slip)
+        
+        found = _find_exit(a, signal_bar, entry_bar, entry_price, max_hold_days, stop_loss_pct,
+                           take_profit_pct, intrabar, next_open, hold_in_bars)
+        if found is None:
+            return trades, signal_bar, {'signal_date': index[signal_bar], 'entry_date': index[entry_bar],
+                                        'entry_price': entry_price}
+        decision_bar, exit_reason, raw_exit, exit_bar = found
+        
+        exit_price = raw_exit * (1 - slip)
+        costs = (entry_price + exit_price) * cost_bps / 10000
+        pnl = exit_price - entry_price - costs
+        pnl_pct = (pnl / entry_price) * 100
+        
+        if hold_in_bars:
+            days_held = exit_bar - entry_bar
+        else:
+            days_held = (index[exit_bar] - index[entry_bar]).days
+        
+        trades.append({
+            'entry_date': index[entry_bar],
+            'exit_date': index[exit_bar],
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'pnl': pnl,
+            'pnl_pct': pnl_pct,
+            'days_held': days_held,
+            'exit_reason': exit_reason,
+            'costs': costs
+        })
+        next_allowed = decision_bar + 1
+
+def _summarize(trades):
+    """Summary statistics of a list of trades"""
     total = len(trades)
     wins = sum(1 for t in trades if t['pnl'] > 0)
     losses = total - wins
@@ -76,5 +212,143 @@ def backtest_signals(df, max_hold_days=20):
         'win_ratio': win_ratio,
         'avg_pnl': net_pnl / total if total else 0,
         'avg_win': sum(t['pnl'] for t in trades if t['pnl'] > 0) / wins if wins else 0,
-        'avg_loss': sum(t['pnl'] for t in trades if t['pnl'] < 0) / losses if losses else 0
+        'avg_loss': sum(t['pnl'] for t in trades if t['pnl'] < 0) / losses if losses else 0,
+        'total_costs': sum(t['costs'] for t in trades)
     }
+
+def backtest_signals(df, max_hold_days=20, cost_bps=0.0, slippage_bps=0.0, intrabar=False,
+                     fill_at='close', hold_in_bars=False, stop_loss_pct=5, take_profit_pct=10):
+    """Backtest the trading signals and return performance metrics
+    
+    The defaults reproduce the original model: fills at the signal bar's
+    Close, no costs, stop/target checked on Close, holding period in
+    calendar days. Optional realism:
+    - cost_bps: brokerage + STT etc. charged on the traded value of each leg
+    - slippage_bps: adverse price move applied to every fill
+    - intrabar: check stop/target against Low/High, filling at the level or
+      at the Open when the bar gaps through it
+    - fill_at='next_open': execute entries and Close-based exits at the next bar's Open
+    - hold_in_bars: measure max_hold_days in bars instead of calendar days
+    """
+    trades, _, _ = _simulate(df, max_hold_days, cost_bps, slippage_bps, intrabar, fill_at, hold_in_bars,
+                             stop_loss_pct, take_profit_pct)
+    return _summarize(trades)
+
+def _trade_to_json(trade):
+    return dict(trade, entry_date=trade['entry_date'].isoformat(), exit_date=trade['exit_date'].isoformat(),
+                entry_price=float(trade['entry_price']), exit_price=float(trade['exit_price']),
+                pnl=float(trade['pnl']), pnl_pct=float(trade['pnl_pct']), days_held=int(trade['days_held']),
+                costs=float(trade['costs']))
+
+def _trades_from_json(trades):
+    if not trades:
+        return []
+    dates = pd.to_datetime([t['entry_date'] for t in trades] + [t['exit_date'] for t in trades],
+                           format='ISO8601').tolist()
+    n = len(trades)
+    return [dict(t, entry_date=dates[i], exit_date=dates[n + i]) for i, t in enumerate(trades)]
+
+def _close_hash(df, start, stop):
+    """Hash of the Close values of bars [start, stop)"""
+    closes = np.ascontiguousarray(df['Close'].iloc[start:stop].to_numpy(dtype=np.float64))
+    return hashlib.sha1(closes.tobytes()).hexdigest()[:16]
+
+def resume_backtest(df, state=None, **params):
+    """backtest_signals continued from a saved state; returns (results, new state)
+    
+    The state (a JSON-serialisable dict) keeps the closed trades, the last
+    bar processed, the open position and the bar the trade loop restarts
+    from, with a hash of the Closes from the restart bar (or the last
+    RESUME_CHECK_BARS bars, if that reaches further back) to the last bar.
+    Only the bars from the restart bar on are simulated, so the results are
+    identical to backtest_signals over every bar seen since the state was
+    started. If the state was built with other parameters, or its hashed
+    bars are no longer in `df` unchanged (data was re-adjusted, or runs were
+    too far apart), the backtest is rebuilt from `df` alone.
+    """
+    n = len(df)
+    start, saved = 0, []
+    if state is not None and n and state['params'] == params and state.get('close_hash'):
+        last = pd.Timestamp(state['last_date'])
+        check = pd.Timestamp(state['check_date'])
+        resume = pd.Timestamp(state['resume_date']) if state['resume_date'] else None
+        index = df.index
+        if last in index and check in index and (resume is None or resume in index) and \
+                _close_hash(df, index.get_loc(check), index.get_loc(last) + 1) == state['close_hash']:
+            start = index.get_loc(resume) if resume is not None else index.get_loc(last) + 1
+            saved = state['trades']
+    
+    new_trades, resume_bar, open_position = _simulate(df.iloc[start:], **params)
+    trades = _trades_from_json(saved) + new_trades
+    resume_bar += start
+    if open_position is not None:
+        open_position = {'signal_date': open_position['signal_date'].isoformat(),
+                         'entry_date': open_position['entry_date'].isoformat(),
+                         'entry_price': float(open_position['entry_price'])}
+    check_bar = max(0, min(resume_bar, n - RESUME_CHECK_BARS))
+    state = {
+        'params': params,
+        'trades': saved + [_trade_to_json(t) for t in new_trades],
+        'resume_date': df.index[resume_bar].isoformat() if resume_bar < n else None,
+        'last_date': df.index[-1].isoformat() if n else None,
+        'check_date': df.index[check_bar].isoformat() if n else None,
+        'close_hash': _close_hash(df, check_bar, n) if n else None,
+        'open_position': open_position,
+        'bars_processed': n - start,
+    }
+    return _summarize(trades), state
+
+def backtest_stream(chunks, warmup=WARMUP_BARS, **params):
+    """backtest_signals over a raw OHLCV history delivered in chunks
+    
+    Signals come from a SignalStream, and the trade loop carries over only
+    the rows from the signal bar of a still-open trade, as resume_backtest
+    does. The results equal backtest_signals(generate_signals(add_indicators(history)))
+    while memory stays bounded by the chunk size plus the longest holding
+    period. Adds 'bars' and 'peak_rows' (the most rows held at once).
+    """
+    stream = SignalStream(warmup)
+    trades, pending, peak_rows = [], None, 0
+    for chunk in chunks:
+        signals = stream.update(chunk)
+        if signals.empty:
+            continue
+        rows = signals[[c for c in BACKTEST_COLUMNS if c in signals.columns]]
+        frame = rows if pending is None else pd.concat([pending, rows])
+        peak_rows = max(peak_rows, len(frame) + len(stream.tail))
+        new_trades, resume_bar, _ = _simulate(frame, **params)
+        trades.extend(new_trades)
+        pending = frame.iloc[resume_bar:] if resume_bar < len(frame) else None
+    results = _summarize(trades)
+    results.update(bars=stream.bars, peak_rows=peak_rows)
+    return results
+
+def trades_since(results, start):
+    """Results restricted to the trades entered on or after `start`"""
+    return _summarize([t for t in results['trades'] if t['entry_date'] >= start])
+
+def load_backtest_states(path):
+    """ticker -> saved backtest state"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_backtest_states(states, path):
+    """Write every ticker's backtest state to `path` atomically"""
+    with open(path + '.tmp', 'w') as f:
+        json.dump(states, f)
+    os.replace(path + '.tmp', path)
+
+def backtest_ml(df, max_hold_days=20, blend=None, buy_threshold=0.6, sell_threshold=0.4,
+                min_train=100, retrain_every=20):
+    """Backtest signals driven by out-of-sample walk-forward model probabilities
+    
+    Uses the same exit logic and returns the same stats as backtest_signals.
+    """
+    up_probability = walk_forward_probabilities(df, min_train=min_train, retrain_every=retrain_every)
+    signals_df = generate_ml_signals(df, up_probability, buy_threshold, sell_threshold, blend)
+    return backtest_signals(signals_df, max_hold_days)
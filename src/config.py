@@ -9,3 +9,61 @@ GSPREAD_CREDS = os.getenv("GSPREAD_CREDS", "gsheets_key.json")
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 YOUR_EMAIL = os.getenv("YOUR_EMAIL", "your_email@example.com")
+# Monte Carlo simulations per ticker, run on every scan; at 1000 the 90% interval
+# ends move by about 2% of the interval width from run to run
+ROBUSTNESS_SIMS = int(os.getenv("ROBUSTNESS_SIMS", "1000"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "15"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "2"))
+LOG_FILE = os.getenv("LOG_FILE", "algo_trading.log")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "8000"))
+SCREEN_BENCHMARK = os.getenv("SCREEN_BENCHMARK", "^NSEI")
+SCREEN_TOP = int(os.getenv("SCREEN_TOP", "10"))
+
+# Sector of each ticker for exposure limits; override with SECTORS=TCS.NS:IT,RELIANCE.NS:Energy
+DEFAULT_SECTORS = {
+    "TCS.NS": "IT", "INFY.NS": "IT", "WIPRO.NS": "IT", "HCLTECH.NS": "IT", "TECHM.NS": "IT", "LTIM.NS": "IT",
+    "RELIANCE.NS": "Energy", "ONGC.NS": "Energy", "BPCL.NS": "Energy", "NTPC.NS": "Energy", "POWERGRID.NS": "Energy",
+    "HDFCBANK.NS": "Financials", "ICICIBANK.NS": "Financials", "SBIN.NS": "Financials", "KOTAKBANK.NS": "Financials",
+    "AXISBANK.NS": "Financials", "BAJFINANCE.NS": "Financials", "INDUSINDBK.NS": "Financials",
+    "HINDUNILVR.NS": "Consumer", "ITC.NS": "Consumer", "NESTLEIND.NS": "Consumer", "BRITANNIA.NS": "Consumer",
+    "MARUTI.NS": "Auto", "TATAMOTORS.NS": "Auto", "M&M.NS": "Auto", "BAJAJ-AUTO.NS": "Auto", "EICHERMOT.NS": "Auto",
+    "SUNPHARMA.NS": "Healthcare", "DRREDDY.NS": "Healthcare", "CIPLA.NS": "Healthcare", "DIVISLAB.NS": "Healthcare",
+    "TATASTEEL.NS": "Materials", "JSWSTEEL.NS": "Materials", "HINDALCO.NS": "Materials", "ULTRACEMCO.NS": "Materials",
+    "BHARTIARTL.NS": "Telecom", "LT.NS": "Industrials", "ADANIPORTS.NS": "Industrials",
+}
+SECTORS = dict(DEFAULT_SECTORS)
+SECTORS.update(dict(pair.split(":", 1) for pair in os.getenv("SECTORS", "").split(",") if ":" in pair))
+
+RISK_CAPITAL = float(os.getenv("RISK_CAPITAL", "1000000"))
+RISK_PER_TRADE = float(os.getenv("RISK_PER_TRADE", "0.01"))
+RISK_MAX_POSITION = float(os.getenv("RISK_MAX_POSITION", "0.10"))
+RISK_MAX_SECTOR = float(os.getenv("RISK_MAX_SECTOR", "0.25"))
+RISK_MAX_CORRELATION = float(os.getenv("RISK_MAX_CORRELATION", "0.8"))
+RISK_WINDOW = int(os.getenv("RISK_WINDOW", "60"))
+RISK_STATE_FILE = os.getenv("RISK_STATE_FILE", "risk_state.npz")
+PAPER_DB = os.getenv("PAPER_DB", "paper_trading.db")
+BACKTEST_STATE_FILE = os.getenv("BACKTEST_STATE_FILE", "backtest_state.json")
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "feature_store")
+TUNING_FILE = os.getenv("TUNING_FILE", "tuned_models.json")
+TUNING_JOBS = int(os.getenv("TUNING_JOBS", "-1"))
+REPORT_HTML = os.getenv("REPORT_HTML", "report.html")
+SUBSCRIPTIONS_FILE = os.getenv("SUBSCRIPTIONS_FILE", "subscriptions.json")
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS", "16"))
+ALERTED_SIGNALS_FILE = os.getenv("ALERTED_SIGNALS_FILE", "alerted_signals.json")
+# Sheets/Excel signal writes run after the alerts: inline, or in the background once a signal is this many
+# seconds past its fetch (0 always inline)
+ALERT_LATENCY_BUDGET = float(os.getenv("ALERT_LATENCY_BUDGET", "30"))
+
+# Scheduled mode cadences on NSE trading days ('at HH:MM', 'every N m' through the session, or 'off').
+# Scans use daily bars, which are only complete after the close, so the intraday scan is off by default
+SCHEDULE_PRE_OPEN = os.getenv("SCHEDULE_PRE_OPEN", "at 09:00")
+SCHEDULE_SCAN = os.getenv("SCHEDULE_SCAN", "off")
+SCHEDULE_EOD = os.getenv("SCHEDULE_EOD", "at 15:45")
+SCHEDULE_RETRAIN = os.getenv("SCHEDULE_RETRAIN", "at 18:00")
+SCHEDULER_STATE_FILE = os.getenv("SCHEDULER_STATE_FILE", "scheduler_state.json")
@@ -1,18 +1,204 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import yfinance as yf
 import pandas as pd
 
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+def _download(ticker, period="1y", interval="1d"):
+    """Download one ticker from Yahoo Finance, raising on failure or empty data
+
+    Goes through Ticker.history rather than yf.download: download keeps its
+    results in state shared by every call, while a Ticker only touches its
+    own, so several tickers can be fetched at once.
+    """
+    df = yf.Ticker(ticker).history(period=period, interval=interval, auto_adjust=False, actions=False)
+    df = df.dropna()
+
+    # Handle multi-level column names from yfinance
+    if isinstance(df.columns, pd.MultiIndex):
+        # Get the first level (Price) as column names
+        df.columns = df.columns.get_level_values(0)
+
+    if df.empty:
+        raise ValueError(f"Empty response for {ticker}")
+    # Daily bars carry exchange-local dates, as yf.download returns them
+    if interval[-1] not in ('m', 'h') and df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = 'Date'
+    return df
+
 def fetch_data(ticker, period="1y", interval="1d"):
     """Return df indexed by Date with columns Open, High, Low, Close, Adj Close, Volume"""
     try:
-        df = yf.download(ticker, period=period, interval=interval, progress=False, auto_adjust=False)
-        df = df.dropna()
-        
-        # Handle multi-level column names from yfinance
-        if isinstance(df.columns, pd.MultiIndex):
-            # Get the first level (Price) as column names
-            df.columns = df.columns.get_level_values(0)
-        
-        return df
+        return _download(ticker, period, interval)
     except Exception as e:
-        print(f"Error fetching data for {ticker}: {e}")
+        logger.error(f"Error fetching data for {ticker}: {e}", extra={'ticker': ticker, 'stage': 'fetch'})
         return pd.DataFrame()
+
+class CircuitBreaker:
+    """Stops calling a misbehaving upstream after repeated failures
+
+    Opens after `failure_threshold` consecutive failures; once open every
+    call fails fast until `reset_timeout` seconds pass, after which one
+    trial call is let through (half-open) to decide whether to close again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Return True if a call may go to the upstream now"""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open' and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class _FetchSlots:
+    """Semaphore bounding in-flight source calls that remembers when a slot was last freed"""
+
+    def __init__(self, size):
+        self._semaphore = asyncio.Semaphore(size)
+        self.last_release = time.monotonic()
+
+    async def acquire(self, stall_timeout):
+        """Wait for a slot, giving up once none has been freed for `stall_timeout` seconds
+
+        Healthy calls free their slot within the call timeout, so the wait
+        only fails when every slot is held by a call abandoned on a hung
+        upstream, however long the queue of tickers ahead of it.
+        """
+        while True:
+            wait = self.last_release + stall_timeout - time.monotonic()
+            if wait <= 0:
+                raise TimeoutError(f"No fetch slot freed for {stall_timeout}s")
+            try:
+                return await asyncio.wait_for(self._semaphore.acquire(), wait)
+            except asyncio.TimeoutError:
+                continue
+
+    def release(self):
+        self.last_release = time.monotonic()
+        self._semaphore.release()
+
+def _release_slot(slots, future):
+    slots.release()
+    if not future.cancelled():
+        # Retrieve a late failure so it isn't reported as never retrieved
+        future.exception()
+
+async def _call_source(source, ticker, period, interval, executor, slots, timeout):
+    """Run one source call within `timeout`, then give back the slot taken for it
+
+    A thread abandoned by a timeout keeps its slot until it returns, so no
+    more threads than executor workers are ever started and later calls
+    never queue behind abandoned ones with their timeout running. Calls
+    waiting for a slot give up if abandoned threads hold them all.
+    """
+    if inspect.iscoroutinefunction(source):
+        try:
+            return await asyncio.wait_for(source(ticker, period, interval), timeout)
+        finally:
+            slots.release()
+    future = asyncio.get_running_loop().run_in_executor(executor, source, ticker, period, interval)
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    finally:
+        if future.done():
+            slots.release()
+        else:
+            future.add_done_callback(lambda f: _release_slot(slots, f))
+
+async def _fetch_one(ticker, period, interval, source, executor, slots, breaker,
+                     timeout, retries, backoff):
+    """Fetch one ticker with timeout, retries and circuit breaking; never raises"""
+    result = {'ticker': ticker, 'ok': False, 'data': pd.DataFrame(), 'error': None,
+              'attempts': 0, 'elapsed': 0.0}
+    start = time.monotonic()
+
+    for attempt in range(retries + 1):
+        try:
+            await slots.acquire(timeout)
+            # Checked once a slot is free so queued calls see a freshly opened breaker
+            if not breaker.allow():
+                slots.release()
+                result['error'] = 'Circuit open: upstream failing'
+                break
+
+            result['attempts'] = attempt + 1
+            df = await _call_source(source, ticker, period, interval, executor, slots, timeout)
+            if df is None or df.empty:
+                raise ValueError(f"Empty response for {ticker}")
+        except Exception as e:
+            breaker.record_failure()
+            result['error'] = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            if attempt < retries:
+                await asyncio.sleep(backoff * 2 ** attempt)
+            continue
+
+        breaker.record_success()
+        result.update(ok=True, data=df, error=None)
+        break
+
+    result['elapsed'] = time.monotonic() - start
+    return result
+
+async def fetch_many_async(tickers, period="1y", interval="1d", source=None, concurrency=8,
+                           timeout=15.0, retries=2, backoff=0.5, breaker=None):
+    """Fetch many tickers concurrently; return ticker -> result dict
+
+    Each result has ok, data (DataFrame, empty on failure), error, attempts
+    and elapsed seconds. `source(ticker, period, interval)` may be a plain or
+    async function returning a DataFrame and defaults to Yahoo Finance.
+    """
+    source = source or _download
+    breaker = breaker or CircuitBreaker()
+    slots = _FetchSlots(concurrency)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        results = await asyncio.gather(*[
+            _fetch_one(ticker, period, interval, source, executor, slots, breaker,
+                       timeout, retries, backoff)
+            for ticker in tickers
+        ])
+    finally:
+        # Don't block on threads abandoned by timeouts
+        executor.shutdown(wait=False)
+
+    return {r['ticker']: r for r in results}
+
+def fetch_many(tickers, period="1y", interval="1d", **kwargs):
+    """Synchronous wrapper around fetch_many_async"""
+    return asyncio.run(fetch_many_async(tickers, period, interval, **kwargs))
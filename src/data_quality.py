@@ -0,0 +1,318 @@
+"""
+OHLCV validation and repair
+Repairs bad bars instead of dropping them and reports what was changed
+for every ticker. repair_ohlcv works on a whole history with vectorized
+checks; StreamingValidator checks one new bar at a time.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+
+from market_calendar import CALENDAR_YEARS, session_mask, trading_days, is_trading_day
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+# Split / consolidation ratios (old price / new price) recognised as corporate actions
+SPLIT_RATIOS = np.array([1.5, 2, 3, 4, 5, 10, 1 / 1.5, 1 / 2, 1 / 3, 1 / 4, 1 / 5, 1 / 10])
+SPLIT_TOLERANCE = 0.03
+
+# Floor on the robust volatility of returns (a quiet large-cap moves about 0.5% a day)
+MIN_SCALE = 0.005
+
+def _flat_columns(df):
+    """Copy of df with single-level column names"""
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    return df
+
+def _is_daily(index):
+    return len(index) > 0 and bool((index == index.normalize()).all())
+
+def _nearest_split(log_ratio):
+    """Nearest split ratio to exp(log_ratio) per element, NaN when none is within tolerance"""
+    targets = np.log(SPLIT_RATIOS)
+    distance = np.abs(log_ratio[:, None] - targets[None, :])
+    nearest = distance.argmin(axis=1)
+    return np.where(distance[np.arange(len(log_ratio)), nearest] < SPLIT_TOLERANCE,
+                    SPLIT_RATIOS[nearest], np.nan)
+
+def _robust_scale(log_returns, window=20):
+    """Rolling MAD-based volatility of log returns, using only past bars
+
+    Unchanged closes are left out of the median, so a flat stretch (a
+    halted or illiquid ticker, or a filled gap) does not shrink the scale
+    until ordinary moves look like outliers; the result is never below
+    MIN_SCALE.
+    """
+    abs_returns = np.abs(log_returns)
+    abs_returns = np.where(abs_returns > 0, abs_returns, np.nan)
+    scale = pd.Series(abs_returns).rolling(window, min_periods=5).median().shift(1) * 1.4826
+    fallback = np.nanmedian(abs_returns) * 1.4826 if np.isfinite(abs_returns).any() else MIN_SCALE
+    scale = scale.fillna(fallback).to_numpy()
+    return np.maximum(scale, MIN_SCALE)
+
+def _dates(index, mask, limit=5):
+    return [d.strftime('%Y-%m-%d') for d in index[mask][:limit]]
+
+def repair_ohlcv(df, ticker=None, align_calendar=True, adjust_splits=True, k=8.0):
+    """Validate and repair an OHLCV frame; returns (repaired_df, quality_report)
+
+    Steps, each vectorized over the whole history:
+    - duplicated dates (last one wins) and unsorted rows
+    - calendar alignment for daily bars: rows on NSE non-trading days are
+      dropped; missing trading days are filled with a flat bar at the
+      previous close and zero volume (only for years the holiday list covers)
+    - non-positive or missing prices, filled from the bar's close, or the
+      previous close when the close itself is missing
+    - unadjusted splits: an overnight gap matching a split ratio that does
+      not revert; history before it is scaled when adjust_splits is set
+    - bad ticks: a close more than k robust sigmas away that reverts on the
+      next bar, replaced by the previous close
+    - wick outliers: High/Low more than k sigmas beyond the body, clipped
+    - High/Low inconsistent with Open/Close, widened to contain them
+    - Adj Close / Close factor checks for dividend adjustments
+    The input frame is not modified. Rows whose close cannot be repaired
+    (before the first valid price) are dropped.
+    """
+    df = _flat_columns(df)
+    report = {'ticker': ticker, 'rows_in': len(df), 'rows_out': 0, 'duplicates': 0, 'non_trading_rows': 0,
+              'gaps_filled': 0, 'invalid_prices': 0, 'splits': [], 'bad_ticks': 0, 'wick_outliers': 0,
+              'ohlc_fixed': 0, 'zero_volume': 0, 'dividend_events': 0, 'adjustment_anomalies': [],
+              'dropped_rows': 0, 'repaired_rows': 0, 'score': 1.0}
+    missing = [col for col in PRICE_COLUMNS + ['Volume'] if col not in df.columns]
+    if df.empty or missing:
+        return df, report
+
+    # Order and duplicates
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='mergesort')
+    duplicated = df.index.duplicated(keep='last')
+    report['duplicates'] = int(duplicated.sum())
+    if report['duplicates']:
+        df = df[~duplicated]
+
+    # Calendar alignment
+    gap = None
+    if align_calendar and _is_daily(df.index):
+        index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        on_session = session_mask(index)
+        report['non_trading_rows'] = int((~on_session).sum())
+        if report['non_trading_rows']:
+            df = df[on_session]
+            index = index[on_session]
+        if len(df):
+            expected = trading_days(index[0], index[-1])
+            expected = expected[expected.year.isin(CALENDAR_YEARS)]
+            full = index.union(expected)
+            if len(full) > len(index):
+                gap = ~full.isin(index)
+                if df.index.tz is not None:
+                    full = full.tz_localize(df.index.tz)
+                df = df.reindex(full)
+                report['gaps_filled'] = int(gap.sum())
+    if gap is None:
+        gap = np.zeros(len(df), dtype=bool)
+
+    prices = df[PRICE_COLUMNS].to_numpy(dtype=float, copy=True)
+    volume = df['Volume'].to_numpy(dtype=float, copy=True)
+    adj = df['Adj Close'].to_numpy(dtype=float, copy=True) if 'Adj Close' in df.columns else None
+
+    # Non-positive or missing prices
+    invalid = ~(prices > 0)
+    invalid_rows = invalid.any(axis=1) & ~gap
+    report['invalid_prices'] = int(invalid_rows.sum())
+    prices[invalid] = np.nan
+    repaired = invalid_rows | gap
+
+    close = pd.Series(prices[:, 3]).ffill().to_numpy()
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_ret = np.log(close / prev_close)
+    log_ret[~np.isfinite(log_ret)] = np.nan
+    next_ret = np.concatenate([log_ret[1:], [np.nan]])
+
+    # Unadjusted splits: overnight gap at a split ratio that holds on the next bar
+    # and is not the reversal of a one-bar spike
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gap_ret = np.log(prev_close / prices[:, 0])
+    split_ratio = _nearest_split(np.nan_to_num(-log_ret, nan=0.0))
+    gap_ratio = _nearest_split(np.nan_to_num(gap_ret, nan=0.0))
+    prev_ret = np.concatenate([[np.nan], log_ret[:-1]])
+    move = np.abs(np.nan_to_num(log_ret))
+    split = (~np.isnan(split_ratio) & (split_ratio == gap_ratio)
+             & ~(np.abs(np.nan_to_num(next_ret)) > move / 2)
+             & ~(np.abs(np.nan_to_num(prev_ret + log_ret)) < move / 2))
+    if split.any():
+        report['splits'] = [(d.strftime('%Y-%m-%d'), float(r)) for d, r in zip(df.index[split], split_ratio[split])]
+        if adjust_splits:
+            step = np.where(split, split_ratio, 1.0)
+            later = np.append(np.cumprod(step[::-1])[::-1][1:], 1.0)
+            prices /= later[:, None]
+            volume = volume * later
+            if adj is not None:
+                adj = adj / later
+            close = close / later
+            repaired |= later != 1.0
+            prev_close = np.concatenate([[np.nan], close[:-1]])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                log_ret = np.log(close / prev_close)
+            log_ret[~np.isfinite(log_ret)] = np.nan
+            next_ret = np.concatenate([log_ret[1:], [np.nan]])
+
+    # Bad ticks: large move that reverts on the next bar
+    scale = _robust_scale(log_ret)
+    big = np.abs(np.nan_to_num(log_ret)) > k * scale
+    reverts = (np.sign(np.nan_to_num(next_ret)) == -np.sign(np.nan_to_num(log_ret))) & \
+              (np.abs(np.nan_to_num(log_ret + next_ret)) < np.abs(np.nan_to_num(log_ret)) / 2)
+    bad_tick = big & reverts & ~split
+    report['bad_ticks'] = int(bad_tick.sum())
+    prices[bad_tick] = np.nan
+    if adj is not None:
+        adj[bad_tick] = np.nan
+    repaired |= bad_tick
+
+    # Fill missing prices from the previous close; flat bar when the whole bar is missing
+    close = pd.Series(prices[:, 3]).ffill().to_numpy()
+    for col in range(3):
+        prices[:, col] = np.where(np.isnan(prices[:, col]), close, prices[:, col])
+    prices[:, 3] = close
+    volume = np.where(np.isnan(volume) | gap, 0.0, volume)
+    if adj is not None:
+        adj = pd.Series(adj).ffill().to_numpy()
+
+    # Wicks far outside the body
+    body_high = np.maximum(prices[:, 0], prices[:, 3])
+    body_low = np.minimum(prices[:, 0], prices[:, 3])
+    wick_cap = np.exp(k * scale)
+    high_out = prices[:, 1] > body_high * wick_cap
+    low_out = prices[:, 2] < body_low / wick_cap
+    report['wick_outliers'] = int((high_out | low_out).sum())
+    prices[:, 1] = np.where(high_out, body_high, prices[:, 1])
+    prices[:, 2] = np.where(low_out, body_low, prices[:, 2])
+    repaired |= high_out | low_out
+
+    # High/Low must contain Open and Close
+    with np.errstate(invalid='ignore'):
+        high = np.fmax(prices[:, 1], body_high)
+        low = np.fmin(prices[:, 2], body_low)
+        inconsistent = (high != prices[:, 1]) | (low != prices[:, 2])
+    inconsistent &= ~np.isnan(close)
+    report['ohlc_fixed'] = int(inconsistent.sum())
+    prices[:, 1], prices[:, 2] = high, low
+    repaired |= inconsistent
+
+    # Dividend adjustment factor: should only step up over time, by modest amounts
+    if adj is not None:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            factor = adj / prices[:, 3]
+            step = factor[1:] / factor[:-1] - 1
+        step = np.nan_to_num(step)
+        report['dividend_events'] = int((step > 1e-4).sum())
+        anomalies = np.concatenate([[False], (step < -1e-3) | (step > 0.25)])
+        report['adjustment_anomalies'] = _dates(df.index, anomalies)
+
+    df = df.copy()
+    df[PRICE_COLUMNS] = prices
+    df['Volume'] = volume
+    if adj is not None:
+        df['Adj Close'] = adj
+
+    # Nothing to carry forward before the first valid close
+    keep = ~np.isnan(close)
+    report['dropped_rows'] = int((~keep).sum())
+    if report['dropped_rows']:
+        df = df[keep]
+        repaired = repaired[keep]
+        gap = gap[keep]
+
+    report['zero_volume'] = int(((df['Volume'].to_numpy() == 0) & ~gap).sum())
+    report['rows_out'] = len(df)
+    report['repaired_rows'] = int(repaired.sum())
+    report['score'] = round(1 - report['repaired_rows'] / len(df), 4) if len(df) else 0.0
+    return df, report
+
+def quality_rows(reports):
+    """Flatten quality reports into rows for the Data_Quality sheet"""
+    rows = []
+    for report in reports:
+        rows.append([report['ticker'], report['rows_in'], report['rows_out'], report['duplicates'],
+                     report['non_trading_rows'], report['gaps_filled'], report['invalid_prices'],
+                     len(report['splits']), report['bad_ticks'], report['wick_outliers'], report['ohlc_fixed'],
+                     report['zero_volume'], len(report['adjustment_anomalies']), report['score']])
+    return rows
+
+QUALITY_COLUMNS = ['Ticker', 'Rows In', 'Rows Out', 'Duplicates', 'Non-Trading Rows', 'Gaps Filled',
+                   'Invalid Prices', 'Splits', 'Bad Ticks', 'Wick Outliers', 'OHLC Fixed', 'Zero Volume',
+                   'Adjustment Anomalies', 'Score']
+
+class StreamingValidator:
+    """Per-bar validation for live feeds, O(1) per bar and per ticker
+
+    Keeps the last date, last close and an exponentially weighted robust
+    volatility for each ticker. A bar is rejected (None) if it is not newer
+    than the last one; otherwise it is repaired where that needs no
+    future data (missing/non-positive prices, High/Low consistency) and
+    flagged for everything else. Large moves are only flagged, since
+    telling a bad tick from a real move needs the next bar.
+    """
+
+    def __init__(self, k=8.0, halflife=20):
+        self.k = k
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.state = {}
+
+    def seed(self, ticker, df):
+        """Initialise a ticker's state from its (repaired) history"""
+        close = df['Close'].to_numpy(dtype=float)
+        moves = np.abs(np.diff(np.log(close[close > 0])))
+        moves = moves[moves > 0][-20:]
+        scale = float(np.median(moves) * 1.4826) if len(moves) else 0.02
+        self.state[ticker] = {'date': pd.Timestamp(df.index[-1]), 'close': float(close[-1]),
+                              'scale': max(scale, MIN_SCALE)}
+
+    def check(self, ticker, date, bar):
+        """Validate one bar (mapping with Open, High, Low, Close, Volume); returns (bar, flags)"""
+        date = pd.Timestamp(date)
+        state = self.state.get(ticker)
+        flags = []
+        if state is not None and date <= state['date']:
+            return None, ['stale_or_duplicate']
+        if date == date.normalize() and not is_trading_day(date):
+            flags.append('non_trading_day')
+
+        o, h, l, c = (float(bar.get(col, math.nan)) for col in PRICE_COLUMNS)
+        v = float(bar.get('Volume', 0.0))
+        last_close = state['close'] if state is not None else None
+        if not c > 0:
+            if last_close is None:
+                return None, flags + ['invalid_price']
+            c = last_close
+            flags.append('invalid_price')
+        if not o > 0:
+            o = c
+        if not h > 0:
+            h = max(o, c)
+        if not l > 0:
+            l = min(o, c)
+        if h < max(o, c) or l > min(o, c):
+            h, l = max(h, o, c), min(l, o, c)
+            flags.append('ohlc_fixed')
+        if not v > 0:
+            v = 0.0
+            flags.append('zero_volume')
+
+        if state is not None:
+            log_ret = math.log(c / last_close)
+            if abs(log_ret) > self.k * state['scale']:
+                ratio = float(_nearest_split(np.array([-log_ret]))[0])
+                flags.append('split_suspect' if not math.isnan(ratio) else 'outlier')
+            elif log_ret != 0:
+                state['scale'] += self.alpha * (abs(log_ret) * 1.4826 - state['scale'])
+                state['scale'] = max(state['scale'], MIN_SCALE)
+            state['date'], state['close'] = date, c
+        else:
+            self.state[ticker] = {'date': date, 'close': c, 'scale': 0.02}
+
+        return dict(bar, Open=o, High=h, Low=l, Close=c, Volume=v), flags
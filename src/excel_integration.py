@@ -6,7 +6,6 @@ Handles reading from and writing to Excel files
 
 import pandas as pd
 import os
-from datetime import datetime
 from utils import get_logger
 
 logger = get_logger(__name__)
@@ -51,34 +50,38 @@ class ExcelManager:
     
     def write_sheet(self, sheet_name, df):
         """Write data to a specific sheet in the Excel file"""
+        return self.write_sheets({sheet_name: df})
+    
+    def write_sheets(self, frames):
+        """Write several sheets (name -> DataFrame) in one open/save of the Excel file"""
         try:
-            # Clean the DataFrame
-            df = df.fillna("")
-            
             # Write to Excel file with better formatting
             with pd.ExcelWriter(self.file_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # Get the worksheet to apply formatting
-                worksheet = writer.sheets[sheet_name]
-                
-                # Auto-adjust column widths
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
+                for sheet_name, df in frames.items():
+                    # Clean the DataFrame
+                    df = df.fillna("")
+                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+                    
+                    # Get the worksheet to apply formatting
+                    worksheet = writer.sheets[sheet_name]
+                    
+                    # Auto-adjust column widths
+                    for column in worksheet.columns:
+                        max_length = 0
+                        column_letter = column[0].column_letter
+                        for cell in column:
+                            try:
+                                if len(str(cell.value)) > max_length:
+                                    max_length = len(str(cell.value))
+                            except:
+                                pass
+                        adjusted_width = min(max_length + 2, 50)
+                        worksheet.column_dimensions[column_letter].width = adjusted_width
             
-            logger.info(f"Updated sheet {sheet_name} in {self.file_path}")
+            logger.info(f"Updated sheets {', '.join(frames)} in {self.file_path}")
             return True
         except Exception as e:
-            logger.error(f"Error writing to sheet {sheet_name}: {e}")
+            logger.error(f"Error writing to sheets {', '.join(frames)}: {e}")
             return False
     
     def append_trade(self, trade_data):
@@ -108,54 +111,6 @@ class ExcelManager:
             logger.error(f"Error appending trade: {e}")
             return False
     
-    def update_summary(self, summary_dict):
-        """Update the Summary sheet with new metrics"""
-        try:
-            # Create summary DataFrame
-            summary_data = []
-            for metric, value in summary_dict.items():
-                summary_data.append({'Metric': metric, 'Value': str(value)})
-            
-            summary_df = pd.DataFrame(summary_data)
-            return self.write_sheet('Summary', summary_df)
-        except Exception as e:
-            logger.error(f"Error updating summary: {e}")
-            return False
-    
-    def update_analytics(self, analytics_data):
-        """Update the Analytics sheet with ML results"""
-        try:
-            # Convert analytics data to DataFrame
-            if 'ml_results' in analytics_data:
-                ml_data = []
-                for ticker, result in analytics_data['ml_results'].items():
-                    # Extract prediction data safely
-                    prediction_data = result.get('prediction', {})
-                    if isinstance(prediction_data, dict):
-                        prediction = prediction_data.get("prediction", "N/A")
-                        up_prob = prediction_data.get("up_probability", 0)
-                        down_prob = prediction_data.get("down_probability", 0)
-                    else:
-                        prediction = "N/A"
-                        up_prob = 0
-                        down_prob = 0
-                    
-                    ml_data.append({
-                        'Ticker': ticker,
-                        'Accuracy': f"{result.get('accuracy', 0):.3f}",
-                        'Prediction': prediction,
-                        'Up_Prob': f"{up_prob:.3f}",
-                        'Down_Prob': f"{down_prob:.3f}",
-                        'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                
-                analytics_df = pd.DataFrame(ml_data)
-                return self.write_sheet('Analytics', analytics_df)
-            return True
-        except Exception as e:
-            logger.error(f"Error updating analytics: {e}")
-            return False
-    
     def get_trade_count(self):
         """Get the current number of trades in the log"""
         try:
@@ -0,0 +1,316 @@
+"""
+Feature store for the ML model
+Computes an extended feature set from indicator frames once per new bar
+and keeps it per ticker as a versioned columnar matrix on disk. Training
+matrices and latest-row vectors are served as views of a memory-mapped
+file, and any change to a feature definition starts a new version.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+from functools import partial
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+class FeatureDef:
+    """A named feature: func(columns) -> array, needing `lookback` earlier bars
+
+    `columns` maps each column of the indicator frame to a float array.
+    """
+
+    def __init__(self, name, func, lookback=0, **params):
+        self.name = name
+        self.func = func
+        self.lookback = lookback
+        self.params = params
+        try:
+            source = inspect.getsource(func)
+        except (OSError, TypeError):
+            source = func.__qualname__
+        payload = json.dumps([name, lookback, sorted(params.items()), source], default=str)
+        self.hash = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    def compute(self, columns):
+        return self.func(columns, **self.params)
+
+# Registered feature definitions, in column order
+FEATURES = {}
+
+def register_feature(name, func, lookback=0, registry=None, **params):
+    """Add (or replace) a feature definition; returns it"""
+    registry = FEATURES if registry is None else registry
+    feature = FeatureDef(name, func, lookback, **params)
+    registry[name] = feature
+    return feature
+
+def feature_set_version(registry=None):
+    """Hash of every definition in the registry; changes whenever any feature does"""
+    registry = FEATURES if registry is None else registry
+    digest = hashlib.sha1("|".join(f"{name}:{f.hash}" for name, f in registry.items()).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+def _shifted(values, periods):
+    out = np.full(len(values), np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+def _rolling(values, window, func):
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = func(sliding_window_view(values, window), axis=1)
+    return out
+
+def _column(data, column):
+    return data[column]
+
+def _lag(data, column, periods):
+    return _shifted(data[column], periods)
+
+def _returns(data, periods):
+    return data['Close'] / _shifted(data['Close'], periods) - 1
+
+def _return_lag(data, periods):
+    return _shifted(_returns(data, 1), periods)
+
+def _volatility(data, window):
+    return _rolling(_returns(data, 1), window, partial(np.std, ddof=1))
+
+def _volume_zscore(data, window):
+    volume = data['Volume']
+    return (volume - _rolling(volume, window, np.mean)) / _rolling(volume, window, partial(np.std, ddof=1))
+
+def _macd_hist(data):
+    return data['MACD'] - data['MACD_SIGNAL']
+
+def _range_pct(data):
+    return (data['High'] - data['Low']) / data['Close']
+
+for _name in ['RSI', 'MACD', 'MACD_SIGNAL', 'SMA_diff', 'Volume']:
+    register_feature(_name, _column, column=_name)
+register_feature('MACD_hist', _macd_hist)
+register_feature('range_pct', _range_pct)
+for _periods in (1, 5, 10):
+    register_feature(f'return_{_periods}', _returns, lookback=_periods, periods=_periods)
+for _periods in (1, 2, 3):
+    register_feature(f'return_1_lag{_periods}', _return_lag, lookback=_periods + 1, periods=_periods)
+for _periods in (1, 2):
+    register_feature(f'RSI_lag{_periods}', _lag, lookback=_periods, column='RSI', periods=_periods)
+for _window in (10, 20):
+    register_feature(f'volatility_{_window}', _volatility, lookback=_window, window=_window)
+register_feature('volume_z_20', _volume_zscore, lookback=19, window=20)
+
+TARGET_COLUMN = 'target'
+
+# Held for every update, so a scan and a retrain in another lane never write at once
+_write_lock = threading.Lock()
+
+class FeatureStore:
+    """Versioned per-ticker feature matrices under `root/<ticker>/<version>/`
+
+    Each version directory holds features.npy (rows x features, then the
+    target column), index.npy (bar dates as int64 ns) and meta.json. The
+    .npy files are preallocated and grown by doubling, so a new bar is
+    written in place; meta.json is replaced last and holds the row count.
+    On update only the bars after the last stored one (plus the last
+    stored bar, whose target becomes known) are computed, from a tail of
+    the frame long enough for every feature's lookback. When only the
+    last stored bar's close changed (a bar still forming), that bar and
+    the target before it are rewritten. The ticker is rebuilt from
+    scratch when the frame starts before the stored history, when earlier
+    closes changed (history was re-adjusted) or when the feature
+    definitions changed. Updates from different threads run one at a time.
+    """
+
+    def __init__(self, root="feature_store", registry=None):
+        self.root = root
+        self.registry = FEATURES if registry is None else registry
+        self.version = feature_set_version(self.registry)
+        self.columns = list(self.registry)
+        self.lookback = max((f.lookback for f in self.registry.values()), default=0)
+        self._open = {}
+
+    def _dir(self, ticker):
+        return os.path.join(self.root, ticker, self.version)
+
+    def _meta(self, ticker):
+        path = os.path.join(self._dir(ticker), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            meta = json.load(f)
+        if meta.get('columns') != self.columns:
+            return None
+        return meta
+
+    def _write_meta(self, ticker, meta):
+        path = os.path.join(self._dir(ticker), 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def _arrays(self, ticker, meta, mode='r'):
+        """Memory-mapped (matrix, index) for a ticker, reopened when the file changed"""
+        cached = self._open.get(ticker)
+        if cached is not None and cached[0] == meta['capacity'] and (mode == 'r' or cached[1] == 'r+'):
+            return cached[2], cached[3]
+        directory = self._dir(ticker)
+        matrix = np.load(os.path.join(directory, 'features.npy'), mmap_mode=mode)
+        index = np.load(os.path.join(directory, 'index.npy'), mmap_mode=mode)
+        self._open[ticker] = (meta['capacity'], mode, matrix, index)
+        return matrix, index
+
+    def _allocate(self, ticker, capacity, old=None, rows=0):
+        """Create (or grow into) preallocated files with room for `capacity` rows"""
+        directory = self._dir(ticker)
+        os.makedirs(directory, exist_ok=True)
+        self._open.pop(ticker, None)
+        paths = {}
+        for name, shape, dtype in (('features', (capacity, len(self.columns) + 1), np.float64),
+                                   ('index', (capacity,), np.int64)):
+            tmp = os.path.join(directory, f'{name}.tmp.npy')
+            array = np.lib.format.open_memmap(tmp, mode='w+', dtype=dtype, shape=shape)
+            if old is not None and rows:
+                array[:rows] = old[name][:rows]
+            array.flush()
+            del array
+            paths[name] = tmp
+        for name, tmp in paths.items():
+            os.replace(tmp, os.path.join(directory, f'{name}.npy'))
+
+    def _prune(self, ticker):
+        """Remove versions of a ticker built from other feature definitions"""
+        base = os.path.join(self.root, ticker)
+        if os.path.isdir(base):
+            for version in os.listdir(base):
+                if version != self.version:
+                    shutil.rmtree(os.path.join(base, version), ignore_errors=True)
+
+    def compute(self, df):
+        """Feature matrix (with target column) for a frame, as a float64 array"""
+        columns = {column: df[column].to_numpy(dtype=float) for column in df.columns}
+        matrix = np.empty((len(df), len(self.columns) + 1))
+        for j, feature in enumerate(self.registry.values()):
+            matrix[:, j] = feature.compute(columns)
+        close = columns['Close']
+        target = np.full(len(df), np.nan)
+        target[:-1] = (close[1:] > close[:-1]).astype(float)
+        matrix[:, -1] = target
+        matrix[~np.isfinite(matrix)] = np.nan
+        return matrix
+
+    def update(self, ticker, df):
+        """Bring a ticker's features up to date with an indicator frame; returns rows written"""
+        with _write_lock:
+            return self._update(ticker, df)
+
+    def _update(self, ticker, df):
+        meta = self._meta(ticker)
+        dates = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        close = df['Close'].to_numpy(dtype=float)
+
+        start, offset = 0, 0
+        if meta is not None and meta['rows']:
+            matrix, index = self._arrays(ticker, meta)
+            stored = meta['rows']
+            last = int(index[stored - 1])
+            pos = int(np.searchsorted(dates, last))
+            if pos == len(dates) or dates[pos] != last or dates[0] < int(index[0]):
+                # The frame no longer contains the last stored bar, or reaches further back than the store
+                meta = None
+            elif close[pos] == meta['last_close']:
+                if pos == len(dates) - 1:
+                    return 0
+                start = stored - 1
+            elif stored > 1 and pos > 0 and dates[pos - 1] == int(index[stored - 2]) and close[pos - 1] == meta.get('prev_close'):
+                # Only the last stored bar moved (it was still forming): rewrite it and the target before it
+                start = stored - 2
+            else:
+                # History was re-adjusted
+                meta = None
+            if meta is not None:
+                offset = pos - (stored - 1)
+        if meta is None:
+            self._prune(ticker)
+            self._allocate(ticker, max(256, 2 * len(df)))
+            meta = {'version': self.version, 'columns': self.columns,
+                    'definitions': {name: f.hash for name, f in self.registry.items()},
+                    'rows': 0, 'capacity': max(256, 2 * len(df)), 'first_valid': None, 'last_close': None}
+
+        # Compute only the new rows, from a tail long enough for every lookback
+        first_new = start + offset
+        tail_start = max(first_new - self.lookback, 0)
+        values = self.compute(df.iloc[tail_start:])[first_new - tail_start:]
+        rows = start + len(values)
+
+        if rows > meta['capacity']:
+            matrix, index = self._arrays(ticker, meta)
+            capacity = max(2 * meta['capacity'], rows)
+            self._allocate(ticker, capacity, {'features': matrix, 'index': index}, meta['rows'])
+            meta['capacity'] = capacity
+        matrix, index = self._arrays(ticker, meta, mode='r+')
+        matrix[start:rows] = values
+        index[start:rows] = dates[first_new:]
+        matrix.flush()
+        index.flush()
+
+        if meta['first_valid'] is None or meta['first_valid'] >= start:
+            complete = np.flatnonzero(~np.isnan(matrix[:rows, :-1]).any(axis=1))
+            meta['first_valid'] = int(complete[0]) if len(complete) else None
+        meta['rows'] = rows
+        meta['last_close'] = float(close[-1])
+        meta['prev_close'] = float(close[-2]) if len(close) > 1 else None
+        self._write_meta(ticker, meta)
+        return len(values)
+
+    def training_matrix(self, ticker):
+        """(dates, X, y) for every bar with complete features and a known target
+
+        X and y are read-only views into the memory-mapped store.
+        """
+        meta = self._meta(ticker)
+        if meta is None or meta['first_valid'] is None or meta['rows'] - 1 <= meta['first_valid']:
+            return None
+        matrix, index = self._arrays(ticker, meta)
+        rows = slice(meta['first_valid'], meta['rows'] - 1)
+        X, y = matrix[rows, :-1], matrix[rows, -1]
+        X.flags.writeable = False
+        y.flags.writeable = False
+        return pd.DatetimeIndex(index[rows].astype('datetime64[ns]')), X, y
+
+    def training_set(self, ticker):
+        """Training matrix as (features DataFrame, target Series), sharing memory with the store"""
+        served = self.training_matrix(ticker)
+        if served is None:
+            return pd.DataFrame(columns=self.columns, dtype=float), pd.Series(dtype=float)
+        dates, X, y = served
+        return (pd.DataFrame(X, index=dates, columns=self.columns, copy=False),
+                pd.Series(y, index=dates, name=TARGET_COLUMN, copy=False))
+
+    def latest_vector(self, ticker):
+        """(date, x) for the latest bar; x is a view into the store"""
+        meta = self._meta(ticker)
+        if meta is None or not meta['rows']:
+            return None
+        matrix, index = self._arrays(ticker, meta)
+        row = meta['rows'] - 1
+        x = matrix[row, :-1]
+        x.flags.writeable = False
+        return pd.Timestamp(int(index[row])), x
+
+    def latest_frame(self, tickers):
+        """Latest feature row of many tickers as a (Ticker, Date) frame, like stack_features"""
+        rows, keys = [], []
+        for ticker in tickers:
+            latest = self.latest_vector(ticker)
+            if latest is not None and not np.isnan(latest[1]).any():
+                keys.append((ticker, latest[0]))
+                rows.append(latest[1])
+        index = pd.MultiIndex.from_tuples(keys, names=['Ticker', 'Date']) if keys else \
+            pd.MultiIndex.from_arrays([[], []], names=['Ticker', 'Date'])
+        return pd.DataFrame(np.array(rows).reshape(len(rows), len(self.columns)), index=index, columns=self.columns)
@@ -1,17 +1,37 @@
 import pandas as pd
 import numpy as np
 
+def rolling_mean(values, window):
+    """Trailing mean of exactly `window` values, NaN until the window is full
+
+    Every value is summed from its own window in a fixed order rather than
+    from a running total, so it depends on nothing before the window: a
+    series computed in chunks (with window - 1 bars of overlap) is
+    bit-identical to the whole series, and long histories do not drift.
+    It takes `window` vectorised passes, which up to a few thousand bars is
+    still faster than pandas' rolling mean (see bench_rolling_mean).
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    out = np.full(n, np.nan)
+    if window <= n:
+        total = values[window - 1:].copy()
+        for k in range(1, window):
+            total += values[window - 1 - k:n - k]
+        out[window - 1:] = total / window
+    return out
+
 def sma(series, window):
     """Calculate Simple Moving Average"""
-    return series.rolling(window).mean()
+    return pd.Series(rolling_mean(series.to_numpy(dtype=float), window), index=series.index, name=series.name)
 
 def compute_rsi(close, period=14):
     """Calculate Relative Strength Index"""
     delta = close.diff()
     gain = delta.clip(lower=0)
     loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=period, min_periods=period).mean()
-    avg_loss = loss.rolling(window=period, min_periods=period).mean()
+    avg_gain = sma(gain, period)
+    avg_loss = sma(loss, period)
     rs = avg_gain / avg_loss
     rsi = 100 - (100 / (1 + rs))
     return rsi
@@ -39,3 +59,29 @@ def add_indicators(df):
     df['MACD'], df['MACD_SIGNAL'] = compute_macd(df['Close'])
     df['SMA_diff'] = df['SMA20'] - df['SMA50']
     return df
+
+def compute_atr(df, period=14):
+    """Calculate Average True Range"""
+    prev_close = df['Close'].shift(1)
+    true_range = pd.concat([
+        df['High'] - df['Low'],
+        (df['High'] - prev_close).abs(),
+        (df['Low'] - prev_close).abs()
+    ], axis=1).max(axis=1)
+    return true_range.rolling(window=period, min_periods=period).mean()
+
+def segment_row_starts(groups):
+    """For rows sorted into contiguous segments (group codes), each row's segment start"""
+    groups = np.asarray(groups)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.empty(0, dtype=np.int64)
+    return np.repeat(starts, np.diff(np.r_[starts, len(groups)]))
+
+def segment_rolling_mean(values, row_starts, window):
+    """rolling_mean that never reaches back past a row's segment start; equals a per-segment rolling_mean"""
+    out = rolling_mean(values, window)
+    out[np.arange(len(out)) - row_starts < window - 1] = np.nan
+    return out
+
+def segment_ewm_mean(values, groups, span):
+    """EMA (adjust=False) restarted at every segment"""
+    return pd.Series(values).groupby(groups, sort=False).ewm(span=span, adjust=False).mean().to_numpy()
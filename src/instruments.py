@@ -0,0 +1,298 @@
+"""
+Multi-asset instrument model
+A symbol master assigns every instrument (equity, index, future or
+option) a dense integer id and indexes it by symbol and by underlying.
+A SeriesStore keeps the bars of any number of instruments in shared
+column arrays sorted by (instrument id, timestamp), so the indicator and
+strategy pipeline runs over the whole universe in one vectorised pass
+instead of once per DataFrame.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from indicators import segment_rolling_mean, segment_ewm_mean
+from strategy import RULE_STRATEGY
+from strategy_engine import compile_strategies
+
+EQUITY = 'EQ'
+INDEX = 'IDX'
+FUTURE = 'FUT'
+CALL = 'CE'
+PUT = 'PE'
+KINDS = (EQUITY, INDEX, FUTURE, CALL, PUT)
+
+MASTER_COLUMNS = ['instrument_id', 'symbol', 'kind', 'underlying', 'expiry', 'strike', 'lot_size']
+OHLCV_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+class Instrument:
+    """One tradable instrument; expiry and strike are None where they do not apply"""
+
+    __slots__ = ('instrument_id', 'symbol', 'kind', 'underlying', 'expiry', 'strike', 'lot_size')
+
+    def __init__(self, instrument_id, symbol, kind=EQUITY, underlying=None, expiry=None, strike=None, lot_size=1):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown instrument kind {kind!r}")
+        if kind in (FUTURE, CALL, PUT) and expiry is None:
+            raise ValueError(f"{symbol}: derivatives need an expiry")
+        if kind in (CALL, PUT) and strike is None:
+            raise ValueError(f"{symbol}: options need a strike")
+        self.instrument_id = instrument_id
+        self.symbol = symbol
+        self.kind = kind
+        self.underlying = underlying or symbol
+        self.expiry = expiry
+        self.strike = strike
+        self.lot_size = lot_size
+
+    def __repr__(self):
+        return f"Instrument({self.instrument_id}, {self.symbol!r}, {self.kind})"
+
+def derivative_symbol(underlying, expiry, kind, strike=None):
+    """NSE-style trading symbol, e.g. NIFTY24MARFUT or NIFTY24MAR22000CE"""
+    stem = f"{underlying}{expiry:%y%b}".upper()
+    if kind == FUTURE:
+        return f"{stem}FUT"
+    return f"{stem}{strike:g}{kind}"
+
+class SymbolMaster:
+    """Every known instrument, looked up by id, symbol or underlying
+
+    Ids are assigned densely in registration order, so they index arrays
+    directly; registering a symbol again returns the existing instrument.
+    """
+
+    def __init__(self):
+        self.instruments = []
+        self._by_symbol = {}
+        self._by_underlying = {}
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def __iter__(self):
+        return iter(self.instruments)
+
+    def __contains__(self, symbol):
+        return symbol in self._by_symbol
+
+    def __getitem__(self, key):
+        """Instrument by id (int) or symbol (str)"""
+        if isinstance(key, (int, np.integer)):
+            return self.instruments[key]
+        return self._by_symbol[key]
+
+    def add(self, symbol, kind=EQUITY, underlying=None, expiry=None, strike=None, lot_size=1):
+        """Register an instrument (or return the one already under this symbol)"""
+        existing = self._by_symbol.get(symbol)
+        if existing is not None:
+            return existing
+        instrument = Instrument(len(self.instruments), symbol, kind, underlying, expiry, strike, lot_size)
+        self.instruments.append(instrument)
+        self._by_symbol[symbol] = instrument
+        self._by_underlying.setdefault(instrument.underlying, []).append(instrument)
+        return instrument
+
+    def add_future(self, underlying, expiry, lot_size=1):
+        return self.add(derivative_symbol(underlying, expiry, FUTURE), FUTURE, underlying, expiry, None, lot_size)
+
+    def add_option(self, underlying, expiry, strike, kind, lot_size=1):
+        return self.add(derivative_symbol(underlying, expiry, kind, strike), kind, underlying, expiry, strike, lot_size)
+
+    def for_underlying(self, underlying, kind=None, expiry=None, as_of=None):
+        """Instruments on an underlying, optionally one kind or expiry, skipping those expired before as_of"""
+        found = [i for i in self._by_underlying.get(underlying, ())
+                 if (kind is None or i.kind == kind) and (expiry is None or i.expiry == expiry)
+                 and (as_of is None or i.expiry is None or i.expiry >= as_of)]
+        return sorted(found, key=lambda i: (KINDS.index(i.kind), i.expiry or date.min, i.strike or 0.0))
+
+    def expiries(self, underlying, as_of=None):
+        """Sorted expiry dates of an underlying's derivatives"""
+        return sorted({i.expiry for i in self.for_underlying(underlying, as_of=as_of) if i.expiry is not None})
+
+    def chain(self, underlying, expiry):
+        """Option chain as a strikes x (CE, PE) frame of instrument ids (-1 where a side is missing)"""
+        chain = {}
+        for instrument in self.for_underlying(underlying, expiry=expiry):
+            if instrument.kind in (CALL, PUT):
+                chain.setdefault(instrument.strike, {CALL: -1, PUT: -1})[instrument.kind] = instrument.instrument_id
+        frame = pd.DataFrame.from_dict(chain, orient='index', columns=[CALL, PUT]).sort_index()
+        frame.index.name = 'strike'
+        return frame.astype(np.int64)
+
+    def to_frame(self):
+        """The master as a frame with MASTER_COLUMNS"""
+        return pd.DataFrame([[getattr(i, c) for c in MASTER_COLUMNS] for i in self.instruments], columns=MASTER_COLUMNS)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Master from a frame with MASTER_COLUMNS, keeping its ids"""
+        master = cls()
+        for row in frame.sort_values('instrument_id').itertuples(index=False):
+            if row.instrument_id != len(master):
+                raise ValueError(f"Symbol master ids must run 0..n-1, found {row.instrument_id} at {len(master)}")
+            expiry = pd.Timestamp(row.expiry).date() if pd.notna(row.expiry) else None
+            strike = float(row.strike) if pd.notna(row.strike) else None
+            master.add(row.symbol, row.kind, row.underlying, expiry, strike, int(row.lot_size))
+        return master
+
+    @classmethod
+    def from_tickers(cls, tickers):
+        """Master of plain equities, e.g. the configured TICKERS"""
+        master = cls()
+        for ticker in tickers:
+            master.add(ticker)
+        return master
+
+def load_symbol_master(path):
+    """Symbol master from a CSV written by save_symbol_master"""
+    return SymbolMaster.from_frame(pd.read_csv(path, keep_default_na=False, na_values=['']))
+
+def save_symbol_master(master, path):
+    master.to_frame().to_csv(path, index=False)
+
+class SeriesStore:
+    """Bars of many instruments held in shared column arrays
+
+    Rows are sorted by instrument id then timestamp, so each instrument's
+    history is one contiguous slice of every column. Bars added with put
+    are merged on next read; a bar for an existing (instrument, timestamp)
+    replaces it. Derived columns (indicators) are dropped on every merge.
+    """
+
+    def __init__(self, fields=OHLCV_FIELDS):
+        self.fields = list(fields)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.timestamps = np.empty(0, dtype='datetime64[ns]')
+        self._columns = {field: np.empty(0) for field in self.fields}
+        self._pending = []
+        self._index()
+
+    def put(self, instrument_id, df):
+        """Queue an instrument's bars (a Date-indexed frame with some of the fields)"""
+        if isinstance(df.columns, pd.MultiIndex):
+            df = df.copy()
+            df.columns = df.columns.get_level_values(0)
+        n = len(df)
+        columns = {field: df[field].to_numpy(dtype=float) if field in df.columns else np.full(n, np.nan)
+                   for field in self.fields}
+        timestamps = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]')
+        self._pending.append((np.full(n, instrument_id, dtype=np.int64), timestamps, columns))
+        return self
+
+    @classmethod
+    def from_frames(cls, frames, fields=OHLCV_FIELDS):
+        """Store from instrument id -> frame"""
+        store = cls(fields)
+        for instrument_id, df in frames.items():
+            store.put(instrument_id, df)
+        return store
+
+    @classmethod
+    def from_arrays(cls, ids, timestamps, columns):
+        """Store over existing arrays already sorted by (id, timestamp), without copying them"""
+        store = cls(list(columns))
+        store.ids = ids
+        store.timestamps = timestamps
+        store._columns = dict(columns)
+        store._index()
+        return store
+
+    def _merge(self):
+        if not self._pending:
+            return
+        ids = np.concatenate([self.ids] + [p[0] for p in self._pending])
+        timestamps = np.concatenate([self.timestamps] + [p[1] for p in self._pending])
+        order = np.lexsort((timestamps, ids))
+        ids, timestamps = ids[order], timestamps[order]
+        # Stable sort keeps arrival order among duplicates; the last one wins
+        keep = np.ones(len(ids), dtype=bool)
+        keep[:-1] = (ids[1:] != ids[:-1]) | (timestamps[1:] != timestamps[:-1])
+        self.ids, self.timestamps = ids[keep], timestamps[keep]
+        self._columns = {field: np.concatenate([self._columns[field]] + [p[2][field] for p in self._pending])[order][keep]
+                         for field in self.fields}
+        self._pending = []
+        self._index()
+
+    def _index(self):
+        boundaries = np.flatnonzero(np.diff(self.ids)) + 1
+        self.starts = np.concatenate(([0], boundaries)) if len(self.ids) else np.empty(0, dtype=np.int64)
+        self.ends = np.concatenate((boundaries, [len(self.ids)])) if len(self.ids) else np.empty(0, dtype=np.int64)
+        self.instrument_ids = self.ids[self.starts]
+        self._slots = {int(i): k for k, i in enumerate(self.instrument_ids)}
+        self._groups = np.repeat(np.arange(len(self.starts)), self.ends - self.starts)
+        self._row_starts = np.repeat(self.starts, self.ends - self.starts)
+
+    @property
+    def columns(self):
+        """Field -> array over every row"""
+        self._merge()
+        return self._columns
+
+    def __len__(self):
+        self._merge()
+        return len(self.ids)
+
+    def __contains__(self, instrument_id):
+        self._merge()
+        return instrument_id in self._slots
+
+    @property
+    def nbytes(self):
+        self._merge()
+        return self.ids.nbytes + self.timestamps.nbytes + sum(a.nbytes for a in self._columns.values())
+
+    def rows(self, instrument_id):
+        """Slice of the rows holding one instrument's bars"""
+        self._merge()
+        k = self._slots[instrument_id]
+        return slice(self.starts[k], self.ends[k])
+
+    def get(self, instrument_id, field):
+        """One instrument's values of a field (a view, not a copy)"""
+        return self.columns[field][self.rows(instrument_id)]
+
+    def frame(self, instrument_id, fields=None):
+        """One instrument's bars as a Date-indexed frame, for code that needs a DataFrame"""
+        rows = self.rows(instrument_id)
+        fields = fields or list(self._columns)
+        return pd.DataFrame({f: self._columns[f][rows] for f in fields},
+                            index=pd.DatetimeIndex(self.timestamps[rows], name='Date'))
+
+    def add_indicators(self):
+        """Add the add_indicators columns for every instrument at once"""
+        self._merge()
+        close = self._columns['Close']
+        sma20 = segment_rolling_mean(close, self._row_starts, 20)
+        sma50 = segment_rolling_mean(close, self._row_starts, 50)
+
+        delta = np.empty_like(close)
+        delta[1:] = close[1:] - close[:-1]
+        delta[self.starts] = np.nan
+        avg_gain = segment_rolling_mean(np.maximum(delta, 0), self._row_starts, 14)
+        avg_loss = segment_rolling_mean(-np.minimum(delta, 0), self._row_starts, 14)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        macd = segment_ewm_mean(close, self._groups, 12) - segment_ewm_mean(close, self._groups, 26)
+        self._columns.update({
+            'SMA20': sma20, 'SMA50': sma50, 'RSI': rsi, 'MACD': macd,
+            'MACD_SIGNAL': segment_ewm_mean(macd, self._groups, 9), 'SMA_diff': sma20 - sma50,
+        })
+        return self
+
+    def signals(self, strategies=RULE_STRATEGY):
+        """Strategy name -> 'BUY'/'SELL'/None for every row, evaluated across all instruments in one pass"""
+        compiled = compile_strategies(strategies)
+        return compiled.evaluate(self.columns, groups=self._groups)
+
+    def latest(self, fields=None):
+        """Each instrument's last bar as an instrument id -> fields frame"""
+        self._merge()
+        last = self.ends - 1
+        fields = fields or list(self._columns)
+        frame = pd.DataFrame({f: self._columns[f][last] for f in fields}, index=pd.Index(self.instrument_ids, name='instrument_id'))
+        frame.insert(0, 'Date', self.timestamps[last])
+        return frame
@@ -0,0 +1,195 @@
+"""
+Alert path latency tracing
+Each ticker's trip through a scan carries monotonic timestamps taken at
+fetch, indicators, signal, risk, log-write and alert-send, and each
+signal knows when its bar closed, so an alert's age is measured from the
+market data and not only from the fetch. Finished traces feed per-stage
+latency percentiles. The slow optional writes (Google Sheets, the Excel
+rewrite) always wait until the alerts have gone out, and a latency
+budget decides whether they then run inline or in the background.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from market_calendar import MARKET_CLOSE
+from metrics import ALERT_LATENCY
+from scheduler import IST, ist_now
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+# Stages in the order a signal passes them
+STAGES = ('fetch', 'indicators', 'signal', 'risk', 'alert', 'log')
+
+PERCENTILES = (50, 95, 99)
+
+def bar_close_time(timestamp, interval='1d'):
+    """Exchange-local time a bar closed: the session close for daily bars, else its start plus the interval"""
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert(IST).tz_localize(None)
+    if timestamp == timestamp.normalize():
+        return datetime.combine(timestamp.date(), MARKET_CLOSE)
+    return (timestamp + pd.to_timedelta(interval)).to_pydatetime()
+
+def format_age(seconds):
+    """Short age such as 45s, 12m or 3h05m; '-' when unknown"""
+    if seconds is None:
+        return '-'
+    seconds = int(max(seconds, 0))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+class LatencyTrace:
+    """Monotonic timestamps of one ticker or signal along the alert path
+
+    `bar_close` is the exchange-local time the signal's bar closed. The
+    wall clock is read once, so every mark can also be placed in
+    exchange time to measure how stale the data was at that point.
+    """
+
+    def __init__(self, clock=time.monotonic, wall_clock=ist_now, bar_close=None):
+        self.clock = clock
+        self.bar_close = bar_close
+        self.marks = []
+        self._origin = (clock(), wall_clock())
+
+    def mark(self, stage, at=None):
+        """Record that `stage` finished now (or at monotonic time `at`)"""
+        self.marks.append((stage, self.clock() if at is None else at))
+        return self
+
+    def fork(self, bar_close=None):
+        """Copy for one signal of a ticker, so its bar close and its later marks stay its own"""
+        trace = LatencyTrace(self.clock, bar_close=bar_close if bar_close is not None else self.bar_close)
+        trace._origin = self._origin
+        trace.marks = list(self.marks)
+        return trace
+
+    def wall_time(self, at):
+        """Exchange-local time of monotonic time `at`"""
+        return self._origin[1] + timedelta(seconds=at - self._origin[0])
+
+    def bar_age(self, stage=None):
+        """Seconds from the bar close to a stage's mark (default now); None without a bar close"""
+        if self.bar_close is None:
+            return None
+        at = dict(self.marks)[stage] if stage is not None else self.clock()
+        return (self.wall_time(at) - self.bar_close).total_seconds()
+
+    def elapsed(self):
+        """Seconds since the first mark"""
+        return self.clock() - self.marks[0][1] if self.marks else 0.0
+
+    def stages(self):
+        """Stage -> seconds since the previous mark, in the order marked"""
+        return {stage: at - prev for (_, prev), (stage, at) in zip(self.marks, self.marks[1:])}
+
+    def total(self):
+        """Seconds from the first mark to the last"""
+        return self.marks[-1][1] - self.marks[0][1] if self.marks else 0.0
+
+    def over_budget(self, budget):
+        """True once more than `budget` seconds have passed since the first mark (a budget of 0 never expires)"""
+        return budget > 0 and self.elapsed() > budget
+
+    def describe(self):
+        return " | ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in self.stages().items())
+
+class LatencyTracker:
+    """Rolling per-stage latency samples from finished traces
+
+    Keeps the last `window` samples of every stage, the end-to-end total
+    and the bar age at alert send for exact percentiles, and observes each
+    one in the ALERT_LATENCY histogram for the metrics endpoint.
+    """
+
+    def __init__(self, window=1000, histogram=ALERT_LATENCY):
+        self.window = window
+        self.histogram = histogram
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        samples = dict(trace.stages(), total=trace.total())
+        if trace.bar_close is not None and 'alert' in dict(trace.marks):
+            samples['bar_age'] = trace.bar_age('alert')
+        with self._lock:
+            for stage, seconds in samples.items():
+                self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+        if self.histogram is not None:
+            for stage, seconds in samples.items():
+                self.histogram.observe(seconds, stage=stage)
+
+    def percentiles(self, stage, percentiles=PERCENTILES):
+        """{'p50': seconds, ...} over the stage's recent samples; None without samples"""
+        with self._lock:
+            samples = np.array(self._samples.get(stage, ()))
+        if not len(samples):
+            return None
+        return {f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(samples, percentiles))}
+
+    def summary(self):
+        """Stage -> percentiles and sample count, path stages first"""
+        with self._lock:
+            stages = sorted(self._samples, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES))
+            counts = {stage: len(self._samples[stage]) for stage in stages}
+        return {stage: dict(self.percentiles(stage), count=counts[stage]) for stage in stages}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+class DeferredWrites:
+    """Optional writes (Google Sheets, Excel) held back until the alerts have gone out
+
+    flush() runs them once the alerts are sent: inline while every queued
+    signal is within the latency budget, or on a background thread once
+    any is over it, so the rest of a late scan does not wait on the I/O
+    either. wait() joins that thread.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.pending = []
+        self._thread = None
+
+    def submit(self, trace, func, *args, **kwargs):
+        """Queue func to run after the alerts"""
+        self.pending.append((trace, func, args, kwargs))
+
+    def flush(self):
+        """Run the queued writes; returns True if they ran inline, False if on a background thread"""
+        pending, self.pending = self.pending, []
+        if any(trace.over_budget(self.budget) for trace, _, _, _ in pending):
+            self._thread = threading.Thread(target=self._run, args=(pending,), name='deferred-writes', daemon=True)
+            self._thread.start()
+            return False
+        self._run(pending)
+        return True
+
+    def wait(self):
+        """Wait for writes flushed to the background thread"""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, pending):
+        for trace, func, args, kwargs in pending:
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Deferred write failed: {e}", extra={'stage': 'signal'})
+            trace.mark('log')
+
+# Global tracker, shared by the scans of one process
+latency_tracker = LatencyTracker()
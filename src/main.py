@@ -1,30 +1,128 @@
+import asyncio
 import time
 import pandas as pd
 from datetime import datetime
 
-from config import TICKERS
-from data_fetch import fetch_data
-from indicators import add_indicators
+from config import (TICKERS, ROBUSTNESS_SIMS, FETCH_CONCURRENCY, FETCH_TIMEOUT, FETCH_RETRIES, METRICS_HOST, METRICS_PORT,
+                    SCREEN_BENCHMARK, SCREEN_TOP, SECTORS, RISK_CAPITAL, RISK_PER_TRADE, RISK_MAX_POSITION,
+                    RISK_MAX_SECTOR, RISK_MAX_CORRELATION, RISK_WINDOW, RISK_STATE_FILE, PAPER_DB, BACKTEST_STATE_FILE,
+                    FEATURE_STORE_DIR,
+                    TUNING_FILE, TUNING_JOBS, REPORT_HTML, SUBSCRIPTIONS_FILE, ALERT_WORKERS, TELEGRAM_CHAT_ID,
+                    ALERTED_SIGNALS_FILE, ALERT_LATENCY_BUDGET, SCHEDULE_PRE_OPEN, SCHEDULE_SCAN, SCHEDULE_EOD, SCHEDULE_RETRAIN, SCHEDULER_STATE_FILE)
+from data_fetch import fetch_data, fetch_many
+from indicators import add_indicators, compute_atr
 from strategy import generate_signals
-from backtest import backtest_signals
-from ml_model import prepare_features, train_and_eval, predict_next_day
-from sheets import init_sheets, append_trade, update_summary, update_analytics
+from backtest import (backtest_ml, resume_backtest, trades_since, load_backtest_states,
+                      save_backtest_states)
+from robustness import monte_carlo
+from ml_model import train_and_eval, predict_batch, predictions_by_ticker
+from feature_store import FeatureStore
+from tuning import tune, save_best_configs, load_best_configs
+from sheets import init_sheets, append_trade
 from excel_integration import excel_manager
-from telegram_alerts import send_signal_alert, send_summary_alert, send_error_alert
+from telegram_alerts import send_telegram_message, send_error_alert
+from subscriptions import SubscriptionRouter, AlertLog, load_subscribers
+from screener import IndicatorPanel, run_screens, screen_rows
+from risk import RollingCovariance, RiskEngine
+from paper_trading import PaperBroker
+from data_quality import repair_ohlcv, quality_rows, QUALITY_COLUMNS
+from scheduler import Scheduler, Job, parse_cadence, ist_now
+from latency import LatencyTrace, DeferredWrites, latency_tracker, bar_close_time, format_age
+from reporting import Report, ExcelSink, SheetsSink, HtmlSink, TelegramSink, ScreensSink, render_report
 from utils import get_logger, format_currency, format_percentage, validate_data
+from metrics import (FETCH_LATENCY, STAGE_DURATION, SCAN_DURATION, SIGNALS_EMITTED, SIGNALS_VETOED, VALIDATION_FAILURES,
+                     DATA_REPAIRS, IO_FAILURES, TICKERS_SCANNED, LAST_SCAN, start_metrics_server)
 
 logger = get_logger("mini-algo")
 
+def log_signal(trade_ws, ticker, idx, row, notes=""):
+    """Log one signal to Google Sheets and Excel (alerts go out through the subscription router)"""
+    SIGNALS_EMITTED.inc(signal=row['signal'])
+    date_str = idx.strftime("%Y-%m-%d")
+    price = row['Close']
+    rsi = row['RSI']
+    sma20 = row['SMA20']
+    sma50 = row['SMA50']
+    volume = row['Volume']
+    macd = row['MACD']
+    macd_signal = row['MACD_SIGNAL']
+    
+    # Prepare row data for Google Sheets
+    row_data = [
+        date_str, ticker, row['signal'], float(price), 
+        float(rsi), float(sma20), float(sma50), 
+        float(volume), float(macd), float(macd_signal), notes
+    ]
+    
+    # Append to Google Sheets
+    try:
+        append_trade(trade_ws, row_data)
+    except Exception:
+        IO_FAILURES.inc(sink='sheets')
+        raise
+    
+    # Also append to Excel file
+    excel_trade_data = {
+        'Date': date_str,
+        'Ticker': ticker,
+        'Signal': row['signal'],
+        'Price': float(price),
+        'RSI': float(rsi),
+        'SMA20': float(sma20),
+        'SMA50': float(sma50),
+        'Volume': float(volume),
+        'MACD': float(macd),
+        'MACD_Signal': float(macd_signal),
+        'Notes': notes
+    }
+    excel_success = excel_manager.append_trade(excel_trade_data)
+    if not excel_success:
+        IO_FAILURES.inc(sink='excel')
+    
+    # Log in exact format requested
+    logger.info(f"Found {row['signal']} for {ticker} on {date_str} @ {price:.2f} (RSI={rsi:.2f}, SMA20={sma20:.2f}, SMA50={sma50:.2f}) -> logged to Google Sheets & Excel",
+                extra={'ticker': ticker, 'stage': 'signal', 'signal': row['signal']})
+
+def check_quality(df, ticker):
+    """Repair a fetched frame, count the repairs and log the quality report"""
+    with STAGE_DURATION.time(stage='quality'):
+        df, report = repair_ohlcv(df, ticker)
+    for check in ('duplicates', 'non_trading_rows', 'gaps_filled', 'invalid_prices', 'bad_ticks',
+                  'wick_outliers', 'ohlc_fixed', 'dropped_rows'):
+        if report[check]:
+            DATA_REPAIRS.inc(report[check], check=check)
+    if report['splits']:
+        DATA_REPAIRS.inc(len(report['splits']), check='splits')
+    if report['repaired_rows'] or report['dropped_rows'] or report['adjustment_anomalies']:
+        logger.warning(f"Data quality {ticker} | score={report['score']:.3f} | repaired={report['repaired_rows']} | dropped={report['dropped_rows']} | splits={report['splits']} | bad ticks={report['bad_ticks']} | gaps filled={report['gaps_filled']} | adjustment anomalies={report['adjustment_anomalies']}",
+                       extra={'ticker': ticker, 'stage': 'quality'})
+    return df, report
+
+def check_risk(pending_signals, indicator_frames, open_positions=None):
+    """Update the rolling covariance with new bars and run the signals through the risk engine"""
+    closes = pd.DataFrame({ticker: df['Close'] for ticker, df in indicator_frames.items()})
+    # A bar still forming would be committed for good, so only closed bars are fed
+    now = ist_now()
+    closes = closes.loc[[bar_close_time(date) <= now for date in closes.index]]
+    covariance = RollingCovariance.load(RISK_STATE_FILE, TICKERS, RISK_WINDOW)
+    covariance.update_from_closes(closes)
+    covariance.save(RISK_STATE_FILE)
+    
+    engine = RiskEngine(covariance, SECTORS, capital=RISK_CAPITAL, risk_per_trade=RISK_PER_TRADE,
+                        max_position=RISK_MAX_POSITION, max_sector=RISK_MAX_SECTOR,
+                        max_correlation=RISK_MAX_CORRELATION)
+    return engine.evaluate(pending_signals, open_positions)
+
 def run_once():
     """Run one complete scan of all tickers"""
-    logger.info(f"Starting scan for: {', '.join(TICKERS)}")
+    logger.info(f"Starting scan for: {', '.join(TICKERS)}", extra={'stage': 'scan'})
+    scan_start = time.perf_counter()
     
     try:
         # Initialize Google Sheets
         sheets = init_sheets()
         trade_ws = sheets['trade']
-        summary_ws = sheets['summary']
-        analytics_ws = sheets['analytics']
+        report = Report()
         
         overall_summary = {
             'Total Trades': 0, 
@@ -36,73 +134,136 @@ def run_once():
         }
         
         ml_results = {}
+        ml_tickers = []
+        feature_store = FeatureStore(FEATURE_STORE_DIR)
+        tuned_configs = load_best_configs(TUNING_FILE, feature_store.version)
+        backtest_states = load_backtest_states(BACKTEST_STATE_FILE)
+        indicator_frames = {}
+        signal_frames = {}
+        pending_signals = []
+        quality_reports = []
+        tickers_scanned = 0
+        
+        # Fetch all tickers with timeouts and retries; each ticker's latency trace starts here
+        fetch_start = time.monotonic()
+        fetched = fetch_many(TICKERS + [SCREEN_BENCHMARK], period="6mo", interval="1d", concurrency=FETCH_CONCURRENCY,
+                             timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES)
+        for result in fetched.values():
+            FETCH_LATENCY.observe(result['elapsed'], status='ok' if result['ok'] else 'error')
         
         for ticker in TICKERS:
-            # Fetch data
-            df = fetch_data(ticker, period="6mo", interval="1d")
+            result = fetched[ticker]
+            if not result['ok']:
+                VALIDATION_FAILURES.inc(reason='fetch')
+                logger.warning(f"⚠️ Fetch failed for {ticker} after {result['attempts']} attempt(s): {result['error']}",
+                               extra={'ticker': ticker, 'stage': 'fetch', 'duration': result['elapsed']})
+                continue
             
-            # Validate data
+            # Repair bad bars, then validate
+            df, quality = check_quality(result['data'], ticker)
+            quality_reports.append(quality)
             is_valid, validation_msg = validate_data(df, ticker)
             if not is_valid:
+                VALIDATION_FAILURES.inc(reason='validation')
                 logger.warning(f"⚠️ {validation_msg}")
                 continue
+            tickers_scanned += 1
+            trace = LatencyTrace().mark('start', fetch_start).mark('fetch', fetch_start + result['elapsed'])
             
             # Add technical indicators
-            df = add_indicators(df)
+            with STAGE_DURATION.time(stage='indicators'):
+                df = add_indicators(df)
+            indicator_frames[ticker] = df
+            trace.mark('indicators')
             
             # Generate signals
-            signals_df = generate_signals(df)
+            with STAGE_DURATION.time(stage='signals'):
+                signals_df = generate_signals(df)
+            signal_frames[ticker] = signals_df
+            trace.mark('signal')
             
             # Find recent signals (last 5 days)
             recent_signals = signals_df.dropna(subset=['signal']).tail(5)
             
-            # Log recent signals to Google Sheets and send Telegram alerts
+            # Queue recent signals for the portfolio risk check
+            atr = compute_atr(df)
             for idx, row in recent_signals.iterrows():
                 if row['signal'] in ['BUY', 'SELL']:
-                    date_str = idx.strftime("%Y-%m-%d")
-                    price = row['Close']
-                    rsi = row['RSI']
-                    sma20 = row['SMA20']
-                    sma50 = row['SMA50']
-                    volume = row['Volume']
-                    macd = row['MACD']
-                    macd_signal = row['MACD_SIGNAL']
-                    
-                    # Prepare row data for Google Sheets
-                    row_data = [
-                        date_str, ticker, row['signal'], float(price), 
-                        float(rsi), float(sma20), float(sma50), 
-                        float(volume), float(macd), float(macd_signal), ""
-                    ]
-                    
-                    # Append to Google Sheets
-                    append_trade(trade_ws, row_data)
-                    
-                    # Also append to Excel file
-                    excel_trade_data = {
-                        'Date': date_str,
-                        'Ticker': ticker,
-                        'Signal': row['signal'],
-                        'Price': float(price),
-                        'RSI': float(rsi),
-                        'SMA20': float(sma20),
-                        'SMA50': float(sma50),
-                        'Volume': float(volume),
-                        'MACD': float(macd),
-                        'MACD_Signal': float(macd_signal),
-                        'Notes': ""
-                    }
-                    excel_success = excel_manager.append_trade(excel_trade_data)
-                    
-                    # Send Telegram alert
-                    telegram_sent = send_signal_alert(ticker, row['signal'], price, rsi, sma20, sma50, date_str)
-                    
-                    # Log in exact format requested
-                    logger.info(f"Found {row['signal']} for {ticker} on {date_str} @ {price:.2f} (RSI={rsi:.2f}, SMA20={sma20:.2f}, SMA50={sma50:.2f}) -> logged to Google Sheets & Excel")
-                    logger.info(f"Telegram sent: {telegram_sent}")
+                    pending_signals.append({
+                        'ticker': ticker, 'signal': row['signal'], 'price': float(row['Close']),
+                        'atr': float(atr.loc[idx]), 'date': idx, 'row': row, 'trace': trace.fork(bar_close_time(idx))
+                    })
+        
+        # Signals on bars an earlier scan already alerted are not logged or alerted again
+        alert_log = AlertLog(ALERTED_SIGNALS_FILE)
+        pending_signals = [signal for signal in pending_signals if not alert_log.seen(signal)]
+        
+        # Veto or resize signals against portfolio risk limits, then alert; the Sheets/Excel signal
+        # writes are queued until the alerts have gone out
+        writes = DeferredWrites(ALERT_LATENCY_BUDGET)
+        broker = PaperBroker(PAPER_DB, capital=RISK_CAPITAL)
+        with STAGE_DURATION.time(stage='risk'):
+            decisions = check_risk(pending_signals, indicator_frames, broker.position_notional())
+        for decision in decisions:
+            decision['trace'].mark('risk')
+        approved = []
+        for decision in decisions:
+            if decision['action'] == 'VETO':
+                SIGNALS_VETOED.inc(signal=decision['signal'])
+                logger.info(f"Risk veto {decision['signal']} for {decision['ticker']}: {decision['reason']}",
+                            extra={'ticker': decision['ticker'], 'stage': 'risk', 'signal': decision['signal']})
+                continue
+            notes = ""
+            if decision['signal'] == 'BUY':
+                notes = f"{decision['action']} qty={decision['quantity']}"
+                if decision['reason']:
+                    notes += f" ({decision['reason']})"
+            writes.submit(decision['trace'], log_signal, trade_ws, decision['ticker'], decision['date'], decision['row'], notes)
+            approved.append(decision)
+            
+            # Take allowed BUYs in the paper account unless their bar was already processed
+            last_bar = broker.last_dates.get(decision['ticker'])
+            if decision['signal'] == 'BUY' and (last_bar is None or decision['date'] > last_bar):
+                broker.submit_order(decision['ticker'], 'BUY', decision['quantity'], decision['date'])
+        
+        # Alert every subscribed desk and chat, one batched message per destination
+        router = SubscriptionRouter(load_subscribers(SUBSCRIPTIONS_FILE, TELEGRAM_CHAT_ID), max_workers=ALERT_WORKERS)
+        with STAGE_DURATION.time(stage='alerts'):
+            delivered = router.dispatch(approved)
+        # Only signals some destination received are marked alerted; the rest go again next scan
+        sent = router.delivered_signals(approved, delivered)
+        router.close()
+        alert_log.add(sent)
+        alert_log.save()
+        if len(sent) < len(approved):
+            logger.warning(f"{len(approved) - len(sent)} signals not delivered to any destination, retrying next scan",
+                           extra={'stage': 'alert'})
+        for decision in approved:
+            decision['trace'].mark('alert')
+        if approved:
+            logger.info(f"Alerts: {len(approved)} signals to {len(delivered)} destinations, "
+                        f"{sum(delivered.values())} delivered", extra={'stage': 'alert'})
+        # Within the latency budget the writes run now; past it they run in the background
+        # while the rest of the scan carries on
+        queued = len(writes.pending)
+        if queued and not writes.flush():
+            logger.warning(f"Latency budget of {ALERT_LATENCY_BUDGET:.0f}s exceeded: {queued} signal writes "
+                           f"running in the background", extra={'stage': 'alert'})
+        
+        # Backtest, robustness, features and ML come after the alerts, so the time-critical
+        # path never waits on them
+        for ticker, signals_df in signal_frames.items():
+            df = indicator_frames[ticker]
+            
+            # Run backtest, continuing from the saved state so only new bars are simulated;
+            # the report covers the trades entered within the fetched window
+            stage_start = time.perf_counter()
+            bt_all, backtest_states[ticker] = resume_backtest(signals_df, backtest_states.get(ticker))
+            bt_results = trades_since(bt_all, signals_df.index[0])
+            bt_duration = time.perf_counter() - stage_start
+            STAGE_DURATION.observe(bt_duration, stage='backtest')
             
-            # Run backtest
-            bt_results = backtest_signals(signals_df)
+            report.add_backtest(ticker, bt_results, signals_df['Close'])
             
             # Update overall summary
             overall_summary['Total Trades'] += bt_results['total']
@@ -111,21 +272,64 @@ def run_once():
             overall_summary['Net P&L'] += bt_results['net_pnl']
             
             # Log backtest results in exact format
-            logger.info(f"Backtest {ticker} | Trades={bt_results['total']} | Wins={bt_results['wins']} | Net P&L={bt_results['net_pnl']:.2f} | WinRatio={bt_results['win_ratio']:.2f}%")
+            logger.info(f"Backtest {ticker} | Trades={bt_results['total']} | Wins={bt_results['wins']} | Net P&L={bt_results['net_pnl']:.2f} | WinRatio={bt_results['win_ratio']:.2f}%",
+                        extra={'ticker': ticker, 'stage': 'backtest', 'duration': bt_duration})
             
-            # Train ML model
-            features, target = prepare_features(df)
+            # Bootstrap confidence intervals around the backtest point estimate
+            robustness = monte_carlo(bt_results, signals_df['Close'], n_sims=ROBUSTNESS_SIMS)
+            if robustness['trades'] is not None:
+                pnl_ci = robustness['trades']['net_pnl']
+                dd_ci = robustness['paths']['max_drawdown']
+                logger.info(f"Robustness {ticker} | Net P&L 90% CI=[{pnl_ci['lower']:.2f}, {pnl_ci['upper']:.2f}] | MaxDD 90% CI=[{dd_ci['lower']:.2f}, {dd_ci['upper']:.2f}] | P(loss)={robustness['trades']['prob_loss']:.2f}",
+                            extra={'ticker': ticker, 'stage': 'robustness'})
+            
+            # Update the stored features with the new bars, then train on them
+            with STAGE_DURATION.time(stage='features'):
+                feature_store.update(ticker, df)
+            stage_start = time.perf_counter()
+            features, target = feature_store.training_set(ticker)
             if len(features) > 50:
-                ml_result = train_and_eval(features, target)
+                ml_result = train_and_eval(features, target, tuned_configs.get(ticker))
                 ml_results[ticker] = ml_result
                 
-                # Make prediction for next day
+                # Keep the ticker for the batched next-day prediction
                 if ml_result['model'] is not None:
-                    prediction = predict_next_day(ml_result['model'], df)
-                    ml_result['prediction'] = prediction
+                    ml_tickers.append(ticker)
                 
                 # Log ML results in exact format
-                logger.info(f"{ticker} ML acc: {ml_result['accuracy']:.3f}")
+                ml_duration = time.perf_counter() - stage_start
+                STAGE_DURATION.observe(ml_duration, stage='ml')
+                logger.info(f"{ticker} ML acc: {ml_result['accuracy']:.3f}",
+                            extra={'ticker': ticker, 'stage': 'ml', 'duration': ml_duration})
+        
+        save_backtest_states(backtest_states, BACKTEST_STATE_FILE)
+        report.set_quality(QUALITY_COLUMNS, quality_rows(quality_reports))
+        
+        # Predict next day for all tickers in one batch
+        models = {ticker: ml_results[ticker]['model'] for ticker in ml_tickers}
+        scored = predict_batch(models, feature_store.latest_frame(ml_tickers), feature_columns=feature_store.columns)
+        for ticker, prediction in predictions_by_ticker(scored).items():
+            ml_results[ticker]['prediction'] = prediction
+        
+        # Fill paper orders and apply exit rules on the new bars, then mark to market
+        with STAGE_DURATION.time(stage='paper'):
+            broker.on_bars(signal_frames)
+            paper = broker.mark_to_market(datetime.now(), {t: f['Close'].iloc[-1] for t, f in signal_frames.items()})
+        broker.close()
+        overall_summary['Paper Equity'] = round(paper['equity'], 2)
+        overall_summary['Paper Open Positions'] = paper['open_positions']
+        logger.info(f"Paper account | Equity={paper['equity']:.2f} | Cash={paper['cash']:.2f} | Open positions={paper['open_positions']}",
+                    extra={'stage': 'paper'})
+        
+        # Rank the whole universe cross-sectionally
+        if indicator_frames:
+            with STAGE_DURATION.time(stage='screens'):
+                benchmark = fetched[SCREEN_BENCHMARK]
+                benchmark_close = benchmark['data']['Close'] if benchmark['ok'] else None
+                screens = run_screens(IndicatorPanel(indicator_frames), benchmark_close, top=SCREEN_TOP)
+            rows = screen_rows(screens)
+            logger.info(f"Screens: {len(rows)} candidates across {len(screens)} screens", extra={'stage': 'screens'})
+            report.set_screens(rows)
         
         # Calculate final metrics
         total_trades = overall_summary['Total Trades']
@@ -136,44 +340,128 @@ def run_once():
             overall_summary['Win Ratio (%)'] = 0
             overall_summary['Avg P&L per Trade'] = 0
         
-        # Update Google Sheets
-        update_summary(summary_ws, overall_summary)
-        update_analytics(analytics_ws, {'ml_results': ml_results})
+        # Render the report to Excel, Google Sheets, HTML, the Telegram digest and the subscribers' screens at once
+        report.set_summary(overall_summary)
+        report.set_ml_results(ml_results)
+        sinks = [
+            ExcelSink(excel_manager),
+            SheetsSink({'Summary': sheets['summary'], 'Analytics': sheets['analytics'], 'Screens': sheets['screens'],
+                        'Backtest_Trades': sheets['backtests'], 'Equity_Curves': sheets['equity']}),
+            HtmlSink(REPORT_HTML),
+            TelegramSink(send_telegram_message),
+            ScreensSink(router.broadcast),
+        ]
+        # The signal writes share the workbook and sheets with the report, so they finish first
+        writes.wait()
+        for decision in approved:
+            trace = decision['trace']
+            latency_tracker.record(trace)
+            logger.info(f"Latency {decision['ticker']} {decision['signal']} | {trace.describe()} | total={trace.total() * 1000:.0f}ms | "
+                        f"bar age={format_age(trace.bar_age('alert'))}",
+                        extra={'ticker': decision['ticker'], 'stage': 'alert', 'duration': trace.total()})
+        with STAGE_DURATION.time(stage='report'):
+            rendered = render_report(report, sinks)
+        router.close()
+        logger.info(f"Report rendered: {', '.join(f'{name}={ok}' for name, ok in rendered.items())}", extra={'stage': 'report'})
         
-        # Also update Excel file
-        excel_manager.update_summary(overall_summary)
-        excel_manager.update_analytics({'ml_results': ml_results})
-        
-        # Send summary to Telegram
-        send_summary_alert(overall_summary)
-        
-        logger.info("Scan complete.")
+        scan_duration = time.perf_counter() - scan_start
+        SCAN_DURATION.observe(scan_duration)
+        TICKERS_SCANNED.set(tickers_scanned)
+        LAST_SCAN.set(time.time())
+        for stage, stats in latency_tracker.summary().items():
+            show = format_age if stage == 'bar_age' else (lambda seconds: f"{seconds * 1000:.0f}ms")
+            logger.info(f"Alert latency {stage} | p50={show(stats['p50'])} | p95={show(stats['p95'])} | "
+                        f"p99={show(stats['p99'])} | n={stats['count']}", extra={'stage': 'alert'})
+        logger.info("Scan complete.", extra={'stage': 'scan', 'duration': scan_duration})
         
     except Exception as e:
         error_msg = f"Error in algo trading scan: {str(e)}"
-        logger.error(error_msg)
+        logger.error(error_msg, extra={'stage': 'scan'})
         send_error_alert(error_msg)
 
-def run_scheduled():
-    """Run the system on a schedule"""
-    import schedule
+def run_ml_backtest(period="5y", blend=None):
+    """Backtest the walk-forward ML signal for every ticker"""
+    logger.info(f"Starting ML backtest for: {', '.join(TICKERS)}")
+    
+    for ticker in TICKERS:
+        df = fetch_data(ticker, period=period, interval="1d")
+        if not df.empty:
+            df, _ = check_quality(df, ticker)
+        
+        is_valid, validation_msg = validate_data(df, ticker)
+        if not is_valid:
+            logger.warning(f"⚠️ {validation_msg}")
+            continue
+        
+        df = add_indicators(df)
+        bt_results = backtest_ml(df, blend=blend)
+        
+        logger.info(f"ML Backtest {ticker} | Trades={bt_results['total']} | Wins={bt_results['wins']} | Net P&L={bt_results['net_pnl']:.2f} | WinRatio={bt_results['win_ratio']:.2f}%")
     
-    # Schedule to run every day at 9:30 AM (market open)
-    schedule.every().day.at("09:30").do(run_once)
+    logger.info("ML backtest complete.")
+
+def run_tuning(period="2y"):
+    """Search model families and hyperparameters per ticker and save the best configs"""
+    logger.info(f"Starting hyperparameter search for: {', '.join(TICKERS)}", extra={'stage': 'tuning'})
+    feature_store = FeatureStore(FEATURE_STORE_DIR)
+    datasets = {}
     
-    # Also run once immediately
-    run_once()
+    for ticker in TICKERS:
+        df = fetch_data(ticker, period=period, interval="1d")
+        if not df.empty:
+            df, _ = check_quality(df, ticker)
+        
+        is_valid, validation_msg = validate_data(df, ticker)
+        if not is_valid:
+            logger.warning(f"⚠️ {validation_msg}")
+            continue
+        
+        feature_store.update(ticker, add_indicators(df))
+        served = feature_store.training_matrix(ticker)
+        if served is not None and len(served[2]) > 100:
+            datasets[ticker] = served[1:]
     
-    logger.info("🕐 Scheduling daily runs at 9:30 AM...")
+    stage_start = time.perf_counter()
+    best = tune(datasets, n_jobs=TUNING_JOBS)
+    save_best_configs(best, TUNING_FILE, feature_store.version, {t: len(y) for t, (X, y) in datasets.items()})
+    for ticker in datasets.keys() - best.keys():
+        logger.warning(f"Not tuned {ticker}: too few rows for cross-validation", extra={'ticker': ticker, 'stage': 'tuning'})
+    for ticker, config in best.items():
+        logger.info(f"Tuned {ticker} | {config['family']} {config['params']} | CV acc={config['cv_accuracy']:.3f} over {config['n_folds']} folds",
+                    extra={'ticker': ticker, 'stage': 'tuning'})
+    logger.info(f"Hyperparameter search complete, saved to {TUNING_FILE}",
+                extra={'stage': 'tuning', 'duration': time.perf_counter() - stage_start})
+
+def build_scheduler(state_file=SCHEDULER_STATE_FILE):
+    """Scans before the open, through the session and after the close; retraining off-peak"""
+    scheduler = Scheduler(state_file)
+    scheduler.add(Job('pre_open', run_once, parse_cadence(SCHEDULE_PRE_OPEN), priority=0, group='scan'))
+    scheduler.add(Job('scan', run_once, parse_cadence(SCHEDULE_SCAN), priority=1, group='scan'))
+    scheduler.add(Job('eod', run_once, parse_cadence(SCHEDULE_EOD), priority=0, group='scan'))
+    # The retrain runs beside the scans; FeatureStore serializes their writes to the store
+    scheduler.add(Job('retrain', run_tuning, parse_cadence(SCHEDULE_RETRAIN), priority=10, lane='background',
+                      off_peak=True))
+    return scheduler
+
+def run_scheduled():
+    """Run the system on the NSE trading calendar"""
+    # Expose metrics for local scraping
+    start_metrics_server(METRICS_PORT, METRICS_HOST)
+    logger.info(f"Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
     
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    scheduler = build_scheduler()
+    cadences = ', '.join(f"{job.name} {job.cadence}" for job in scheduler.jobs.values() if job.cadence is not None)
+    logger.info(f"🕐 Scheduling on NSE trading days: {cadences}")
+    asyncio.run(scheduler.run())
 
 if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == "--scheduled":
         run_scheduled()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--ml-backtest":
+        run_ml_backtest(blend=sys.argv[2] if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--tune":
+        run_tuning()
     else:
         run_once()
@@ -0,0 +1,87 @@
+"""
+NSE trading calendar
+Trading days are weekdays that are not exchange holidays. Holidays are
+the NSE published lists; add more with NSE_HOLIDAYS=YYYY-MM-DD,... in .env.
+"""
+
+import os
+from datetime import date, datetime, time, timedelta
+import numpy as np
+import pandas as pd
+
+NSE_HOLIDAYS = {
+    # 2024
+    "2024-01-22", "2024-01-26", "2024-03-08", "2024-03-25", "2024-03-29", "2024-04-11",
+    "2024-04-17", "2024-05-01", "2024-05-20", "2024-06-17", "2024-07-17", "2024-08-15",
+    "2024-10-02", "2024-11-01", "2024-11-15", "2024-11-20", "2024-12-25",
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14", "2025-04-18",
+    "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
+    "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03", "2026-04-14",
+    "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14", "2026-10-02", "2026-10-20",
+    "2026-11-10", "2026-11-24", "2026-12-25",
+}
+NSE_HOLIDAYS.update(d.strip() for d in os.getenv("NSE_HOLIDAYS", "").split(",") if d.strip())
+
+# Holidays with a short evening (muhurat) session; data vendors publish a bar for them
+SPECIAL_SESSIONS = {"2024-11-01", "2025-10-21"}
+
+# Years the holiday list covers; outside them only weekends are known closures
+CALENDAR_YEARS = {int(d[:4]) for d in NSE_HOLIDAYS}
+
+# Session times in exchange local time (IST)
+PRE_OPEN = time(9, 0)
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
+
+_holiday_days = np.array(sorted(NSE_HOLIDAYS), dtype='datetime64[D]')
+_special_days = np.array(sorted(SPECIAL_SESSIONS), dtype='datetime64[D]')
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+def is_trading_day(value):
+    """True if the exchange is open on this date"""
+    day = _as_date(value)
+    return day.weekday() < 5 and day.isoformat() not in NSE_HOLIDAYS
+
+def trading_days(start, end):
+    """DatetimeIndex of trading days from start to end inclusive"""
+    days = np.arange(np.datetime64(_as_date(start)), np.datetime64(_as_date(end)) + 1, dtype='datetime64[D]')
+    return pd.DatetimeIndex(days[np.is_busday(days, holidays=_holiday_days)].astype('datetime64[ns]'))
+
+def trading_day_mask(index):
+    """Boolean array: which timestamps of a DatetimeIndex fall on trading days"""
+    days = index.values.astype('datetime64[D]')
+    return np.is_busday(days, holidays=_holiday_days)
+
+def session_mask(index):
+    """Like trading_day_mask, but also True on special (muhurat) sessions"""
+    days = index.values.astype('datetime64[D]')
+    return np.is_busday(days, holidays=_holiday_days) | np.isin(days, _special_days)
+
+def calendar_covers(value):
+    """True if the holiday list covers this date's year"""
+    return _as_date(value).year in CALENDAR_YEARS
+
+def next_trading_day(value, include_today=False):
+    """First trading day after (or on, with include_today) the given date"""
+    day = _as_date(value)
+    if not include_today:
+        day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+def previous_trading_day(value):
+    """Last trading day strictly before the given date"""
+    day = _as_date(value) - timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
@@ -0,0 +1,195 @@
+"""
+In-process metrics registry for the algo trading system
+Counters, gauges and histograms rendered in the Prometheus text format
+and served over a local HTTP endpoint
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base class holding one value per label set"""
+
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            state = self._values.get(_label_key(labels))
+            return {'sum': state['sum'], 'count': state['count']} if state else {'sum': 0.0, 'count': 0}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(float(bound)))])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {state['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state['sum'])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {state['count']}")
+        return lines
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter, name, help_text)
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge, name, help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, buckets=buckets)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Global metrics registry instance
+registry = MetricsRegistry()
+
+FETCH_LATENCY = registry.histogram('algo_fetch_latency_seconds', 'Ticker download latency including retries')
+STAGE_DURATION = registry.histogram('algo_stage_duration_seconds', 'Per-ticker compute time by pipeline stage')
+SCAN_DURATION = registry.histogram('algo_scan_duration_seconds', 'Wall time of a full scan', buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+SIGNALS_EMITTED = registry.counter('algo_signals_total', 'Trading signals emitted')
+SIGNALS_VETOED = registry.counter('algo_signals_vetoed_total', 'Signals vetoed by the risk engine')
+VALIDATION_FAILURES = registry.counter('algo_validation_failures_total', 'Tickers skipped by fetch or data validation')
+DATA_REPAIRS = registry.counter('algo_data_repairs_total', 'Bars repaired or dropped by the data quality stage')
+IO_FAILURES = registry.counter('algo_io_failures_total', 'Failed writes to external sinks')
+TICKS = registry.counter('algo_ticks_total', 'Ticks received by the bar aggregator by outcome')
+JOB_RUNS = registry.counter('algo_job_runs_total', 'Scheduled job runs by job and outcome')
+JOB_DELAY = registry.histogram('algo_job_delay_seconds', 'Time from a job falling due to it starting', buckets=(0.1, 1, 5, 15, 60, 300, 900, 3600))
+ALERT_LATENCY = registry.histogram('algo_alert_latency_seconds', 'Time spent in each stage from fetch to alert send, and bar age at send',
+                                   buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 3600, 21600, 86400))
+CACHE_REQUESTS = registry.counter('algo_cache_requests_total', 'Cache lookups by cache and result')
+TICKERS_SCANNED = registry.gauge('algo_tickers_scanned', 'Tickers processed in the last scan')
+LAST_SCAN = registry.gauge('algo_last_scan_timestamp_seconds', 'Unix time the last scan finished')
+
+def start_metrics_server(port=8000, host='127.0.0.1', metrics_registry=registry):
+    """Serve /metrics on a daemon thread; returns the server (port 0 picks a free port)"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics_registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
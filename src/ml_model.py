@@ -1,9 +1,26 @@
 from sklearn.model_selection import train_test_split
 from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 from sklearn.metrics import accuracy_score, classification_report
+import hashlib
 import pandas as pd
 import numpy as np
 
+from metrics import CACHE_REQUESTS
+
+FEATURE_COLUMNS = ['RSI', 'MACD', 'MACD_SIGNAL', 'SMA_diff', 'Volume']
+
+# Model families the tuner can choose from (all accept NaN features)
+MODEL_FAMILIES = {
+    'tree': DecisionTreeClassifier,
+    'forest': RandomForestClassifier,
+    'boosting': HistGradientBoostingClassifier,
+}
+
+# Fitted walk-forward fold models keyed by a digest of their training data
+_fold_cache = {}
+_FOLD_CACHE_SIZE = 2048
+
 def prepare_features(df):
     """Prepare features and target for ML model"""
     df = df.copy().dropna()
@@ -13,13 +30,20 @@ def prepare_features(df):
     df['target'] = (df['next_close'] > df['Close']).astype(int)
     
     # Select features
-    features = df[['RSI', 'MACD', 'MACD_SIGNAL', 'SMA_diff', 'Volume']].dropna()
+    features = df[FEATURE_COLUMNS].dropna()
     target = df.loc[features.index, 'target']
     
     return features, target
 
-def train_and_eval(features, target):
-    """Train Decision Tree model and evaluate performance"""
+def build_model(config=None):
+    """Unfitted model for a {'family', 'params'} config (default: depth-5 decision tree)"""
+    if config is None:
+        return DecisionTreeClassifier(max_depth=5, random_state=42)
+    cls = MODEL_FAMILIES[config['family']]
+    return cls(random_state=42, **config['params'])
+
+def train_and_eval(features, target, config=None):
+    """Train the model (decision tree unless a tuned config is given) and evaluate performance"""
     if len(features) < 50:
         return {'model': None, 'accuracy': 0, 'report': 'Insufficient data'}
     
@@ -27,15 +51,16 @@ def train_and_eval(features, target):
         features, target, test_size=0.2, random_state=42, shuffle=False
     )
     
-    clf = DecisionTreeClassifier(max_depth=5, random_state=42)
+    clf = build_model(config)
     clf.fit(X_train, y_train)
     preds = clf.predict(X_test)
     
     acc = accuracy_score(y_test, preds)
     report = classification_report(y_test, preds, zero_division=0)
     
-    # Feature importance
-    feature_importance = dict(zip(features.columns, clf.feature_importances_))
+    # Feature importance (not every model family has one)
+    importances = getattr(clf, 'feature_importances_', None)
+    feature_importance = dict(zip(features.columns, importances)) if importances is not None else {}
     
     return {
         'model': clf, 
@@ -49,7 +74,7 @@ def predict_next_day(model, latest_data):
     if model is None:
         return None
     
-    features = latest_data[['RSI', 'MACD', 'MACD_SIGNAL', 'SMA_diff', 'Volume']].iloc[-1:]
+    features = latest_data[FEATURE_COLUMNS].iloc[-1:]
     prediction = model.predict(features)[0]
     probability = model.predict_proba(features)[0]
     
@@ -59,3 +84,125 @@ def predict_next_day(model, latest_data):
         'up_probability': probability[1],
         'down_probability': probability[0]
     }
+
+
+def stack_features(frames, latest_only=False):
+    """Stack indicator frames of many tickers into one (Ticker, Date) feature matrix"""
+    parts = {}
+    for ticker, df in frames.items():
+        features = df[FEATURE_COLUMNS].dropna()
+        if latest_only:
+            features = features.iloc[-1:]
+        if not features.empty:
+            parts[ticker] = features
+    
+    if not parts:
+        index = pd.MultiIndex.from_arrays([[], []], names=['Ticker', 'Date'])
+        return pd.DataFrame(columns=FEATURE_COLUMNS, index=index, dtype=float)
+    
+    stacked = pd.concat(parts, names=['Ticker'])
+    stacked.index = stacked.index.set_names(['Ticker', 'Date'])
+    return stacked
+
+def _up_probability(model, X):
+    """Return P(up) for every row of X with one predict_proba call"""
+    proba = model.predict_proba(X)
+    classes = list(model.classes_)
+    if 1 in classes:
+        return proba[:, classes.index(1)]
+    return np.zeros(len(X))
+
+def predict_batch(models, stacked, feature_columns=FEATURE_COLUMNS):
+    """Score a stacked (Ticker, Date) feature matrix with one predict_proba pass per model
+    
+    `models` is either a single fitted model applied to every row or a dict of
+    ticker -> model. Tickers without a model are dropped from the output.
+    """
+    columns = ['Ticker', 'Date', 'prediction', 'probability', 'up_probability', 'down_probability']
+    if stacked.empty:
+        return pd.DataFrame(columns=columns)
+    
+    X = stacked[feature_columns]
+    up_prob = np.full(len(X), np.nan)
+    
+    if isinstance(models, dict):
+        tickers = X.index.get_level_values('Ticker')
+        for ticker, model in models.items():
+            if model is None:
+                continue
+            rows = np.flatnonzero(tickers == ticker)
+            if len(rows):
+                up_prob[rows] = _up_probability(model, X.iloc[rows])
+    elif models is not None:
+        up_prob[:] = _up_probability(models, X)
+    
+    result = X.index.to_frame(index=False)
+    result['up_probability'] = up_prob
+    result['down_probability'] = 1 - up_prob
+    result['prediction'] = np.where(up_prob > 0.5, 'UP', 'DOWN')
+    result['probability'] = np.maximum(up_prob, 1 - up_prob)
+    result = result.dropna(subset=['up_probability']).reset_index(drop=True)
+    return result[columns]
+
+def predict_latest(models, frames):
+    """Predict next day movement for every ticker's latest bar in one batch
+    
+    Returns ticker -> dict in the same shape as predict_next_day.
+    """
+    return predictions_by_ticker(predict_batch(models, stack_features(frames, latest_only=True)))
+
+def predictions_by_ticker(scored):
+    """Turn predict_batch output into ticker -> dict (last row per ticker wins)"""
+    predictions = {}
+    for row in scored.itertuples(index=False):
+        predictions[row.Ticker] = {
+            'prediction': row.prediction,
+            'probability': row.probability,
+            'up_probability': row.up_probability,
+            'down_probability': row.down_probability
+        }
+    return predictions
+
+def backfill_predictions(models, frames):
+    """Write model predictions for every bar of every ticker (historical backfill)
+    
+    Predictions for bars the model was trained on are in-sample; use
+    walk-forward training when backtesting the ML signal itself.
+    """
+    return predict_batch(models, stack_features(frames))
+
+def _fit_fold(X_train, y_train, max_depth):
+    """Fit (or fetch from cache) the model for one walk-forward fold"""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(X_train.values).tobytes())
+    digest.update(np.ascontiguousarray(y_train.values).tobytes())
+    key = (digest.hexdigest(), max_depth)
+    
+    model = _fold_cache.get(key)
+    CACHE_REQUESTS.inc(cache='ml_fold', result='hit' if model is not None else 'miss')
+    if model is None:
+        model = DecisionTreeClassifier(max_depth=max_depth, random_state=42)
+        model.fit(X_train, y_train)
+        if len(_fold_cache) >= _FOLD_CACHE_SIZE:
+            _fold_cache.pop(next(iter(_fold_cache)))
+        _fold_cache[key] = model
+    return model
+
+def walk_forward_probabilities(df, min_train=100, retrain_every=20, max_depth=5):
+    """Out-of-sample P(up) for every bar using expanding-window walk-forward retraining
+    
+    The model scoring bar t is trained only on rows before t, whose targets
+    (next close > close) are all known at the close of bar t. Bars before
+    `min_train` usable rows get NaN.
+    """
+    features = df[FEATURE_COLUMNS].dropna()
+    next_close = df['Close'].shift(-1).loc[features.index]
+    target = (next_close > df.loc[features.index, 'Close']).astype(int)
+    
+    up_prob = np.full(len(features), np.nan)
+    for start in range(min_train, len(features), retrain_every):
+        model = _fit_fold(features.iloc[:start], target.iloc[:start], max_depth)
+        stop = min(start + retrain_every, len(features))
+        up_prob[start:stop] = _up_probability(model, features.iloc[start:stop])
+    
+    return pd.Series(up_prob, index=features.index, name='up_probability').reindex(df.index)
@@ -0,0 +1,271 @@
+"""
+Paper-trading order simulator
+Keeps an order book, fills orders against incoming bars and tracks
+positions, cash and equity in a SQLite file. Open positions are exited
+with the same rules as backtest_signals, one bar at a time.
+"""
+
+import sqlite3
+import pandas as pd
+
+from backtest import check_exit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY, ticker TEXT, side TEXT, quantity INTEGER, order_type TEXT,
+    limit_price REAL, signal_date TEXT, status TEXT, fill_price REAL, fill_date TEXT, note TEXT,
+    UNIQUE (ticker, side, signal_date)
+);
+CREATE TABLE IF NOT EXISTS positions (
+    ticker TEXT PRIMARY KEY, quantity INTEGER, entry_price REAL, entry_date TEXT, last_price REAL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY, ticker TEXT, quantity INTEGER, entry_date TEXT, exit_date TEXT,
+    entry_price REAL, exit_price REAL, pnl REAL, pnl_pct REAL, days_held INTEGER, exit_reason TEXT
+);
+CREATE TABLE IF NOT EXISTS ledger (
+    id INTEGER PRIMARY KEY, date TEXT, ticker TEXT, amount REAL, description TEXT
+);
+CREATE TABLE IF NOT EXISTS equity (
+    date TEXT PRIMARY KEY, cash REAL, positions_value REAL, equity REAL
+);
+CREATE TABLE IF NOT EXISTS bar_state (ticker TEXT PRIMARY KEY, last_date TEXT);
+"""
+
+ORDER_TYPES = ('MOC', 'MKT', 'LMT')
+
+def _ts(value):
+    return pd.Timestamp(value)
+
+def _iso(value):
+    return pd.Timestamp(value).isoformat()
+
+class PaperBroker:
+    """Order book and position/cash ledger persisted in SQLite
+
+    Order types:
+    - MOC: fill at the Close of the signal bar (what backtest_signals assumes);
+      cancelled if that bar passes without a fill, as backtest_signals drops
+      a signal it could not take
+    - MKT: fill at the Open of the first bar after the signal bar
+    - LMT: BUY fills when Low <= limit, SELL when High >= limit, at the limit
+      or at the Open if the bar gaps through it
+
+    Working state lives in dicts keyed by ticker, so each bar only touches
+    tickers with an open position or a pending order.
+    """
+
+    def __init__(self, db_path="paper_trading.db", capital=1_000_000, max_hold_days=20,
+                 stop_loss_pct=5, take_profit_pct=10):
+        self.db_path = db_path
+        self.max_hold_days = max_hold_days
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self._load(capital)
+
+    def _load(self, capital):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'capital'").fetchone()
+        if row is None:
+            with self.conn:
+                self.conn.execute("INSERT INTO meta VALUES ('capital', ?)", (str(capital),))
+            self.capital = float(capital)
+        else:
+            self.capital = float(row[0])
+
+        self.cash = self.capital + self.conn.execute("SELECT COALESCE(SUM(amount), 0) FROM ledger").fetchone()[0]
+        self.positions = {
+            ticker: {'quantity': qty, 'entry_price': price, 'entry_date': _ts(date), 'last_price': last}
+            for ticker, qty, price, date, last in self.conn.execute("SELECT * FROM positions")
+        }
+        self.pending = {}
+        for order in self.conn.execute(
+                "SELECT id, ticker, side, quantity, order_type, limit_price, signal_date "
+                "FROM orders WHERE status = 'PENDING' ORDER BY id"):
+            self._queue(dict(zip(['id', 'ticker', 'side', 'quantity', 'order_type', 'limit_price', 'signal_date'], order)))
+        self.last_dates = {t: _ts(d) for t, d in self.conn.execute("SELECT * FROM bar_state")}
+
+    def _queue(self, order):
+        order['signal_date'] = _ts(order['signal_date'])
+        self.pending.setdefault(order['ticker'], []).append(order)
+
+    def close(self):
+        self.conn.close()
+
+    def submit_order(self, ticker, side, quantity, signal_date, order_type='MOC', limit_price=None):
+        """Add an order to the book; returns the order id, or None if it duplicates an earlier order"""
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"Unknown order type: {order_type}")
+        if order_type == 'LMT' and limit_price is None:
+            raise ValueError("LMT orders need a limit_price")
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO orders (ticker, side, quantity, order_type, limit_price, signal_date, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'PENDING')",
+                (ticker, side, int(quantity), order_type, limit_price, _iso(signal_date)))
+        if cursor.rowcount == 0:
+            return None
+        self._queue({'id': cursor.lastrowid, 'ticker': ticker, 'side': side, 'quantity': int(quantity),
+                     'order_type': order_type, 'limit_price': limit_price, 'signal_date': signal_date})
+        return cursor.lastrowid
+
+    def cancel_order(self, order_id):
+        for orders in self.pending.values():
+            for order in orders:
+                if order['id'] == order_id:
+                    orders.remove(order)
+                    with self.conn:
+                        self.conn.execute("UPDATE orders SET status = 'CANCELLED' WHERE id = ?", (order_id,))
+                    return True
+        return False
+
+    def _fill_price(self, order, date, bar):
+        """Price the order fills at on this bar, or None if it doesn't fill"""
+        if order['order_type'] == 'MOC':
+            return bar['Close'] if date == order['signal_date'] else None
+        if date <= order['signal_date']:
+            return None
+        if order['order_type'] == 'MKT':
+            return bar['Open']
+        limit = order['limit_price']
+        if order['side'] == 'BUY' and bar['Low'] <= limit:
+            return min(bar['Open'], limit)
+        if order['side'] == 'SELL' and bar['High'] >= limit:
+            return max(bar['Open'], limit)
+        return None
+
+    def _close_position(self, ticker, date, price, reason):
+        position = self.positions.pop(ticker)
+        quantity, entry_price = position['quantity'], position['entry_price']
+        pnl = (price - entry_price) * quantity
+        self.cash += price * quantity
+        self.conn.execute("DELETE FROM positions WHERE ticker = ?", (ticker,))
+        self.conn.execute("INSERT INTO ledger (date, ticker, amount, description) VALUES (?, ?, ?, ?)",
+                          (_iso(date), ticker, price * quantity, f"SELL {quantity} @ {price:.2f} ({reason})"))
+        self.conn.execute(
+            "INSERT INTO trades (ticker, quantity, entry_date, exit_date, entry_price, exit_price, pnl, pnl_pct, days_held, exit_reason) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (ticker, quantity, _iso(position['entry_date']), _iso(date), entry_price, price, pnl,
+             (price - entry_price) / entry_price * 100, (date - position['entry_date']).days, reason))
+
+    def _process_orders(self, ticker, date, bar, exited):
+        remaining = []
+        for order in self.pending.get(ticker, []):
+            price = self._fill_price(order, date, bar)
+            status, note = None, None
+            if price is None:
+                if order['order_type'] == 'MOC' and date > order['signal_date']:
+                    self.conn.execute("UPDATE orders SET status = 'CANCELLED', note = ? WHERE id = ?",
+                                      ('signal bar passed', order['id']))
+                else:
+                    remaining.append(order)
+                continue
+
+            if order['side'] == 'BUY':
+                if ticker in self.positions:
+                    status, note = 'REJECTED', 'position already open'
+                elif exited:
+                    # No re-entry on the bar a position was closed, as in backtest_signals;
+                    # a MOC order can't fill later, the others wait for the next bar
+                    if order['order_type'] == 'MOC':
+                        status, note = 'CANCELLED', 'position exited on the signal bar'
+                    else:
+                        remaining.append(order)
+                        continue
+                elif price * order['quantity'] > self.cash:
+                    status, note = 'REJECTED', 'insufficient cash'
+                else:
+                    cost = price * order['quantity']
+                    self.cash -= cost
+                    self.positions[ticker] = {'quantity': order['quantity'], 'entry_price': price,
+                                              'entry_date': date, 'last_price': price}
+                    self.conn.execute("INSERT INTO positions VALUES (?, ?, ?, ?, ?)",
+                                      (ticker, order['quantity'], price, _iso(date), price))
+                    self.conn.execute("INSERT INTO ledger (date, ticker, amount, description) VALUES (?, ?, ?, ?)",
+                                      (_iso(date), ticker, -cost, f"BUY {order['quantity']} @ {price:.2f}"))
+                    status = 'FILLED'
+            else:
+                if ticker not in self.positions:
+                    status, note = 'REJECTED', 'no open position'
+                else:
+                    self._close_position(ticker, date, price, 'ORDER')
+                    status = 'FILLED'
+
+            self.conn.execute("UPDATE orders SET status = ?, fill_price = ?, fill_date = ?, note = ? WHERE id = ?",
+                              (status, price if status == 'FILLED' else None,
+                               _iso(date) if status == 'FILLED' else None, note, order['id']))
+        if remaining:
+            self.pending[ticker] = remaining
+        else:
+            self.pending.pop(ticker, None)
+
+    def _process_bar(self, ticker, date, bar):
+        """Process one bar (Open, High, Low, Close, RSI and optional signal) for a ticker"""
+        date = _ts(date)
+        last = self.last_dates.get(ticker)
+        if last is not None and date <= last:
+            return
+        exited = False
+        position = self.positions.get(ticker)
+        if position is not None:
+            if date > position['entry_date']:
+                reason = check_exit(position['entry_price'], position['entry_date'], date, bar['Close'],
+                                    bar['RSI'], bar.get('signal'), self.max_hold_days,
+                                    self.stop_loss_pct, self.take_profit_pct)
+                if reason is not None:
+                    self._close_position(ticker, date, bar['Close'], reason)
+                    exited = True
+            if not exited:
+                position['last_price'] = bar['Close']
+        if ticker in self.pending:
+            self._process_orders(ticker, date, bar, exited)
+        self.last_dates[ticker] = date
+
+    def on_bars(self, bars):
+        """Feed new bars: ticker -> DataFrame (or iterable of (date, bar) rows)
+
+        Only tickers with an open position or pending order are evaluated;
+        the rest just advance their last-seen date. Committed as one transaction.
+        """
+        with self.conn:
+            for ticker, frame in bars.items():
+                last = self.last_dates.get(ticker)
+                rows = frame.loc[frame.index > last] if last is not None else frame
+                if len(rows) == 0:
+                    continue
+                if ticker in self.positions or ticker in self.pending:
+                    for date, bar in rows.iterrows():
+                        self._process_bar(ticker, date, bar)
+                else:
+                    self.last_dates[ticker] = _ts(rows.index[-1])
+                self.conn.execute("INSERT OR REPLACE INTO bar_state VALUES (?, ?)",
+                                  (ticker, _iso(self.last_dates[ticker])))
+            for ticker, position in self.positions.items():
+                self.conn.execute("UPDATE positions SET last_price = ? WHERE ticker = ?",
+                                  (position['last_price'], ticker))
+
+    def mark_to_market(self, date, closes=None):
+        """Value open positions at the latest (or given) closes and record the day's equity"""
+        positions_value = 0.0
+        for ticker, position in self.positions.items():
+            price = closes.get(ticker, position['last_price']) if closes is not None else position['last_price']
+            position['last_price'] = price
+            positions_value += price * position['quantity']
+        equity = self.cash + positions_value
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO equity VALUES (?, ?, ?, ?)",
+                              (pd.Timestamp(date).date().isoformat(), self.cash, positions_value, equity))
+        return {'cash': self.cash, 'positions_value': positions_value, 'equity': equity,
+                'open_positions': len(self.positions)}
+
+    def position_notional(self):
+        """ticker -> market value of each open position"""
+        return {t: p['quantity'] * p['last_price'] for t, p in self.positions.items()}
+
+    def trades(self):
+        return pd.read_sql_query("SELECT * FROM trades ORDER BY id", self.conn)
+
+    def equity_curve(self):
+        return pd.read_sql_query("SELECT * FROM equity ORDER BY date", self.conn, index_col='date')
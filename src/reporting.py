@@ -0,0 +1,349 @@
+"""
+Reporting layer for the algo trading system
+One in-memory report per run (summary, ML analytics, backtest trades,
+equity curves, screens, data quality) is turned into tables once and
+rendered to every sink (Excel, Google Sheets, HTML, Telegram) concurrently
+"""
+
+import hashlib
+import html
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from robustness import strategy_daily_pnl
+from metrics import IO_FAILURES
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+SUMMARY_HEADER = ["Metric", "Value"]
+ANALYTICS_HEADER = ["Ticker", "Accuracy", "Prediction", "Up_Prob", "Down_Prob"]
+TRADES_HEADER = ["Ticker", "Entry Date", "Exit Date", "Entry Price", "Exit Price", "P&L", "P&L %",
+                 "Days Held", "Exit Reason", "Costs"]
+SCREENS_HEADER = ["Screen", "Rank", "Ticker", "Value", "Z-Score", "Close"]
+
+def prediction_fields(result):
+    """(prediction, up_probability, down_probability) of an ML result, N/A if it has none"""
+    prediction_data = result.get('prediction', {})
+    if isinstance(prediction_data, dict) and prediction_data:
+        return (prediction_data.get("prediction", "N/A"), prediction_data.get("up_probability", 0),
+                prediction_data.get("down_probability", 0))
+    return "N/A", 0, 0
+
+def summary_table(summary):
+    """Summary rows (header first) for a metric -> value dict"""
+    return [SUMMARY_HEADER] + [[k, str(v)] for k, v in summary.items()]
+
+def analytics_table(ml_results):
+    """Analytics rows (header first) for every ticker with a trained model"""
+    rows = [ANALYTICS_HEADER]
+    for ticker, result in ml_results.items():
+        if result.get('model') is None:
+            continue
+        prediction, up_prob, down_prob = prediction_fields(result)
+        rows.append([ticker, round(float(result['accuracy']), 3), prediction,
+                     round(float(up_prob), 3), round(float(down_prob), 3)])
+    return rows
+
+def _date(value):
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+class Report:
+    """Results of one scan, built up while tickers are processed
+
+    Sinks never look at the raw results; they render the tables returned by
+    `tables()`, which are built once per report.
+    """
+
+    def __init__(self, generated_at=None):
+        self.generated_at = generated_at or datetime.now()
+        self.summary = {}
+        self.ml_results = {}
+        self.backtests = {}
+        self.screens = None
+        self.quality = None
+        self._tables = None
+
+    def add_backtest(self, ticker, bt_results, close):
+        """Keep a backtest's trades and its mark-to-market equity curve (one share per trade)"""
+        equity = pd.Series(np.cumsum(strategy_daily_pnl(bt_results['trades'], close)), index=close.index)
+        self.backtests[ticker] = {'results': bt_results, 'equity': equity}
+        self._tables = None
+
+    def set_summary(self, summary):
+        self.summary = dict(summary)
+        self._tables = None
+
+    def set_ml_results(self, ml_results):
+        self.ml_results = ml_results
+        self._tables = None
+
+    def set_screens(self, rows):
+        self.screens = rows
+        self._tables = None
+
+    def set_quality(self, columns, rows):
+        self.quality = (columns, rows)
+        self._tables = None
+
+    def equity_curves(self):
+        """Dates x tickers equity curves plus their sum as Portfolio"""
+        if not self.backtests:
+            return pd.DataFrame()
+        curves = pd.DataFrame({t: b['equity'] for t, b in self.backtests.items()}).sort_index()
+        curves = curves.ffill().fillna(0.0)
+        curves['Portfolio'] = curves.sum(axis=1)
+        return curves
+
+    def tables(self):
+        """Table name -> rows (header first), built once"""
+        if self._tables is not None:
+            return self._tables
+        tables = {
+            'Summary': summary_table(self.summary),
+            'Analytics': analytics_table(self.ml_results),
+        }
+
+        trades = [TRADES_HEADER]
+        for ticker, backtest in self.backtests.items():
+            for t in backtest['results']['trades']:
+                trades.append([ticker, _date(t['entry_date']), _date(t['exit_date']),
+                               round(float(t['entry_price']), 2), round(float(t['exit_price']), 2),
+                               round(float(t['pnl']), 2), round(float(t['pnl_pct']), 2), int(t['days_held']),
+                               t['exit_reason'], round(float(t['costs']), 2)])
+        tables['Backtest_Trades'] = trades
+
+        curves = self.equity_curves()
+        equity = [["Date"] + list(curves.columns)]
+        for date, values in zip(curves.index, curves.to_numpy()):
+            equity.append([_date(date)] + [round(float(v), 2) for v in values])
+        tables['Equity_Curves'] = equity
+
+        if self.screens is not None:
+            tables['Screens'] = [SCREENS_HEADER] + [list(row) for row in self.screens]
+        if self.quality is not None:
+            columns, rows = self.quality
+            tables['Data_Quality'] = [list(columns)] + [list(row) for row in rows]
+        self._tables = tables
+        return tables
+
+def _digest(rows):
+    return hashlib.sha1(json.dumps(rows, default=str).encode('utf-8')).hexdigest()
+
+# Digest of the last successful write per sink target and table, kept across runs
+_sink_state = {}
+
+class Sink(ABC):
+    """Base sink: writes only the tables that changed since its last successful write"""
+
+    name = 'sink'
+    tables = None
+
+    def __init__(self, key=None):
+        self._written = _sink_state.setdefault((self.name, key), {})
+
+    def changed(self, report):
+        """Tables (of those this sink renders) whose content differs from the last write"""
+        changed = {}
+        for name, rows in report.tables().items():
+            if self.tables is not None and name not in self.tables:
+                continue
+            digest = _digest(rows)
+            if self._written.get(name) != digest:
+                changed[name] = (rows, digest)
+        return changed
+
+    def render(self, report):
+        changed = self.changed(report)
+        if not changed:
+            return True
+        ok = self.write(report, {name: rows for name, (rows, _) in changed.items()})
+        if ok:
+            self._written.update({name: digest for name, (_, digest) in changed.items()})
+        return ok
+
+    @abstractmethod
+    def write(self, report, tables):
+        """Write the changed tables (name -> rows); returns True on success"""
+
+class ExcelSink(Sink):
+    """Writes changed tables to the Excel workbook in one open/save"""
+
+    name = 'excel'
+
+    def __init__(self, manager, tables=None):
+        super().__init__(manager.file_path)
+        self.manager = manager
+        self.tables = tables
+
+    def changed(self, report):
+        if not os.path.exists(self.manager.file_path):
+            self._written.clear()
+        return super().changed(report)
+
+    def write(self, report, tables):
+        timestamp = report.generated_at.strftime('%Y-%m-%d %H:%M:%S')
+        frames = {}
+        for name, rows in tables.items():
+            frame = pd.DataFrame(rows[1:], columns=rows[0])
+            if name != 'Summary':
+                frame['Timestamp'] = timestamp
+            frames[name] = frame
+        return self.manager.write_sheets(frames)
+
+class SheetsSink(Sink):
+    """Writes changed tables to Google Sheets worksheets (table name -> worksheet)"""
+
+    name = 'sheets'
+
+    def __init__(self, worksheets):
+        super().__init__()
+        self.worksheets = worksheets
+        self.tables = set(worksheets)
+
+    def write(self, report, tables):
+        for name, rows in tables.items():
+            ws = self.worksheets[name]
+            ws.clear()
+            ws.update(rows)
+        return True
+
+class HtmlSink(Sink):
+    """Writes a standalone HTML report with inline SVG equity curves"""
+
+    name = 'html'
+
+    def __init__(self, path="report.html"):
+        super().__init__(path)
+        self.path = path
+
+    def changed(self, report):
+        # The page is one file, so any change rewrites all of it
+        if not os.path.exists(self.path):
+            self._written.clear()
+        changed = super().changed(report)
+        if changed:
+            return {name: (rows, _digest(rows)) for name, rows in report.tables().items()}
+        return changed
+
+    def write(self, report, tables):
+        parts = [f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Algo Trading Report</title>",
+                 "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:2em}"
+                 "td,th{border:1px solid #ccc;padding:3px 8px;text-align:right}th{background:#eee}"
+                 "svg{border:1px solid #ddd;margin:4px}</style></head><body>",
+                 f"<h1>Algo Trading Report</h1><p>Generated {report.generated_at:%Y-%m-%d %H:%M:%S}</p>"]
+        curves = report.equity_curves()
+        if not curves.empty:
+            parts.append("<h2>Equity Curves</h2>")
+            for column in curves.columns:
+                parts.append(_svg_line(column, curves[column].to_numpy()))
+        for name, rows in tables.items():
+            if name == 'Equity_Curves':
+                continue
+            parts.append(f"<h2>{html.escape(name.replace('_', ' '))}</h2>{_html_table(rows)}")
+        parts.append("</body></html>")
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write("".join(parts))
+        os.replace(tmp, self.path)
+        return True
+
+def _html_table(rows):
+    header = "".join(f"<th>{html.escape(str(c))}</th>" for c in rows[0])
+    body = "".join("<tr>" + "".join(f"<td>{html.escape(str(c))}</td>" for c in row) + "</tr>" for row in rows[1:])
+    return f"<table><tr>{header}</tr>{body}</table>"
+
+def _svg_line(title, values, width=480, height=140):
+    """Small SVG line chart of one equity curve"""
+    low, high = float(np.min(values)), float(np.max(values))
+    span = high - low or 1.0
+    xs = np.linspace(5, width - 5, len(values))
+    ys = height - 20 - (values - low) / span * (height - 35)
+    points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys))
+    colour = '#2a8a2a' if values[-1] >= 0 else '#c0392b'
+    return (f"<svg width='{width}' height='{height}'><text x='5' y='14' font-size='12'>{html.escape(str(title))}: "
+            f"{values[-1]:.2f}</text><polyline fill='none' stroke='{colour}' stroke-width='1.5' points='{points}'/></svg>")
+
+class TelegramSink(Sink):
+    """Sends a digest: summary, top predictions and best/worst backtests"""
+
+    name = 'telegram'
+    tables = {'Summary', 'Analytics', 'Backtest_Trades'}
+
+    def __init__(self, send, top=3):
+        super().__init__()
+        self.send = send
+        self.top = top
+
+    def write(self, report, tables):
+        s = report.summary
+        lines = ["📊 *Trading Summary Report*", "",
+                 f"📈 Total Trades: {s.get('Total Trades', 0)}",
+                 f"✅ Wins: {s.get('Wins', 0)}",
+                 f"❌ Losses: {s.get('Losses', 0)}",
+                 f"💰 Net P&L: ₹{s.get('Net P&L', 0):.2f}",
+                 f"📊 Win Ratio: {s.get('Win Ratio (%)', 0):.2f}%"]
+        if 'Paper Equity' in s:
+            lines.append(f"🧾 Paper Equity: ₹{s['Paper Equity']:.2f}")
+
+        predictions = sorted(report.tables()['Analytics'][1:], key=lambda r: -max(r[3], r[4]))[:self.top]
+        if predictions:
+            lines.append("\n🤖 *Most confident predictions*")
+            lines.extend(f"{r[0]}: {r[2]} (up {r[3]:.2f}, acc {r[1]:.2f})" for r in predictions)
+
+        ranked = sorted(report.backtests.items(), key=lambda kv: -kv[1]['results']['net_pnl'])
+        if ranked:
+            lines.append("\n🏁 *Backtests*")
+            best = ranked[:self.top] if len(ranked) <= 2 * self.top else ranked[:self.top] + ranked[-self.top:]
+            lines.extend(f"{t}: {b['results']['total']} trades, P&L {b['results']['net_pnl']:.2f}" for t, b in best)
+        return self.send("\n".join(lines))
+
+class ScreensSink(Sink):
+    """Sends the top candidates of each screen when they change"""
+
+    name = 'screens'
+    tables = {'Screens'}
+
+    def __init__(self, send, top=5):
+        super().__init__()
+        self.send = send
+        self.top = top
+
+    def write(self, report, tables):
+        picks = {}
+        for screen, _, ticker, value, _, _ in tables['Screens'][1:]:
+            names = picks.setdefault(screen, [])
+            if len(names) < self.top:
+                names.append(f"{ticker} ({value:.2f})")
+        if not picks:
+            return True
+        lines = ["🔎 *Screening Results*"] + [f"\n*{screen}*: {', '.join(names)}" for screen, names in picks.items()]
+        return self.send("\n".join(lines))
+
+def render_report(report, sinks, max_workers=None):
+    """Render a report to every sink concurrently; returns sink name -> success
+
+    Tables are built once before the sinks start. A failing sink is logged
+    and counted in IO_FAILURES without affecting the others.
+    """
+    report.tables()
+
+    def run(sink):
+        try:
+            return sink.render(report)
+        except Exception as e:
+            logger.error(f"Error rendering report to {sink.name}: {e}", extra={'stage': 'report'})
+            return False
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(sinks), 1)) as executor:
+        results = dict(zip([s.name for s in sinks], executor.map(run, sinks)))
+    for name, ok in results.items():
+        if not ok:
+            IO_FAILURES.inc(sink=name)
+    return results
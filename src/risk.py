@@ -0,0 +1,208 @@
+"""
+Portfolio risk engine for live signals
+Keeps an incrementally updated rolling covariance of daily returns across
+the universe and vetoes or resizes BUY signals that breach correlation,
+sector exposure or position-size limits
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+class RollingCovariance:
+    """Rolling-window covariance and correlation of returns, updated one bar at a time
+
+    Keeps running sums of returns and of their outer products over the last
+    `window` bars in a ring buffer, so each bar costs O(tickers^2) no matter
+    how long the history is. The sums are rebuilt from the buffer every
+    `window` bars to stop floating-point drift. A missing return is left out
+    of every pair it belongs to, so each pair uses the bars both tickers have.
+    """
+
+    def __init__(self, tickers, window=60):
+        self.tickers = list(tickers)
+        self.window = window
+        n = len(self.tickers)
+        self.buffer = np.full((window, n), np.nan)
+        self.count = 0
+        self.pos = 0
+        # sum[i, j] adds ticker i's returns over the bars where j also has one
+        self.sum = np.zeros((n, n))
+        self.sum_outer = np.zeros((n, n))
+        self.pair_count = np.zeros((n, n))
+        self.last_close = np.full(n, np.nan)
+        self.last_date = None
+        self.updates_since_rebuild = 0
+
+    @staticmethod
+    def _terms(returns):
+        """(sum, outer product, pair count) contributions of returns with NaN for missing"""
+        present = ~np.isnan(returns)
+        values = np.where(present, returns, 0.0)
+        present = present.astype(float)
+        return values.T @ present, values.T @ values, present.T @ present
+
+    def update(self, returns):
+        """Add one bar of returns (array aligned with tickers, NaN where missing)"""
+        r = np.asarray(returns, dtype=float)
+        if self.count == self.window:
+            old = self._terms(self.buffer[self.pos:self.pos + 1])
+            self.sum -= old[0]
+            self.sum_outer -= old[1]
+            self.pair_count -= old[2]
+        else:
+            self.count += 1
+        self.buffer[self.pos] = r
+        new = self._terms(r[None, :])
+        self.sum += new[0]
+        self.sum_outer += new[1]
+        self.pair_count += new[2]
+        self.pos = (self.pos + 1) % self.window
+
+        self.updates_since_rebuild += 1
+        if self.updates_since_rebuild >= self.window:
+            self.sum, self.sum_outer, self.pair_count = self._terms(self.buffer[:self.count])
+            self.updates_since_rebuild = 0
+
+    def update_from_closes(self, closes):
+        """Feed a dates x tickers close panel, processing only bars after the last one seen
+
+        A missing close (a failed fetch, or no listing yet) masks the returns
+        into and out of that bar rather than counting as 0 or spanning the gap.
+        """
+        closes = closes.reindex(columns=self.tickers).sort_index()
+        if self.last_date is not None:
+            closes = closes.loc[closes.index > self.last_date]
+        for date, row in zip(closes.index, closes.to_numpy(dtype=float)):
+            if not np.isnan(self.last_close).all():
+                self.update(row / self.last_close - 1)
+            self.last_close = row
+            self.last_date = date
+        return self
+
+    def covariance(self):
+        """Sample covariance matrix over the current window"""
+        n = self.pair_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (self.sum_outer - self.sum * self.sum.T / n) / (n - 1)
+        return np.where(n >= 2, cov, np.nan)
+
+    def correlation(self):
+        """Correlation matrix as a DataFrame indexed by ticker"""
+        cov = self.covariance()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.tickers, columns=self.tickers)
+
+    def save(self, path):
+        """Persist the state so the next run only processes new bars"""
+        np.savez(path, tickers=np.array(self.tickers), window=self.window, buffer=self.buffer,
+                 count=self.count, pos=self.pos, sum=self.sum, sum_outer=self.sum_outer,
+                 pair_count=self.pair_count, last_close=self.last_close, updates_since_rebuild=self.updates_since_rebuild,
+                 last_date=np.array([] if self.last_date is None else [str(self.last_date)]))
+
+    @classmethod
+    def load(cls, path, tickers, window=60):
+        """Load saved state, or start fresh if missing or for a different universe/window"""
+        if os.path.exists(path):
+            try:
+                state = np.load(path, allow_pickle=False)
+                if list(state['tickers']) == list(tickers) and int(state['window']) == window:
+                    rc = cls(tickers, window)
+                    rc.buffer = state['buffer']
+                    rc.count = int(state['count'])
+                    rc.pos = int(state['pos'])
+                    rc.sum = state['sum']
+                    rc.sum_outer = state['sum_outer']
+                    rc.pair_count = state['pair_count']
+                    rc.last_close = state['last_close']
+                    rc.updates_since_rebuild = int(state['updates_since_rebuild'])
+                    if len(state['last_date']):
+                        rc.last_date = pd.Timestamp(str(state['last_date'][0]))
+                    return rc
+            except Exception:
+                pass
+        return cls(tickers, window)
+
+class RiskEngine:
+    """Vetoes or resizes signals against portfolio risk limits
+
+    BUY sizing risks `risk_per_trade` of capital on a stop `atr_multiple`
+    ATRs away, capped at `max_position` of capital. A BUY is vetoed if its
+    ticker is correlated above `max_correlation` with an open or already
+    accepted position, and resized (or vetoed) to keep each sector within
+    `max_sector` of capital. SELL signals always pass.
+    """
+
+    def __init__(self, covariance, sectors, capital=1_000_000, risk_per_trade=0.01, max_position=0.10,
+                 max_sector=0.25, max_correlation=0.8, atr_multiple=2.0):
+        self.covariance = covariance
+        self.sectors = sectors
+        self.capital = capital
+        self.risk_per_trade = risk_per_trade
+        self.max_position = max_position
+        self.max_sector = max_sector
+        self.max_correlation = max_correlation
+        self.atr_multiple = atr_multiple
+
+    def evaluate(self, signals, open_positions=None):
+        """Decide on a batch of signals
+
+        `signals` are dicts with ticker, signal, price and atr; `open_positions`
+        maps ticker -> notional already held. Returns the signals with
+        action (ALLOW/RESIZE/VETO), quantity and reason added.
+        """
+        held = dict(open_positions or {})
+        corr = self.covariance.correlation() if self.covariance is not None else None
+        sector_exposure = {}
+        for ticker, notional in held.items():
+            sector = self.sectors.get(ticker, ticker)
+            sector_exposure[sector] = sector_exposure.get(sector, 0) + notional
+
+        decisions = []
+        for sig in signals:
+            decision = dict(sig, action='ALLOW', quantity=0, reason='')
+            decisions.append(decision)
+            if sig['signal'] != 'BUY':
+                continue
+
+            ticker, price, atr = sig['ticker'], sig['price'], sig.get('atr')
+            if ticker in held:
+                decision.update(action='VETO', reason='already holding')
+                continue
+
+            # Correlation with open and accepted positions
+            if corr is not None and ticker in corr.index:
+                peers = [t for t in held if t in corr.columns and t != ticker]
+                if peers:
+                    peer_corr = corr.loc[ticker, peers]
+                    worst = peer_corr.idxmax() if peer_corr.notna().any() else None
+                    if worst is not None and peer_corr[worst] > self.max_correlation:
+                        decision.update(action='VETO', reason=f"corr {peer_corr[worst]:.2f} with {worst}")
+                        continue
+
+            # ATR-based size capped by position limit
+            if atr is not None and atr > 0 and not np.isnan(atr):
+                quantity = int(self.capital * self.risk_per_trade / (self.atr_multiple * atr))
+            else:
+                quantity = int(self.capital * self.max_position / price)
+            quantity = min(quantity, int(self.capital * self.max_position / price))
+            reason = ''
+
+            # Sector exposure
+            sector = self.sectors.get(ticker, ticker)
+            room = self.capital * self.max_sector - sector_exposure.get(sector, 0)
+            if quantity * price > room:
+                quantity = int(max(room, 0) / price)
+                reason = f"sector {sector} at {self.max_sector:.0%} cap"
+
+            if quantity < 1:
+                decision.update(action='VETO', reason=reason or 'size below one share')
+                continue
+
+            decision.update(action='RESIZE' if reason else 'ALLOW', quantity=quantity, reason=reason)
+            held[ticker] = quantity * price
+            sector_exposure[sector] = sector_exposure.get(sector, 0) + quantity * price
+
+        return decisions
@@ -0,0 +1,137 @@
+"""
+Monte Carlo robustness analysis of backtest results
+Resamples trades and strategy P&L paths to put confidence intervals on
+the single point estimate returned by backtest_signals
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+# Simulations are evaluated in batches of this many to bound memory
+SIM_BATCH = 2000
+
+def _max_drawdown(pnl):
+    """Max drawdown of the cumulative P&L of every row of a (sims, steps) array"""
+    equity = np.cumsum(pnl, axis=1)
+    equity = np.concatenate([np.zeros((len(pnl), 1)), equity], axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    return (peak - equity).max(axis=1)
+
+def _bootstrap_trade_batch(pnls, n_sims, seed):
+    """Resample trade P&Ls with replacement; return net P&L, win ratio and drawdown per sim"""
+    rng = np.random.default_rng(seed)
+    net, win, dd = [], [], []
+    for start in range(0, n_sims, SIM_BATCH):
+        size = min(SIM_BATCH, n_sims - start)
+        sample = pnls[rng.integers(0, len(pnls), size=(size, len(pnls)))]
+        net.append(sample.sum(axis=1))
+        win.append((sample > 0).mean(axis=1) * 100)
+        dd.append(_max_drawdown(sample))
+    return np.concatenate(net), np.concatenate(win), np.concatenate(dd)
+
+def _block_bootstrap_batch(daily_pnl, block_size, n_sims, seed):
+    """Moving-block resample of the daily P&L series; return net P&L and drawdown per sim"""
+    rng = np.random.default_rng(seed)
+    n = len(daily_pnl)
+    block_size = max(1, min(block_size, n))
+    n_blocks = -(-n // block_size)
+    offsets = np.arange(block_size)
+    net, dd = [], []
+    for start in range(0, n_sims, SIM_BATCH):
+        size = min(SIM_BATCH, n_sims - start)
+        starts = rng.integers(0, n - block_size + 1, size=(size, n_blocks))
+        idx = (starts[:, :, None] + offsets).reshape(size, -1)[:, :n]
+        sample = daily_pnl[idx]
+        net.append(sample.sum(axis=1))
+        dd.append(_max_drawdown(sample))
+    return np.concatenate(net), np.concatenate(dd)
+
+def _run_split(func, args, n_sims, seed_seq, workers):
+    """Split n_sims across processes with independent seeds and concatenate the results"""
+    seeds = seed_seq.spawn(max(1, workers))
+    if workers <= 1:
+        return func(*args, n_sims, seeds[0])
+
+    sizes = [n_sims // workers + (1 if i < n_sims % workers else 0) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, *args, size, s) for size, s in zip(sizes, seeds) if size]
+        parts = [f.result() for f in futures]
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+def confidence_interval(values, confidence=0.90):
+    """Summarise simulated values as mean, median and a two-sided percentile interval"""
+    tail = (1 - confidence) / 2 * 100
+    lower, median, upper = np.percentile(values, [tail, 50, 100 - tail])
+    return {'mean': float(np.mean(values)), 'lower': float(lower), 'median': float(median), 'upper': float(upper)}
+
+def strategy_daily_pnl(trades, close):
+    """Per-bar P&L of holding one share during each trade
+
+    Bars inside a trade earn the Close-to-Close change; the exit bar is
+    adjusted so each trade sums exactly to its recorded pnl (fills and costs).
+    Trades entered or exited on a date missing from `close` are dropped
+    with a warning.
+    """
+    prices = close.to_numpy(dtype=float)
+    daily_pnl = np.zeros(len(prices))
+    if not trades:
+        return daily_pnl
+
+    changes = np.diff(prices, prepend=prices[0])
+    entry_bars = close.index.get_indexer([t['entry_date'] for t in trades])
+    exit_bars = close.index.get_indexer([t['exit_date'] for t in trades])
+    missing = (entry_bars < 0) | (exit_bars < 0)
+    if missing.any():
+        dates = ", ".join(f"{t['entry_date']:%Y-%m-%d}->{t['exit_date']:%Y-%m-%d}"
+                          for t, skip in zip(trades, missing) if skip)
+        logger.warning(f"Dropped {missing.sum()} trades dated outside the price series: {dates}")
+        trades = [t for t, skip in zip(trades, missing) if not skip]
+        entry_bars, exit_bars = entry_bars[~missing], exit_bars[~missing]
+
+    # Held bars are (entry, exit]; mark them with a +1/-1 difference array
+    held = np.zeros(len(prices) + 1)
+    np.add.at(held, entry_bars + 1, 1)
+    np.add.at(held, exit_bars + 1, -1)
+    daily_pnl = np.cumsum(held[:-1]) * changes
+
+    recorded = np.array([t['pnl'] for t in trades])
+    np.add.at(daily_pnl, exit_bars, recorded - (prices[exit_bars] - prices[entry_bars]))
+    return daily_pnl
+
+def monte_carlo(bt_results, close, n_sims=1000, block_size=10, confidence=0.90, seed=None, workers=1):
+    """Bootstrap confidence intervals for a backtest_signals result
+
+    'trades' resamples the trade P&Ls with replacement (net P&L, win ratio,
+    drawdown); 'paths' block-resamples the strategy's daily P&L series to
+    keep serial correlation (net P&L, drawdown). workers > 1 spreads the
+    simulations across processes.
+    """
+    trades = bt_results['trades']
+    report = {'n_sims': n_sims, 'confidence': confidence, 'trades': None, 'paths': None}
+    if not trades or n_sims <= 0:
+        return report
+
+    seeds = np.random.SeedSequence(seed).spawn(2)
+
+    pnls = np.array([t['pnl'] for t in trades], dtype=float)
+    net, win, dd = _run_split(_bootstrap_trade_batch, (pnls,), n_sims, seeds[0], workers)
+    report['trades'] = {
+        'net_pnl': confidence_interval(net, confidence),
+        'win_ratio': confidence_interval(win, confidence),
+        'max_drawdown': confidence_interval(dd, confidence),
+        'prob_loss': float((net < 0).mean())
+    }
+
+    daily_pnl = strategy_daily_pnl(trades, close)
+    net, dd = _run_split(_block_bootstrap_batch, (daily_pnl, block_size), n_sims, seeds[1], workers)
+    report['paths'] = {
+        'net_pnl': confidence_interval(net, confidence),
+        'max_drawdown': confidence_interval(dd, confidence),
+        'prob_loss': float((net < 0).mean())
+    }
+
+    return report
@@ -0,0 +1,301 @@
+"""
+Job scheduler
+Runs jobs on the NSE trading calendar from an asyncio event loop. Each job
+has a cadence (a daily time or every N minutes through the session), a
+priority and an execution lane. Due jobs wait in a priority queue and each
+lane runs one job at a time on its own thread, so a long retrain in the
+background lane never delays a signal scan. Jobs in one group never
+overlap: occurrences that fall due while a run is queued collapse into it,
+and occurrences missed while the process was down are caught up once.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone
+
+from market_calendar import is_trading_day, PRE_OPEN, MARKET_OPEN, MARKET_CLOSE
+from metrics import JOB_RUNS, JOB_DELAY
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+# Exchange local time; India has no daylight saving
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Longest the loop sleeps before re-reading the clock, so a suspended host catches up soon after waking
+MAX_SLEEP = 60.0
+
+# Days searched for a cadence's next occurrence; longer than any exchange closure
+SEARCH_DAYS = 15
+
+def ist_now():
+    """Current exchange local time as a naive datetime"""
+    return datetime.now(IST).replace(tzinfo=None)
+
+def in_session(now):
+    """True from pre-open to the close on trading days"""
+    return is_trading_day(now) and PRE_OPEN <= now.time() < MARKET_CLOSE
+
+class Cadence(ABC):
+    """Times of day a job falls due, on trading days only"""
+
+    @abstractmethod
+    def times(self, day):
+        """Sorted times of day the job is due on `day`"""
+
+    def occurrences(self, start, end):
+        """Due datetimes in (start, end]"""
+        due = []
+        day = start.date()
+        while day <= end.date():
+            if is_trading_day(day):
+                due.extend(at for at in (datetime.combine(day, t) for t in self.times(day)) if start < at <= end)
+            day += timedelta(days=1)
+        return due
+
+    def next_after(self, moment):
+        """First due datetime strictly after `moment`, or None"""
+        day = moment.date()
+        for _ in range(SEARCH_DAYS):
+            if is_trading_day(day):
+                for t in self.times(day):
+                    at = datetime.combine(day, t)
+                    if at > moment:
+                        return at
+            day += timedelta(days=1)
+        return None
+
+class Daily(Cadence):
+    """Once per trading day at a fixed time"""
+
+    def __init__(self, at):
+        self.at = at
+
+    def times(self, day):
+        return (self.at,)
+
+    def __repr__(self):
+        return f"at {self.at:%H:%M}"
+
+class Every(Cadence):
+    """Every N minutes after `start` up to and including `end`, on trading days"""
+
+    def __init__(self, minutes, start=MARKET_OPEN, end=MARKET_CLOSE):
+        if minutes <= 0:
+            raise ValueError(f"Cadence interval must be positive, got {minutes}")
+        self.minutes = minutes
+        first = start.hour * 60 + start.minute
+        last = end.hour * 60 + end.minute
+        self._times = tuple(time(m // 60, m % 60) for m in range(first + minutes, last + 1, minutes))
+
+    def times(self, day):
+        return self._times
+
+    def __repr__(self):
+        return f"every {self.minutes}m"
+
+def parse_cadence(text):
+    """Cadence from 'at HH:MM' or 'every N[m]'; None for '' or 'off'"""
+    text = (text or '').strip().lower()
+    if text in ('', 'off', 'none'):
+        return None
+    match = re.fullmatch(r'at\s+(\d{1,2}):(\d{2})', text)
+    if match:
+        return Daily(time(int(match.group(1)), int(match.group(2))))
+    match = re.fullmatch(r'every\s+(\d+)\s*m?', text)
+    if match:
+        return Every(int(match.group(1)))
+    raise ValueError(f"Unknown cadence {text!r}; use 'at HH:MM' or 'every N m'")
+
+class Job:
+    """A function run on a cadence
+
+    Lower `priority` runs first. Jobs in one `lane` run one at a time on
+    that lane's thread, and jobs in one `group` (default: the job itself)
+    never run concurrently. An `off_peak` job is held while the market is
+    in session. Without `catch_up`, runs missed while the scheduler was
+    down are dropped.
+    """
+
+    def __init__(self, name, func, cadence, priority=10, lane='scan', group=None, off_peak=False, catch_up=True):
+        self.name = name
+        self.func = func
+        self.cadence = cadence
+        self.priority = priority
+        self.lane = lane
+        self.group = group or name
+        self.off_peak = off_peak
+        self.catch_up = catch_up
+
+class Scheduler:
+    """Priority-queued jobs on the trading calendar
+
+    `state_file` records the last occurrence each job ran so a restart can
+    catch up what it missed. `clock` returns naive exchange-local time.
+    """
+
+    def __init__(self, state_file=None, clock=ist_now, max_sleep=MAX_SLEEP):
+        self.state_file = state_file
+        self.clock = clock
+        self.max_sleep = max_sleep
+        self.jobs = {}
+        self.state = self._load_state()
+        self.stats = {'runs': 0, 'errors': 0, 'coalesced': 0}
+        self._checked = {}
+        self._queue = []
+        self._queued = set()
+        self._seq = itertools.count()
+        self._busy_lanes = set()
+        self._busy_groups = set()
+        self._executors = {}
+
+    def _load_state(self):
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file) as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read scheduler state: {e}")
+        return {}
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file + '.tmp', 'w') as f:
+                json.dump(self.state, f)
+            os.replace(self.state_file + '.tmp', self.state_file)
+        except Exception as e:
+            logger.error(f"Error saving scheduler state: {e}")
+
+    def add(self, job, now=None):
+        """Register a job; occurrences since its last recorded run are caught up"""
+        now = now or self.clock()
+        last = self.state.get(job.name)
+        self.jobs[job.name] = job
+        self._checked[job.name] = datetime.fromisoformat(last) if last and job.catch_up else now
+        return job
+
+    @property
+    def idle(self):
+        """True when nothing is queued or running"""
+        return not self._queue and not self._busy_lanes
+
+    def collect(self, now):
+        """Queue every job with an occurrence since the last collect; returns the names queued"""
+        queued = []
+        for job in self.jobs.values():
+            if job.cadence is None:
+                continue
+            due = job.cadence.occurrences(self._checked[job.name], now)
+            self._checked[job.name] = now
+            if not due:
+                continue
+            if len(due) > 1:
+                logger.info(f"Catching up {job.name}: {len(due)} missed runs collapsed into one")
+                self.stats['coalesced'] += len(due) - 1
+                JOB_RUNS.inc(len(due) - 1, job=job.name, outcome='coalesced')
+            if self._enqueue(job, due[-1]):
+                queued.append(job.name)
+        return queued
+
+    def _enqueue(self, job, due):
+        if job.name in self._queued:
+            # The queued run stands in for this occurrence too, so it records the later due time
+            self._queue = [(p, max(d, due), s, n) if n == job.name else (p, d, s, n) for p, d, s, n in self._queue]
+            heapq.heapify(self._queue)
+            self.stats['coalesced'] += 1
+            JOB_RUNS.inc(job=job.name, outcome='coalesced')
+            return False
+        heapq.heappush(self._queue, (job.priority, due, next(self._seq), job.name))
+        self._queued.add(job.name)
+        return True
+
+    def next_ready(self, now):
+        """Remove and return (job, due) for the highest-priority job that may start now, or None"""
+        peak = in_session(now)
+        for entry in sorted(self._queue):
+            job = self.jobs[entry[3]]
+            if job.lane in self._busy_lanes or job.group in self._busy_groups or (job.off_peak and peak):
+                continue
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._queued.discard(job.name)
+            return job, entry[1]
+        return None
+
+    def start(self, job):
+        self._busy_lanes.add(job.lane)
+        self._busy_groups.add(job.group)
+
+    def finish(self, job, due, ok):
+        """Release a job's lane and group and record the occurrence it ran"""
+        self._busy_lanes.discard(job.lane)
+        self._busy_groups.discard(job.group)
+        self.stats['runs'] += 1
+        self.stats['errors'] += not ok
+        JOB_RUNS.inc(job=job.name, outcome='ok' if ok else 'error')
+        self.state[job.name] = due.isoformat()
+        self._save_state()
+
+    def execute(self, job, due):
+        """Run one job; returns True on success"""
+        JOB_DELAY.observe(max((self.clock() - due).total_seconds(), 0.0), job=job.name)
+        logger.info(f"Running {job.name} (due {due:%Y-%m-%d %H:%M})", extra={'stage': 'scheduler'})
+        try:
+            job.func()
+            return True
+        except Exception as e:
+            logger.error(f"Scheduled job {job.name} failed: {e}", extra={'stage': 'scheduler'})
+            return False
+
+    def _sleep_for(self, now):
+        wake = [job.cadence.next_after(self._checked[job.name]) for job in self.jobs.values() if job.cadence is not None]
+        if any(self.jobs[name].off_peak for name in self._queued) and in_session(now):
+            wake.append(datetime.combine(now.date(), MARKET_CLOSE))
+        wake = [(at - now).total_seconds() for at in wake if at is not None]
+        return min(max(min(wake, default=self.max_sleep), 0.0), self.max_sleep)
+
+    def _executor(self, lane):
+        if lane not in self._executors:
+            self._executors[lane] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"job-{lane}")
+        return self._executors[lane]
+
+    async def run(self, until=None):
+        """Run due jobs until `until(scheduler)` returns True (forever by default)"""
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        running = set()
+
+        def done(future, job, due):
+            running.discard(future)
+            self.finish(job, due, future.result())
+            wake.set()
+
+        try:
+            while until is None or not until(self):
+                now = self.clock()
+                self.collect(now)
+                while (ready := self.next_ready(now)) is not None:
+                    job, due = ready
+                    self.start(job)
+                    future = loop.run_in_executor(self._executor(job.lane), self.execute, job, due)
+                    future.add_done_callback(lambda f, job=job, due=due: done(f, job, due))
+                    running.add(future)
+                try:
+                    await asyncio.wait_for(wake.wait(), self._sleep_for(now))
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+            if running:
+                await asyncio.gather(*running)
+        finally:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False)
+            self._executors.clear()
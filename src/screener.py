@@ -0,0 +1,177 @@
+"""
+Cross-sectional screening over the ticker universe
+Keeps a dates x tickers panel per indicator built from add_indicators
+outputs and ranks, z-scores and filters every ticker's row on the
+latest date at once
+"""
+
+import operator
+import numpy as np
+import pandas as pd
+
+PANEL_FIELDS = ['Close', 'Volume', 'RSI', 'SMA20', 'SMA50', 'MACD', 'MACD_SIGNAL', 'SMA_diff']
+
+_COMPARISONS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+class IndicatorPanel:
+    """Dates x tickers matrices for each indicator field plus derived fields
+
+    Derived fields (computed across all tickers at once):
+    - volume_ratio: Volume / its 20-bar mean
+    - return_N: N-bar close-to-close return, for each N in return_windows
+    """
+
+    def __init__(self, frames, fields=PANEL_FIELDS, return_windows=(5, 20)):
+        self.fields = list(fields)
+        self.return_windows = tuple(return_windows)
+        self.panels = {}
+        self._frames = {}
+        for ticker, df in frames.items():
+            self._frames[ticker] = df
+        self._rebuild()
+
+    def _rebuild(self):
+        self._latest = None
+        self.tickers = sorted(self._frames)
+        for field in self.fields:
+            self.panels[field] = pd.DataFrame(
+                {t: self._frames[t][field] for t in self.tickers if field in self._frames[t].columns},
+                columns=self.tickers
+            ).sort_index()
+        self.dates = self.panels[self.fields[0]].index if self.fields else pd.Index([])
+        self._derive(self.tickers)
+
+    def _derive(self, tickers):
+        """Recompute the derived fields of `tickers` from their base columns"""
+        close = self.panels.get('Close')
+        volume = self.panels.get('Volume')
+        derived = {}
+        if volume is not None:
+            volume = volume[tickers]
+            derived['volume_ratio'] = volume / volume.rolling(20).mean()
+        if close is not None:
+            close = close[tickers]
+            for window in self.return_windows:
+                derived[f'return_{window}'] = close / close.shift(window) - 1
+        for name, values in derived.items():
+            if name in self.panels and len(tickers) < len(self.tickers):
+                self.panels[name][tickers] = values
+            else:
+                self.panels[name] = values
+
+    def update(self, ticker, df):
+        """Replace one ticker's history (e.g. after a new bar), rewriting only its columns
+
+        The other tickers' columns are recomputed only when the panel's dates change.
+        """
+        old = self._frames.get(ticker)
+        self._frames[ticker] = df
+        if old is None or not self.fields:
+            self._rebuild()
+            return
+        self._latest = None
+        dates = self.dates.union(df.index)
+        # Dates only the old frame had, and no other ticker has, leave the panel
+        others = [t for t in self.tickers if t != ticker]
+        gone = old.index.difference(df.index)
+        if len(gone):
+            base = self.panels[self.fields[0]]
+            unused = gone[base.loc[gone, others].isna().all(axis=1).to_numpy()] if others else gone
+            dates = dates.difference(unused)
+        reindexed = not dates.equals(self.dates)
+        for field in self.fields:
+            panel = self.panels[field].reindex(dates) if reindexed else self.panels[field]
+            panel[ticker] = df[field].reindex(dates) if field in df.columns else np.nan
+            self.panels[field] = panel
+        self.dates = dates
+        self._derive(self.tickers if reindexed else [ticker])
+
+    def latest(self):
+        """The panel's latest date as a tickers x fields frame
+
+        Tickers without a bar on that date (a feed that stopped) are NaN, so
+        they drop out of the screens instead of ranking stale values.
+        """
+        if self._latest is None:
+            self._latest = pd.DataFrame(
+                {field: panel.iloc[-1] if len(panel) else np.nan for field, panel in self.panels.items()},
+                index=self.tickers
+            )
+        return self._latest
+
+def cross_rank(values, ascending=True):
+    """Rank across tickers (1 = best), NaN stays NaN"""
+    return values.rank(ascending=ascending, method='min')
+
+def cross_zscore(values):
+    """Z-score across tickers"""
+    std = values.std(ddof=0)
+    if not std or np.isnan(std):
+        return values * 0.0
+    return (values - values.mean()) / std
+
+def relative_strength(panel, benchmark_close, window=20):
+    """Latest N-bar return of every ticker minus the benchmark's N-bar return
+
+    `window` must be one of the panel's return_windows. NaN for every
+    ticker when the panel is too short to give the benchmark an N-bar return.
+    """
+    close = panel.panels['Close']
+    benchmark = benchmark_close.reindex(close.index).ffill()
+    if len(benchmark) <= window:
+        return pd.Series(np.nan, index=panel.tickers)
+    benchmark_return = benchmark.iloc[-1] / benchmark.iloc[-1 - window] - 1
+    return panel.latest()[f'return_{window}'] - benchmark_return
+
+def screen(latest, filters=(), rank_by='RSI', ascending=True, top=10, name='screen'):
+    """Filter and rank the latest cross-section
+
+    `filters` are (field, op, value) tuples with op in < <= > >=. Returns the
+    top candidates with their rank, the rank field's z-score across the whole
+    universe, and the filter fields.
+    """
+    mask = pd.Series(True, index=latest.index)
+    for field, op, value in filters:
+        mask &= _COMPARISONS[op](latest[field], value).fillna(False).astype(bool)
+
+    zscore = cross_zscore(latest[rank_by])
+    candidates = latest.loc[mask & latest[rank_by].notna()]
+    columns = list(dict.fromkeys([rank_by] + [f[0] for f in filters] + ['Close']))
+    result = candidates[columns].copy()
+    result.insert(0, 'rank', cross_rank(candidates[rank_by], ascending=ascending))
+    result['zscore'] = zscore.loc[result.index]
+    result = result.sort_values('rank').head(top)
+    result.index.name = 'Ticker'
+    result.attrs['screen'] = name
+    return result
+
+def run_screens(panel, benchmark_close=None, top=10):
+    """Run the standard screens; returns screen name -> ranked candidates"""
+    latest = panel.latest()
+    results = {
+        'oversold_volume_spike': screen(
+            latest, filters=[('RSI', '<', 30), ('volume_ratio', '>', 1.3)],
+            rank_by='RSI', ascending=True, top=top, name='oversold_volume_spike'),
+        'overbought': screen(
+            latest, filters=[('RSI', '>', 70)],
+            rank_by='RSI', ascending=False, top=top, name='overbought'),
+        'momentum_20d': screen(
+            latest, rank_by='return_20', ascending=False, top=top, name='momentum_20d'),
+    }
+    if benchmark_close is not None and len(panel.dates) > 20:
+        latest = latest.assign(relative_strength=relative_strength(panel, benchmark_close))
+        results['relative_strength'] = screen(
+            latest, rank_by='relative_strength', ascending=False, top=top, name='relative_strength')
+    return results
+
+def screen_rows(results):
+    """Flatten screen results into rows: Screen, Rank, Ticker, Value, Z-Score, Close"""
+    rows = []
+    for name, candidates in results.items():
+        rank_by = candidates.columns[1]
+        for ticker, row in candidates.iterrows():
+            rows.append([name, int(row['rank']), ticker, round(float(row[rank_by]), 4),
+                         round(float(row['zscore']), 3), round(float(row['Close']), 2)])
+    return rows
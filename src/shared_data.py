@@ -0,0 +1,245 @@
+"""
+Shared-memory data plane for multi-process workers
+The parent publishes a SeriesStore's arrays, and result arrays for the
+workers to fill, as named shared memory segments. Workers attach by name
+and read and write the same memory, so neither the input panels nor the
+results are pickled. A SegmentRegistry owns the segments a process
+creates and unlinks them on close or at exit; segments left behind by a
+process that crashed are swept on the next start.
+"""
+
+import os
+import secrets
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from instruments import SeriesStore
+from strategy import RULE_STRATEGY
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+# Segment names are <prefix><owner pid>_<random>, so stale ones can be traced to a dead owner
+SEGMENT_PREFIX = 'algo_'
+SHM_DIR = '/dev/shm'
+
+INDICATOR_OUTPUTS = ['SMA20', 'SMA50', 'RSI', 'MACD', 'MACD_SIGNAL']
+SIGNAL_CODES = {'BUY': 1, 'SELL': -1}
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def sweep_stale_segments(prefix=SEGMENT_PREFIX, shm_dir=SHM_DIR):
+    """Unlink segments whose owning process no longer exists; returns the names removed"""
+    if not os.path.isdir(shm_dir):
+        return []
+    removed = []
+    for name in os.listdir(shm_dir):
+        owner = name[len(prefix):].split('_', 1)[0] if name.startswith(prefix) else ''
+        if owner.isdigit() and not _pid_alive(int(owner)):
+            try:
+                os.unlink(os.path.join(shm_dir, name))
+                removed.append(name)
+            except OSError:
+                pass
+    if removed:
+        logger.warning(f"Removed {len(removed)} shared memory segments left by crashed processes")
+    return removed
+
+def _release(segments, arrays):
+    arrays.clear()
+    for shm in segments.values():
+        try:
+            shm.close()
+        except BufferError:
+            # Arrays still point into the mapping; unlinking frees it once they are gone
+            pass
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+    segments.clear()
+
+class SegmentRegistry:
+    """Shared memory segments owned by this process
+
+    create/share return arrays backed by new segments together with a spec
+    (name, shape, dtype) that workers pass to attach. close() unlinks them
+    all and also runs at interpreter exit. Creating a registry first sweeps
+    segments left by crashed owners.
+    """
+
+    def __init__(self, prefix=SEGMENT_PREFIX):
+        self.prefix = prefix
+        self.segments = {}
+        self.arrays = {}
+        sweep_stale_segments(prefix)
+        self._finalizer = weakref.finalize(self, _release, self.segments, self.arrays)
+
+    def create(self, shape, dtype=float, fill=None):
+        """New shared array; returns (array, spec)"""
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        shm = SharedMemory(name=f"{self.prefix}{os.getpid()}_{secrets.token_hex(6)}", create=True, size=size)
+        self.segments[shm.name] = shm
+        array = self.arrays[shm.name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        if fill is not None:
+            array.fill(fill)
+        return array, {'name': shm.name, 'shape': tuple(shape), 'dtype': dtype.str}
+
+    def array(self, spec):
+        """This process's view of one of its segments"""
+        return self.arrays[spec['name']]
+
+    def share(self, values):
+        """Copy an array into a new segment; returns its spec"""
+        values = np.ascontiguousarray(values)
+        array, spec = self.create(values.shape, values.dtype)
+        array[...] = values
+        return spec
+
+    @property
+    def nbytes(self):
+        return sum(shm.size for shm in self.segments.values())
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# pid -> whether that process runs its own resource tracker
+_OWN_TRACKER = {}
+
+def _has_own_tracker():
+    """True when this process started its own resource tracker instead of sharing its parent's"""
+    pid = os.getpid()
+    if pid not in _OWN_TRACKER:
+        _OWN_TRACKER[pid] = resource_tracker._resource_tracker._fd is None
+    return _OWN_TRACKER[pid]
+
+class Attached:
+    """Segments mapped into a worker by spec, released on close
+
+    A worker forked after its parent started the resource tracker shares
+    it, and the tracker already knows the segments. A worker with a
+    tracker of its own (a pool forked before any segment existed, or a
+    process started some other way) would have them unlinked when it
+    exits, so it unregisters them after attaching. Pass `untrack` to
+    force either behaviour.
+    """
+
+    def __init__(self, untrack=None):
+        self.untrack = untrack
+        self._segments = []
+
+    def array(self, spec):
+        untrack = _has_own_tracker() if self.untrack is None else self.untrack
+        shm = SharedMemory(name=spec['name'])
+        if untrack:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        self._segments.append(shm)
+        return np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=shm.buf)
+
+    def close(self):
+        for shm in self._segments:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def publish_store(store, registry, outputs=INDICATOR_OUTPUTS):
+    """Share a store's arrays plus NaN-filled float outputs and a signal code array; returns the manifest
+
+    The manifest is a small dict of segment specs and is all a worker needs.
+    """
+    columns = store.columns
+    manifest = {
+        'ids': registry.share(store.ids),
+        'timestamps': registry.share(store.timestamps.view(np.int64)),
+        'columns': {field: registry.share(values) for field, values in columns.items()},
+        'outputs': {name: registry.create((len(store),), float, np.nan)[1] for name in outputs},
+        'bounds': [(int(a), int(b)) for a, b in zip(store.starts, store.ends)],
+    }
+    manifest['outputs']['signal'] = registry.create((len(store),), np.int8, 0)[1]
+    return manifest
+
+def attach_store(manifest, attached, rows=slice(None)):
+    """SeriesStore over a row range of a published store (zero-copy views of the shared arrays)"""
+    ids = attached.array(manifest['ids'])[rows]
+    timestamps = attached.array(manifest['timestamps'])[rows].view('datetime64[ns]')
+    columns = {field: attached.array(spec)[rows] for field, spec in manifest['columns'].items()}
+    return SeriesStore.from_arrays(ids, timestamps, columns)
+
+def _signal_worker(manifest, lo, hi, strategy):
+    """Compute indicators and signals for rows lo:hi and write them to the shared outputs"""
+    with Attached() as attached:
+        store = attach_store(manifest, attached, slice(lo, hi))
+        store.add_indicators()
+        signal = store.signals(strategy)[strategy.name]
+        outputs = {name: attached.array(spec) for name, spec in manifest['outputs'].items()}
+        for name in INDICATOR_OUTPUTS:
+            if name in outputs:
+                outputs[name][lo:hi] = store.columns[name]
+        codes = outputs['signal'][lo:hi]
+        codes[:] = 0
+        for label, code in SIGNAL_CODES.items():
+            codes[signal == label] = code
+        del store, outputs, codes
+    return hi - lo
+
+def partition(bounds, parts):
+    """Split per-instrument (start, end) row bounds into up to `parts` contiguous row ranges of similar size"""
+    if not bounds:
+        return []
+    total = bounds[-1][1] - bounds[0][0]
+    ranges, lo, target = [], bounds[0][0], total / max(parts, 1)
+    for start, end in bounds:
+        if end - lo >= target and len(ranges) < parts - 1:
+            ranges.append((lo, end))
+            lo = end
+    if lo < bounds[-1][1]:
+        ranges.append((lo, bounds[-1][1]))
+    return ranges
+
+def shared_signals(store, workers=2, strategy=RULE_STRATEGY, batches_per_worker=4, pool=None):
+    """Indicators and signal codes for every row of a store, computed by worker processes over shared memory
+
+    Returns field -> array in the store's row order ('signal' holds
+    SIGNAL_CODES). Pass a running ProcessPoolExecutor as `pool` to reuse it.
+    """
+    with SegmentRegistry() as registry:
+        manifest = publish_store(store, registry)
+        ranges = partition(manifest['bounds'], max(1, workers) * batches_per_worker)
+        owned = pool is None
+        pool = pool or ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(_signal_worker, manifest, lo, hi, strategy) for lo, hi in ranges]
+            done = sum(f.result() for f in futures)
+        finally:
+            if owned:
+                pool.shutdown()
+        results = {name: registry.array(spec).copy() for name, spec in manifest['outputs'].items()}
+    if done != len(store):
+        raise RuntimeError(f"Workers processed {done} of {len(store)} rows")
+    return results
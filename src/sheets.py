@@ -24,6 +24,9 @@ def init_sheets():
     trade_ws = ensure_ws("Trade_Log")
     summary_ws = ensure_ws("Summary")
     analytics_ws = ensure_ws("Analytics")
+    screens_ws = ensure_ws("Screens")
+    backtests_ws = ensure_ws("Backtest_Trades")
+    equity_ws = ensure_ws("Equity_Curves")
     
     # Set up headers for trade log
     trade_headers = [
@@ -36,49 +39,12 @@ def init_sheets():
         'sh': sh, 
         'trade': trade_ws, 
         'summary': summary_ws, 
-        'analytics': analytics_ws
+        'analytics': analytics_ws,
+        'screens': screens_ws,
+        'backtests': backtests_ws,
+        'equity': equity_ws
     }
 
 def append_trade(ws_trade, row):
     """Append a trade signal to the trade log"""
     ws_trade.append_row(row)
-
-def update_summary(ws_summary, summary_dict):
-    """Update the summary worksheet with performance metrics"""
-    ws_summary.clear()
-    rows = [["Metric", "Value"]]
-    for k, v in summary_dict.items():
-        rows.append([k, str(v)])
-    ws_summary.update(rows)
-
-def update_analytics(ws_analytics, analytics_data):
-    """Update the analytics worksheet with ML model results"""
-    ws_analytics.clear()
-    
-    if 'ml_results' in analytics_data:
-        ml_data = analytics_data['ml_results']
-        rows = [["Ticker", "Accuracy", "Prediction", "Up_Prob", "Down_Prob"]]
-        
-        for ticker, result in ml_data.items():
-            if result['model'] is not None:
-                # Extract prediction data safely
-                prediction_data = result.get('prediction', {})
-                if isinstance(prediction_data, dict):
-                    prediction = prediction_data.get("prediction", "N/A")
-                    up_prob = prediction_data.get("up_probability", 0)
-                    down_prob = prediction_data.get("down_probability", 0)
-                else:
-                    prediction = "N/A"
-                    up_prob = 0
-                    down_prob = 0
-                
-                # Append clean row to Analytics sheet
-                rows.append([
-                    ticker,
-                    round(result['accuracy'], 3),
-                    prediction,
-                    round(up_prob, 3),
-                    round(down_prob, 3)
-                ])
-        
-        ws_analytics.update(rows)
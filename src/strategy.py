@@ -1,8 +1,27 @@
 import pandas as pd
 
+from indicators import rolling_mean
+from strategy_engine import Strategy, col, sma, pct_change, crossed_above, crossed_below
+
+# The generate_signals rule set written for the strategy engine
+RULE_STRATEGY = Strategy(
+    name='rsi_sma_volume',
+    buy=(
+        (col('RSI') < 30) |
+        ((col('RSI') < 36) & crossed_above(col('SMA20'), col('SMA50'))) |
+        ((col('RSI') < 42) & (col('Volume') > sma(col('Volume'), 20) * 1.3))
+    ),
+    sell=(
+        (col('RSI') > 70) |
+        crossed_below(col('SMA20'), col('SMA50')) |
+        ((pct_change(col('Close'), 5) < -0.03) & (col('RSI') > 50))
+    )
+)
+
 def generate_signals(df):
     """Generate BUY/SELL signals based on RSI and SMA crossover strategy"""
-    df = df.copy().reset_index()
+    index = df.index
+    df = df.copy().reset_index(drop=True)
     
     # Handle multi-level column names from yfinance
     if isinstance(df.columns, pd.MultiIndex):
@@ -23,7 +42,7 @@ def generate_signals(df):
     # SELL: RSI > 70 OR crossover down OR price reversal
     
     # Add volume spike detection
-    df['volume_ma'] = df['Volume'].rolling(20).mean()
+    df['volume_ma'] = rolling_mean(df['Volume'], 20)
     df['volume_spike'] = df['Volume'] > df['volume_ma'] * 1.3
     
     # Add price reversal detection
@@ -45,4 +64,36 @@ def generate_signals(df):
     df.loc[buy_mask, 'signal'] = 'BUY'
     df.loc[sell_mask, 'signal'] = 'SELL'
     
-    return df.set_index('Date')
+    df.index = index
+    return df
+
+def generate_ml_signals(df, up_probability, buy_threshold=0.6, sell_threshold=0.4, blend=None):
+    """Generate BUY/SELL signals from model up-probabilities
+    
+    blend=None trades on the model alone, 'confirm' requires the rule-based
+    BUY to agree with the model, and 'either' takes signals from both.
+    SELL overrides BUY as in generate_signals.
+    """
+    signals_df = generate_signals(df)
+    prob = up_probability.reindex(signals_df.index)
+    signals_df['up_probability'] = prob
+    
+    ml_buy = prob > buy_threshold
+    ml_sell = prob < sell_threshold
+    rule_buy = signals_df['signal'] == 'BUY'
+    rule_sell = signals_df['signal'] == 'SELL'
+    
+    if blend is None:
+        buy_mask, sell_mask = ml_buy, ml_sell
+    elif blend == 'confirm':
+        buy_mask, sell_mask = ml_buy & rule_buy, ml_sell | rule_sell
+    elif blend == 'either':
+        buy_mask, sell_mask = ml_buy | rule_buy, ml_sell | rule_sell
+    else:
+        raise ValueError(f"Unknown blend mode: {blend}")
+    
+    signals_df['signal'] = None
+    signals_df.loc[buy_mask, 'signal'] = 'BUY'
+    signals_df.loc[sell_mask, 'signal'] = 'SELL'
+    
+    return signals_df
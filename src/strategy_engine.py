@@ -0,0 +1,237 @@
+"""
+Declarative strategy engine
+Strategies are BUY/SELL conditions written as expressions over named
+indicator columns. Compiling a set of strategies merges their expression
+trees so every shared subexpression is evaluated once per pass.
+"""
+
+import ast
+import numpy as np
+import pandas as pd
+
+from indicators import rolling_mean, segment_rolling_mean, segment_row_starts
+
+class Expr:
+    """Node of a strategy expression; identical subtrees share the same key"""
+
+    def __init__(self, op, *args):
+        self.op = op
+        self.args = args
+        self.key = (op,) + tuple(a.key if isinstance(a, Expr) else ('const', a) for a in args)
+
+    def __repr__(self):
+        return f"Expr{self.key}"
+
+    def _binary(self, op, other, reverse=False):
+        other = other if isinstance(other, Expr) else const(other)
+        return Expr(op, other, self) if reverse else Expr(op, self, other)
+
+    def __lt__(self, other): return self._binary('lt', other)
+    def __le__(self, other): return self._binary('le', other)
+    def __gt__(self, other): return self._binary('gt', other)
+    def __ge__(self, other): return self._binary('ge', other)
+    def __and__(self, other): return self._binary('and', other)
+    def __or__(self, other): return self._binary('or', other)
+    def __invert__(self): return Expr('not', self)
+    def __add__(self, other): return self._binary('add', other)
+    def __radd__(self, other): return self._binary('add', other, reverse=True)
+    def __sub__(self, other): return self._binary('sub', other)
+    def __rsub__(self, other): return self._binary('sub', other, reverse=True)
+    def __mul__(self, other): return self._binary('mul', other)
+    def __rmul__(self, other): return self._binary('mul', other, reverse=True)
+    def __truediv__(self, other): return self._binary('div', other)
+    def __rtruediv__(self, other): return self._binary('div', other, reverse=True)
+    def __neg__(self): return Expr('neg', self)
+
+def col(name):
+    """Reference a column of the indicator frame"""
+    return Expr('col', name)
+
+def const(value):
+    """Constant operand"""
+    return Expr('const', value)
+
+def shift(expr, periods=1):
+    """Value `periods` bars ago (NaN during warm-up)"""
+    return Expr('shift', expr, periods)
+
+def sma(expr, window):
+    """Rolling mean over `window` bars"""
+    return Expr('sma', expr, window)
+
+def pct_change(expr, periods=1):
+    """Fractional change over `periods` bars"""
+    return expr / shift(expr, periods) - 1
+
+def crossed_above(a, b):
+    """a crosses above b on this bar"""
+    return (a > b) & (shift(a) <= shift(b))
+
+def crossed_below(a, b):
+    """a crosses below b on this bar"""
+    return (a < b) & (shift(a) >= shift(b))
+
+def _shift(values, periods, groups=None):
+    out = np.full(len(values), np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+        if groups is not None and periods > 0:
+            out[periods:][groups[periods:] != groups[:-periods]] = np.nan
+    return out
+
+def _sma(values, window, groups=None):
+    if groups is not None:
+        return segment_rolling_mean(values, segment_row_starts(groups), window)
+    return rolling_mean(values, window)
+
+_OPS = {
+    'lt': np.less, 'le': np.less_equal, 'gt': np.greater, 'ge': np.greater_equal,
+    'and': np.logical_and, 'or': np.logical_or, 'not': np.logical_not,
+    'add': np.add, 'sub': np.subtract, 'mul': np.multiply, 'div': np.divide, 'neg': np.negative,
+    'shift': _shift, 'sma': _sma,
+}
+
+# Ops that look back along the rows and so must not cross group boundaries
+_GROUPED_OPS = {'shift', 'sma'}
+
+class Strategy:
+    """Named pair of BUY and SELL conditions; SELL overrides BUY on the same bar"""
+
+    def __init__(self, name, buy, sell):
+        self.name = name
+        self.buy = parse_expression(buy) if isinstance(buy, str) else buy
+        self.sell = parse_expression(sell) if isinstance(sell, str) else sell
+
+    def __repr__(self):
+        return f"Strategy({self.name!r})"
+
+# Functions available to string expressions
+_FUNCTIONS = {
+    'shift': shift, 'sma': sma, 'pct_change': pct_change,
+    'crossed_above': crossed_above, 'crossed_below': crossed_below,
+}
+
+def parse_expression(text):
+    """Parse e.g. "RSI < 30 or (RSI < 36 and crossed_above(SMA20, SMA50))" into an Expr
+
+    Bare names are indicator columns; only comparisons, and/or/not, & | ~,
+    arithmetic, numeric constants and the engine's functions are allowed.
+    """
+    def build(node):
+        if isinstance(node, ast.Expression):
+            return build(node.body)
+        if isinstance(node, ast.Name):
+            return col(node.id)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.BoolOp):
+            values = [build(v) for v in node.values]
+            result = values[0]
+            for value in values[1:]:
+                result = (result & value) if isinstance(node.op, ast.And) else (result | value)
+            return result
+        if isinstance(node, ast.UnaryOp):
+            operand = build(node.operand)
+            if isinstance(node.op, (ast.Not, ast.Invert)):
+                return ~operand
+            if isinstance(node.op, ast.USub):
+                return -operand
+        if isinstance(node, ast.BinOp):
+            left, right = build(node.left), build(node.right)
+            ops = {ast.BitAnd: 'and', ast.BitOr: 'or', ast.Add: 'add', ast.Sub: 'sub',
+                   ast.Mult: 'mul', ast.Div: 'div'}
+            op = ops.get(type(node.op))
+            if op is not None:
+                left = left if isinstance(left, Expr) else const(left)
+                return left._binary(op, right)
+        if isinstance(node, ast.Compare):
+            ops = {ast.Lt: 'lt', ast.LtE: 'le', ast.Gt: 'gt', ast.GtE: 'ge'}
+            result = None
+            left = build(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = build(comparator)
+                if type(op) not in ops:
+                    break
+                lhs = left if isinstance(left, Expr) else const(left)
+                term = lhs._binary(ops[type(op)], right)
+                result = term if result is None else result & term
+                left = right
+            else:
+                return result
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS:
+            args = [build(a) for a in node.args]
+            return _FUNCTIONS[node.func.id](*args)
+        raise ValueError(f"Unsupported strategy expression: {ast.dump(node)}")
+
+    return build(ast.parse(text, mode='eval'))
+
+class CompiledStrategies:
+    """Set of strategies fused into one evaluation plan over shared subexpressions"""
+
+    def __init__(self, strategies):
+        self.strategies = list(strategies)
+        self.plan = []
+        seen = set()
+
+        def visit(expr):
+            if expr.key in seen:
+                return
+            for arg in expr.args:
+                if isinstance(arg, Expr):
+                    visit(arg)
+            seen.add(expr.key)
+            self.plan.append(expr)
+
+        for strategy in self.strategies:
+            visit(strategy.buy)
+            visit(strategy.sell)
+
+        self.columns = sorted({e.args[0] for e in self.plan if e.op == 'col'})
+
+    def evaluate(self, data, groups=None):
+        """Return strategy name -> object array of 'BUY'/'SELL'/None for every bar
+
+        `groups` (one code per row, rows of a group contiguous) evaluates
+        many instruments at once: shifts and moving averages stay inside
+        each group, so every group gets the result it would get alone.
+        """
+        values = {}
+        for expr in self.plan:
+            if expr.op == 'col':
+                result = np.asarray(data[expr.args[0]], dtype=float)
+            elif expr.op == 'const':
+                result = expr.args[0]
+            else:
+                args = [values[a.key] if isinstance(a, Expr) else a for a in expr.args]
+                if groups is not None and expr.op in _GROUPED_OPS:
+                    result = _OPS[expr.op](*args, groups=groups)
+                else:
+                    result = _OPS[expr.op](*args)
+            values[expr.key] = result
+
+        signals = {}
+        for strategy in self.strategies:
+            buy = np.asarray(values[strategy.buy.key], dtype=bool)
+            sell = np.asarray(values[strategy.sell.key], dtype=bool)
+            signal = np.full(len(buy), None, dtype=object)
+            signal[buy] = 'BUY'
+            signal[sell] = 'SELL'
+            signals[strategy.name] = signal
+        return signals
+
+def compile_strategies(strategies):
+    """Compile one or more strategies into a shared evaluation plan"""
+    if isinstance(strategies, Strategy):
+        strategies = [strategies]
+    return CompiledStrategies(strategies)
+
+def generate_strategy_signals(df, strategies):
+    """Evaluate many strategies in one pass; returns a frame of signals, one column per strategy"""
+    compiled = strategies if isinstance(strategies, CompiledStrategies) else compile_strategies(strategies)
+    return pd.DataFrame(compiled.evaluate(df), index=df.index)
+
+def apply_strategy(df, strategy):
+    """Return a copy of df with a 'signal' column from one strategy, ready for backtest_signals"""
+    signals_df = df.copy()
+    signals_df['signal'] = compile_strategies(strategy).evaluate(df)[strategy.name]
+    return signals_df
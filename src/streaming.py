@@ -0,0 +1,95 @@
+"""
+Chunked streaming evaluation for long histories
+Runs add_indicators and generate_signals over a history delivered in
+fixed-size chunks, carrying just enough state across chunk boundaries
+(the last WARMUP_BARS bars with their indicators, and each EMA's value)
+for every row to come out exactly as it would from the whole frame.
+Memory is bounded by the chunk size, not the length of the history.
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators import add_indicators
+from strategy import generate_signals
+
+# Longest look-back of add_indicators and generate_signals (SMA50 and the
+# previous bar's SMA50 for crossovers) with room to spare
+WARMUP_BARS = 64
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Columns the backtest needs from each signal row
+BACKTEST_COLUMNS = ['Open', 'High', 'Low', 'Close', 'RSI', 'signal']
+
+def _seeded_ewm(values, span, state):
+    """EMA (adjust=False) continued from state = (last value, trailing missing inputs); returns (ema, state)
+
+    pandas restarts an EMA at the first value it sees, so the carried value
+    is fed in first, followed by one NaN per missing input since the last
+    observation, which reproduces the weight pandas would have reached.
+    """
+    if state is None:
+        prefix = np.empty(0)
+    else:
+        prefix = np.r_[state[0], np.full(state[1], np.nan)]
+    ema = pd.Series(np.r_[prefix, values]).ewm(span=span, adjust=False).mean().to_numpy()[len(prefix):]
+    observed = np.flatnonzero(~np.isnan(values))
+    if len(observed):
+        trailing = len(values) - 1 - observed[-1]
+    else:
+        trailing = len(values) + (state[1] if state is not None else 0)
+    last = ema[-1] if len(ema) else (state[0] if state is not None else np.nan)
+    return ema, (last, int(trailing))
+
+class SignalStream:
+    """add_indicators + generate_signals over consecutive chunks of one series
+
+    Chunks must be in time order without overlap; any size works. Each
+    call returns the chunk's rows with indicator and signal columns,
+    identical to the same rows of generate_signals(add_indicators(history)).
+    """
+
+    def __init__(self, warmup=WARMUP_BARS):
+        self.warmup = warmup
+        self.tail = None
+        self.ema = {'fast': None, 'slow': None, 'signal': None}
+        self.bars = 0
+
+    def update(self, chunk):
+        """Indicators and signals for one chunk's rows"""
+        if isinstance(chunk.columns, pd.MultiIndex):
+            chunk = chunk.copy()
+            chunk.columns = chunk.columns.get_level_values(0)
+        if chunk.empty:
+            return chunk
+        k = 0 if self.tail is None else len(self.tail)
+        raw = chunk if self.tail is None else pd.concat([self.tail[chunk.columns], chunk])
+
+        # Windowed indicators only need the tail as overlap; the EMAs continue from their carried values
+        rows = add_indicators(raw).iloc[k:]
+        close = chunk['Close'].to_numpy(dtype=float)
+        fast, self.ema['fast'] = _seeded_ewm(close, 12, self.ema['fast'])
+        slow, self.ema['slow'] = _seeded_ewm(close, 26, self.ema['slow'])
+        macd = fast - slow
+        macd_signal, self.ema['signal'] = _seeded_ewm(macd, 9, self.ema['signal'])
+        rows['MACD'] = macd
+        rows['MACD_SIGNAL'] = macd_signal
+
+        frame = rows if self.tail is None else pd.concat([self.tail, rows])
+        signals = generate_signals(frame).iloc[k:]
+        self.tail = frame.iloc[-self.warmup:]
+        self.bars += len(chunk)
+        return signals
+
+def stream_signals(chunks, warmup=WARMUP_BARS):
+    """Yield the signal rows of each chunk in turn"""
+    stream = SignalStream(warmup)
+    for chunk in chunks:
+        yield stream.update(chunk)
+
+def read_ohlcv_chunks(path, chunk_bars=100_000, date_column='Date'):
+    """Yield a Date-indexed OHLCV CSV in frames of chunk_bars rows"""
+    for chunk in pd.read_csv(path, chunksize=chunk_bars, float_precision='round_trip'):
+        chunk[date_column] = pd.to_datetime(chunk[date_column])
+        yield chunk.set_index(date_column)
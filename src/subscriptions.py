@@ -0,0 +1,229 @@
+"""
+Signal subscriptions
+Routes each trading signal to every subscriber (a desk or chat) whose
+ticker list, signal types and filters match it. Subscribers are indexed by
+ticker and signal type, and messages are batched per destination and sent
+concurrently over one shared connection pool.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from telegram_alerts import send_telegram_message, telegram_session, format_signal, MAX_MESSAGE_LENGTH
+from latency import format_age
+from metrics import IO_FAILURES
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+# Index key for subscribers without a ticker list or signal types
+ANY = '*'
+
+class Subscriber:
+    """A destination chat and the signals it wants
+
+    `tickers` and `signals` of None (or '*') match everything. `filters`
+    maps a column of the signal's bar (e.g. RSI, Close) to a [low, high]
+    range, where either bound may be None.
+    """
+
+    def __init__(self, name, chat_id, tickers=None, signals=None, filters=None):
+        self.name = name
+        self.chat_id = str(chat_id)
+        self.tickers = None if tickers in (None, ANY) else frozenset(tickers)
+        self.signals = None if signals in (None, ANY) else frozenset(s.upper() for s in signals)
+        self.filters = {column: tuple(bounds) for column, bounds in (filters or {}).items()}
+
+    def accepts(self, row):
+        """True if the signal's bar passes every filter"""
+        for column, (low, high) in self.filters.items():
+            value = row.get(column) if row is not None else None
+            if value is None or value != value:
+                return False
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    def matches(self, signal):
+        """True if this subscriber wants the signal"""
+        return ((self.tickers is None or signal['ticker'] in self.tickers) and
+                (self.signals is None or signal['signal'] in self.signals) and
+                self.accepts(signal.get('row')))
+
+def load_subscribers(path, default_chat_id=None):
+    """Subscribers from a JSON list of {name, chat_id, tickers, signals, filters}
+
+    The default chat, when configured, receives every signal as before.
+    """
+    subscribers = []
+    if default_chat_id:
+        subscribers.append(Subscriber('default', default_chat_id))
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for entry in json.load(f):
+                subscribers.append(Subscriber(entry['name'], entry['chat_id'], entry.get('tickers'),
+                                              entry.get('signals'), entry.get('filters')))
+    return subscribers
+
+def signal_text(signal):
+    """Alert text for one signal dict (ticker, signal, date, row), with its bar's close time when traced"""
+    row = signal['row']
+    text = format_signal(signal['ticker'], signal['signal'], row['Close'], row['RSI'], row['SMA20'], row['SMA50'],
+                         signal['date'].strftime("%Y-%m-%d"))
+    trace = signal.get('trace')
+    if trace is not None and trace.bar_close is not None:
+        text += f"\nBar closed {trace.bar_close:%Y-%m-%d %H:%M} IST, {format_age(trace.bar_age())} ago"
+    return text
+
+def format_batch(signals):
+    """Message texts for one destination's signals, split to stay under Telegram's length limit"""
+    messages, current = [], ""
+    for signal in signals:
+        text = signal_text(signal)
+        if current and len(current) + 2 + len(text) > MAX_MESSAGE_LENGTH:
+            messages.append(current)
+            current = text
+        else:
+            current = f"{current}\n\n{text}" if current else text
+    if current:
+        messages.append(current)
+    return messages
+
+class SubscriptionRouter:
+    """Matches signals to subscribers and delivers one batch per destination
+
+    Every subscriber is indexed under each (ticker, signal type) pair it
+    covers, with ANY standing in for an unrestricted side, so matching a
+    signal is four dict lookups plus the filters of the candidates found,
+    however many subscribers there are.
+    """
+
+    def __init__(self, subscribers, send=send_telegram_message, max_workers=16):
+        self.subscribers = list(subscribers)
+        self.send = send
+        self.max_workers = max_workers
+        self.session = None
+        self._index = {}
+        for i, subscriber in enumerate(self.subscribers):
+            for ticker in subscriber.tickers or (ANY,):
+                for kind in subscriber.signals or (ANY,):
+                    self._index.setdefault((ticker, kind), []).append(i)
+
+    def match(self, signal):
+        """Subscribers that want a signal, in registration order"""
+        ticker, kind = signal['ticker'], signal['signal']
+        found = []
+        for key in ((ticker, kind), (ticker, ANY), (ANY, kind), (ANY, ANY)):
+            found.extend(self._index.get(key, ()))
+        row = signal.get('row')
+        return [self.subscribers[i] for i in sorted(found)
+                if not self.subscribers[i].filters or self.subscribers[i].accepts(row)]
+
+    def route(self, signals):
+        """Destination chat id -> its signals, each signal once per chat"""
+        batches = {}
+        for signal in signals:
+            for subscriber in self.match(signal):
+                batch = batches.setdefault(subscriber.chat_id, [])
+                if not batch or batch[-1] is not signal:
+                    batch.append(signal)
+        return batches
+
+    def dispatch(self, signals):
+        """Send every destination its batch concurrently; returns chat id -> success"""
+        batches = self.route(signals)
+        return self._send([(chat_id, text) for chat_id, batch in batches.items() for text in format_batch(batch)])
+
+    def broadcast(self, text):
+        """Send one message to every destination concurrently; True if any received it or there are none"""
+        chat_ids = dict.fromkeys(subscriber.chat_id for subscriber in self.subscribers)
+        delivered = self._send([(chat_id, text) for chat_id in chat_ids])
+        return not delivered or any(delivered.values())
+
+    def _send(self, jobs):
+        """Send (chat id, text) jobs over the shared session; returns chat id -> all of its sends succeeded"""
+        if not jobs:
+            return {}
+        if self.session is None:
+            self.session = telegram_session(self.max_workers)
+
+        def run(job):
+            chat_id, text = job
+            try:
+                return bool(self.send(text, chat_id=chat_id, session=self.session))
+            except Exception as e:
+                logger.error(f"Error sending signals to {chat_id}: {e}", extra={'stage': 'alert'})
+                return False
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            results = list(executor.map(run, jobs))
+        delivered = {}
+        for (chat_id, _), ok in zip(jobs, results):
+            delivered[chat_id] = delivered.get(chat_id, True) and ok
+        failed = sum(not ok for ok in results)
+        if failed:
+            IO_FAILURES.inc(failed, sink='telegram')
+        return delivered
+
+    def delivered_signals(self, signals, delivered):
+        """Signals that reached at least one of their destinations, given dispatch()'s results
+
+        Signals no subscriber wants had nothing to deliver and count as done.
+        """
+        routed = {}
+        for chat_id, batch in self.route(signals).items():
+            for signal in batch:
+                routed.setdefault(id(signal), []).append(chat_id)
+        return [signal for signal in signals
+                if id(signal) not in routed or any(delivered.get(chat_id) for chat_id in routed[id(signal)])]
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+def signal_key(signal):
+    """(ticker, bar date, signal type) identifying a signal across scans"""
+    return (signal['ticker'], signal['date'].isoformat(), signal['signal'])
+
+class AlertLog:
+    """Signals already alerted, so a later scan over the same bars does not repeat them
+
+    Every scan re-reads the last few bars, so without this each signal
+    would be logged and alerted again on every run until it ages out.
+    Only delivered signals are added, so one that failed to send is
+    retried by the next scan. Entries more than `keep_days` older than the newest one are pruned
+    on save.
+    """
+
+    def __init__(self, path=None, keep_days=30):
+        self.path = path
+        self.keep_days = keep_days
+        self.sent = set()
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.sent = {tuple(key) for key in json.load(f)}
+            except Exception as e:
+                logger.warning(f"Could not read alert log: {e}")
+
+    def seen(self, signal):
+        return signal_key(signal) in self.sent
+
+    def add(self, signals):
+        self.sent.update(signal_key(signal) for signal in signals)
+
+    def save(self):
+        if not self.path or not self.sent:
+            return
+        newest = max(datetime.fromisoformat(date) for _, date, _ in self.sent)
+        cutoff = newest - timedelta(days=self.keep_days)
+        self.sent = {key for key in self.sent if datetime.fromisoformat(key[1]) >= cutoff}
+        try:
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(sorted(self.sent), f)
+            os.replace(self.path + '.tmp', self.path)
+        except Exception as e:
+            logger.error(f"Error saving alert log: {e}")
@@ -0,0 +1,336 @@
+"""
+Tick-to-bar aggregation for live intraday trading
+Trades from a tick feed are bucketed into OHLCV bars on fixed time
+boundaries, held per symbol in array-backed ring buffers. A bar is
+completed once the symbol's watermark (latest tick time minus the allowed
+lateness) passes its end; ticks for a completed bar are dropped and
+counted. Completed bars can be fed straight into the indicator and
+signal pipeline.
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators import add_indicators
+from strategy import RULE_STRATEGY
+from strategy_engine import compile_strategies
+from metrics import TICKS
+from utils import get_logger
+
+logger = get_logger(__name__)
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Ticks']
+TICK_COLUMNS = ['timestamp', 'symbol', 'price', 'size']
+
+_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+def interval_ns(interval):
+    """Bar length in nanoseconds for seconds or a '30s' / '1m' / '5m' / '1h' string"""
+    if isinstance(interval, str):
+        value, unit = interval[:-1], interval[-1]
+        if unit not in _UNITS or not value.isdigit():
+            raise ValueError(f"Unsupported bar interval: {interval}")
+        seconds = int(value) * _UNITS[unit]
+    else:
+        seconds = interval
+    if seconds <= 0:
+        raise ValueError(f"Unsupported bar interval: {interval}")
+    return int(seconds * 1_000_000_000)
+
+def to_ns(timestamps):
+    """Timestamps (epoch ns integers, datetimes or ISO strings) as an int64 ns array"""
+    values = np.asarray(timestamps)
+    if values.dtype.kind in 'iu':
+        return values.astype(np.int64)
+    return pd.to_datetime(values).values.astype('datetime64[ns]').astype(np.int64)
+
+class TickAggregator:
+    """OHLCV bars of `interval` built from ticks for any number of symbols
+
+    Each symbol has a ring of `capacity` bar slots addressed by bucket
+    number (timestamp // interval) modulo capacity, so a tick finds its bar
+    in O(1) whether it is on time or late, and the last completed bars stay
+    available as history. Ticks are applied in vectorised batches: add_tick
+    buffers single ticks until `batch_size` are pending, add_ticks takes
+    arrays directly. Within a bar, Open and Close are the prices of the
+    earliest and latest tick by timestamp, ties going to arrival order.
+
+    `on_bars` is called with a frame of the bars completed by each batch
+    or call to advance/close_all (columns Symbol, Date and BAR_COLUMNS).
+    """
+
+    def __init__(self, interval='1m', lateness=2.0, capacity=1024, batch_size=8192, on_bars=None):
+        self.interval = interval
+        self.interval_ns = interval_ns(interval)
+        self.lateness_ns = int(lateness * 1_000_000_000)
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.on_bars = on_bars
+        self.symbols = {}
+        self.names = []
+        self.stats = {'ticks': 0, 'late': 0, 'bars': 0}
+        self._pending = ([], [], [], [])
+        self._allocate(16)
+
+    def _allocate(self, rows):
+        """Grow the per-symbol arrays to `rows` symbols, keeping existing state"""
+        shape = (rows, self.capacity)
+        old = getattr(self, 'bucket', None)
+        arrays = {
+            'bucket': np.full(shape, -1, dtype=np.int64),
+            'first_ts': np.zeros(shape, dtype=np.int64),
+            'last_ts': np.zeros(shape, dtype=np.int64),
+            'ticks': np.zeros(shape, dtype=np.int64),
+            'open': np.zeros(shape), 'high': np.zeros(shape), 'low': np.zeros(shape),
+            'close': np.zeros(shape), 'volume': np.zeros(shape),
+            'final': np.full(rows, -1, dtype=np.int64),
+            'max_ts': np.full(rows, np.iinfo(np.int64).min, dtype=np.int64),
+        }
+        for name, array in arrays.items():
+            if old is not None:
+                current = getattr(self, name)
+                array[:len(current)] = current
+            setattr(self, name, array)
+
+    def _rows(self, symbols):
+        """Row number of every symbol in an array, registering new symbols"""
+        codes, uniques = pd.factorize(np.asarray(symbols, dtype=object))
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, symbol in enumerate(uniques):
+            row = self.symbols.get(symbol)
+            if row is None:
+                row = self.symbols[symbol] = len(self.names)
+                self.names.append(symbol)
+            mapping[i] = row
+        if len(self.names) > len(self.final):
+            self._allocate(max(2 * len(self.final), len(self.names)))
+        return mapping[codes]
+
+    def add_tick(self, symbol, timestamp, price, size):
+        """Buffer one tick (timestamp in epoch ns); applies the buffer once it holds batch_size ticks"""
+        pending = self._pending
+        pending[0].append(symbol)
+        pending[1].append(timestamp)
+        pending[2].append(price)
+        pending[3].append(size)
+        if len(pending[0]) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Apply buffered ticks; returns the bars this completed (or None)"""
+        symbols, timestamps, prices, sizes = self._pending
+        if not symbols:
+            return None
+        self._pending = ([], [], [], [])
+        return self.add_ticks(symbols, np.array(timestamps, dtype=np.int64), prices, sizes)
+
+    def add_ticks(self, symbols, timestamps, prices, sizes):
+        """Apply a batch of ticks; returns the bars this completed (or None)"""
+        ts = to_ns(timestamps)
+        span = int(ts.max() - ts.min()) if len(ts) else 0
+        if span > (self.capacity // 2) * self.interval_ns and len(ts) > 1:
+            # Keep every batch well inside the ring so no open bar's slot is reused
+            half = len(ts) // 2
+            symbols = np.asarray(symbols, dtype=object)
+            prices, sizes = np.asarray(prices, dtype=float), np.asarray(sizes, dtype=float)
+            first = self.add_ticks(symbols[:half], ts[:half], prices[:half], sizes[:half])
+            second = self.add_ticks(symbols[half:], ts[half:], prices[half:], sizes[half:])
+            done = [b for b in (first, second) if b is not None]
+            return pd.concat(done, ignore_index=True) if len(done) > 1 else (done[0] if done else None)
+        rows = self._rows(symbols)
+        evicted = self._evict(rows, ts)
+        self._apply(rows, ts, np.asarray(prices, dtype=float), np.asarray(sizes, dtype=float))
+        completed = self._complete()
+        if evicted is not None and completed is not None:
+            return pd.concat([evicted, completed], ignore_index=True)
+        return completed if completed is not None else evicted
+
+    def _evict(self, rows, ts):
+        """Complete open bars whose ring slot a newer bar of the batch is about to reuse
+
+        Only happens when a symbol went quiet for about `capacity` bars
+        without advance() being called.
+        """
+        bucket = ts // self.interval_ns
+        existing = self.bucket[rows, bucket % self.capacity]
+        stale = (existing >= 0) & (existing < bucket) & (existing > self.final[rows])
+        if not stale.any():
+            return None
+        limit = np.full(len(self.names), -1, dtype=np.int64)
+        np.maximum.at(limit, rows[stale], existing[stale])
+        return self._complete(np.maximum(limit, self._limits()))
+
+    def _apply(self, rows, ts, price, size):
+        bucket = ts // self.interval_ns
+        late = bucket <= self.final[rows]
+        slot = bucket % self.capacity
+        late |= self.bucket[rows, slot] > bucket
+        n_late = int(late.sum())
+        if n_late:
+            keep = ~late
+            rows, ts, price, size, bucket = rows[keep], ts[keep], price[keep], size[keep], bucket[keep]
+            self.stats['late'] += n_late
+            TICKS.inc(n_late, outcome='late')
+        n = len(rows)
+        self.stats['ticks'] += n
+        TICKS.inc(n, outcome='accepted')
+        if not n:
+            return
+
+        # One group per (symbol, bar), ticks in time order within it (stable, so ties keep arrival order)
+        order = np.lexsort((ts, bucket, rows))
+        rows, ts, price, size, bucket = rows[order], ts[order], price[order], size[order], bucket[order]
+        starts = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (bucket[1:] != bucket[:-1])])
+        ends = np.r_[starts[1:], n] - 1
+        g_rows, g_bucket = rows[starts], bucket[starts]
+        g_slot = g_bucket % self.capacity
+        high = np.maximum.reduceat(price, starts)
+        low = np.minimum.reduceat(price, starts)
+        volume = np.add.reduceat(size, starts)
+        count = np.diff(np.r_[starts, n])
+        first_ts, last_ts = ts[starts], ts[ends]
+        open_, close = price[starts], price[ends]
+
+        fresh = self.bucket[g_rows, g_slot] != g_bucket
+        r, s = g_rows[fresh], g_slot[fresh]
+        self.bucket[r, s] = g_bucket[fresh]
+        self.open[r, s], self.high[r, s], self.low[r, s] = open_[fresh], high[fresh], low[fresh]
+        self.close[r, s], self.volume[r, s], self.ticks[r, s] = close[fresh], volume[fresh], count[fresh]
+        self.first_ts[r, s], self.last_ts[r, s] = first_ts[fresh], last_ts[fresh]
+
+        merge = ~fresh
+        if merge.any():
+            r, s = g_rows[merge], g_slot[merge]
+            earlier = first_ts[merge] < self.first_ts[r, s]
+            later = last_ts[merge] >= self.last_ts[r, s]
+            self.open[r[earlier], s[earlier]] = open_[merge][earlier]
+            self.first_ts[r[earlier], s[earlier]] = first_ts[merge][earlier]
+            self.close[r[later], s[later]] = close[merge][later]
+            self.last_ts[r[later], s[later]] = last_ts[merge][later]
+            self.high[r, s] = np.maximum(self.high[r, s], high[merge])
+            self.low[r, s] = np.minimum(self.low[r, s], low[merge])
+            self.volume[r, s] += volume[merge]
+            self.ticks[r, s] += count[merge]
+
+        np.maximum.at(self.max_ts, g_rows, last_ts)
+
+    def _limits(self):
+        """Last bucket per symbol whose end is at or before the symbol's watermark"""
+        max_ts = self.max_ts[:len(self.names)]
+        seen = max_ts != np.iinfo(np.int64).min
+        watermark = np.where(seen, max_ts, 0) - self.lateness_ns
+        return np.where(seen, watermark // self.interval_ns - 1, -1)
+
+    def _complete(self, limit=None):
+        """Complete every open bar up to `limit` (default: each symbol's watermark)"""
+        if limit is None:
+            limit = self._limits()
+        buckets = self.bucket[:len(self.names)]
+        final = self.final[:len(self.names)]
+        done = (buckets > final[:, None]) & (buckets <= limit[:, None])
+        rows, slots = np.nonzero(done)
+        if not len(rows):
+            return None
+        order = np.lexsort((buckets[rows, slots], rows))
+        rows, slots = rows[order], slots[order]
+        np.maximum.at(self.final, rows, self.bucket[rows, slots])
+        self.stats['bars'] += len(rows)
+        bars = self._frame(rows, slots)
+        if self.on_bars is not None:
+            self.on_bars(bars)
+        return bars
+
+    def _frame(self, rows, slots):
+        names = np.asarray(self.names, dtype=object)
+        frame = pd.DataFrame({
+            'Symbol': names[rows],
+            'Date': pd.to_datetime(self.bucket[rows, slots] * self.interval_ns),
+            'Open': self.open[rows, slots], 'High': self.high[rows, slots],
+            'Low': self.low[rows, slots], 'Close': self.close[rows, slots],
+            'Volume': self.volume[rows, slots], 'Ticks': self.ticks[rows, slots],
+        })
+        return frame
+
+    def advance(self, now):
+        """Complete bars of every symbol up to wall-clock `now` (epoch ns) minus the lateness
+
+        Call this periodically on a live feed so quiet symbols still close their bars.
+        """
+        self.flush()
+        if not self.names:
+            return None
+        clock = (int(to_ns([now])[0]) - self.lateness_ns) // self.interval_ns - 1
+        return self._complete(np.maximum(self._limits(), clock))
+
+    def close_all(self):
+        """Complete every open bar, e.g. at the end of a session or replay"""
+        self.flush()
+        if not self.names:
+            return None
+        return self._complete(np.full(len(self.names), np.iinfo(np.int64).max))
+
+    def history(self, symbol, n=None):
+        """Up to the last `n` completed bars of a symbol, indexed by Date"""
+        row = self.symbols.get(symbol)
+        if row is None:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+        final = self.final[row]
+        buckets = self.bucket[row]
+        slots = np.flatnonzero((buckets <= final) & (buckets > final - self.capacity) & (buckets >= 0))
+        slots = slots[np.argsort(buckets[slots])]
+        if n is not None:
+            slots = slots[-n:]
+        rows = np.full(len(slots), row)
+        return self._frame(rows, slots).drop(columns='Symbol').set_index('Date')
+
+class BarPipeline:
+    """Runs indicators and a strategy on each symbol's completed bars
+
+    Attaches itself as the aggregator's on_bars callback. For every symbol
+    with new bars, indicators are recomputed on the new bars and the
+    `window` completed bars before them, which covers the longest lookback
+    of the rule strategy (SMA50 plus the crossover bar), and the compiled
+    strategy (the generate_signals rules by default) is evaluated on them. `on_signal(symbol, date, signal,
+    row)` is called for each new bar with a BUY or SELL.
+    """
+
+    def __init__(self, aggregator, on_signal=None, strategy=RULE_STRATEGY, window=256):
+        self.aggregator = aggregator
+        self.on_signal = on_signal
+        self.strategy = strategy
+        self.compiled = compile_strategies(strategy)
+        self.window = window
+        self.signals = []
+        aggregator.on_bars = self.process
+
+    def process(self, bars):
+        for symbol, new in bars.groupby('Symbol', sort=False):
+            try:
+                history = add_indicators(self.aggregator.history(symbol, self.window + len(new)))
+                signals = self.compiled.evaluate(history)[self.strategy.name]
+            except Exception as e:
+                logger.error(f"Error computing intraday signals: {e}", extra={'ticker': symbol, 'stage': 'bars'})
+                continue
+            # A catch-up can complete more bars than the ring buffer still holds
+            for i in range(max(0, len(history) - len(new)), len(history)):
+                if signals[i] is None:
+                    continue
+                date = history.index[i]
+                self.signals.append((symbol, date, signals[i]))
+                if self.on_signal is not None:
+                    self.on_signal(symbol, date, signals[i], history.iloc[i])
+
+def replay_file(path, aggregator, chunksize=100_000):
+    """Feed a CSV tick file (timestamp, symbol, price, size) through an aggregator; returns ticks read
+
+    Timestamps may be epoch nanoseconds or ISO datetimes. Every open bar is
+    completed at the end of the file.
+    """
+    total = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=TICK_COLUMNS, float_precision='round_trip'):
+        aggregator.add_ticks(chunk['symbol'].to_numpy(), chunk['timestamp'].to_numpy(),
+                             chunk['price'].to_numpy(dtype=float), chunk['size'].to_numpy(dtype=float))
+        total += len(chunk)
+    aggregator.close_all()
+    return total
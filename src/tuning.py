@@ -0,0 +1,136 @@
+"""
+Hyperparameter search for the ML model
+Time-series cross-validation over model families and parameters, run in
+parallel across tickers with successive halving; the best configuration
+per ticker is saved for run_once to use without searching again
+"""
+
+import itertools
+import json
+import math
+import os
+from datetime import datetime
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import TimeSeriesSplit
+
+from ml_model import build_model
+
+# Parameter grid per model family in ml_model.MODEL_FAMILIES
+SEARCH_SPACE = {
+    'tree': {'max_depth': [3, 5, 8], 'min_samples_leaf': [1, 10, 30]},
+    'forest': {'n_estimators': [100], 'max_depth': [3, 5, 8], 'min_samples_leaf': [5, 20]},
+    'boosting': {'max_iter': [100], 'learning_rate': [0.05, 0.1], 'max_depth': [2, 3], 'min_samples_leaf': [20]},
+}
+
+def candidate_configs(search_space=SEARCH_SPACE):
+    """Every {'family', 'params'} combination in the search space"""
+    configs = []
+    for family, grid in search_space.items():
+        names = sorted(grid)
+        for values in itertools.product(*(grid[name] for name in names)):
+            configs.append({'family': family, 'params': dict(zip(names, values))})
+    return configs
+
+def _config_key(config):
+    return json.dumps(config, sort_keys=True)
+
+def fold_slices(n_rows, n_splits=5, gap=1):
+    """TimeSeriesSplit folds as (train, test) slices, most recent fold first
+
+    Folds are contiguous, so slicing a feature matrix with them gives views
+    and the matrices are never copied per candidate. `gap` drops the bar
+    between train and test, whose next-day target overlaps the test period.
+    """
+    splitter = TimeSeriesSplit(n_splits=n_splits, gap=gap)
+    folds = [(slice(int(train[0]), int(train[-1]) + 1), slice(int(test[0]), int(test[-1]) + 1))
+             for train, test in splitter.split(np.empty(n_rows))]
+    return folds[::-1]
+
+def _score_folds(X, y, folds, config):
+    """Out-of-sample accuracy of one config on each (train, test) fold"""
+    scores = []
+    for train, test in folds:
+        model = build_model(config)
+        model.fit(X[train], y[train])
+        scores.append(accuracy_score(y[test], model.predict(X[test])))
+    return scores
+
+def tune(datasets, configs=None, n_splits=5, eta=3, min_folds=1, n_jobs=-1):
+    """Pick the best config per ticker by time-series CV accuracy
+
+    `datasets` maps ticker -> (X, y) arrays. With successive halving
+    (eta > 1) every candidate is first scored on the `min_folds` most recent
+    folds, then only the best 1/eta per ticker go on to `eta` times as many
+    folds, until the survivors have been scored on all folds. Fold scores
+    are kept, so each round only fits the folds a candidate has not seen.
+    Fits for all tickers and candidates in a round run in one joblib pool.
+    Returns ticker -> config with its cv_accuracy and fold count; tickers
+    with too few rows for `n_splits` folds are left out.
+    """
+    configs = candidate_configs() if configs is None else configs
+    folds = {}
+    for ticker, (X, y) in datasets.items():
+        try:
+            folds[ticker] = fold_slices(len(y), n_splits)
+        except ValueError:
+            continue
+    alive = {ticker: list(configs) for ticker in folds}
+    scores = {}
+    n_folds = min(min_folds, n_splits) if eta and eta > 1 else n_splits
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        while True:
+            tasks = []
+            for ticker, candidates in alive.items():
+                for config in candidates:
+                    done = len(scores.get((ticker, _config_key(config)), []))
+                    if done < n_folds:
+                        tasks.append((ticker, config, folds[ticker][done:n_folds]))
+            results = parallel(delayed(_score_folds)(*datasets[ticker], fold_list, config)
+                               for ticker, config, fold_list in tasks)
+            for (ticker, config, _), fold_scores in zip(tasks, results):
+                scores.setdefault((ticker, _config_key(config)), []).extend(fold_scores)
+
+            for ticker, candidates in alive.items():
+                candidates.sort(key=lambda c: -np.mean(scores[(ticker, _config_key(c))]))
+                if n_folds < n_splits:
+                    del candidates[max(1, math.ceil(len(candidates) / eta)):]
+            if n_folds >= n_splits:
+                break
+            n_folds = min(n_splits, n_folds * eta)
+
+    best = {}
+    for ticker, candidates in alive.items():
+        if candidates:
+            fold_scores = scores[(ticker, _config_key(candidates[0]))]
+            best[ticker] = dict(candidates[0], cv_accuracy=float(np.mean(fold_scores)), n_folds=len(fold_scores))
+    return best
+
+def save_best_configs(best, path, feature_version, rows=None):
+    """Merge tuned configs into the JSON file at `path`"""
+    saved = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            saved = json.load(f)
+    tuned_at = datetime.now().isoformat(timespec='seconds')
+    for ticker, config in best.items():
+        saved[ticker] = dict(config, feature_version=feature_version, tuned_at=tuned_at,
+                             rows=(rows or {}).get(ticker))
+    with open(path + '.tmp', 'w') as f:
+        json.dump(saved, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def load_best_configs(path, feature_version=None):
+    """ticker -> tuned config, skipping configs tuned on a different feature version"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {ticker: {'family': config['family'], 'params': config['params']}
+            for ticker, config in saved.items()
+            if feature_version is None or config.get('feature_version') == feature_version}
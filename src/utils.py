@@ -1,17 +1,111 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import pandas as pd
 from datetime import datetime
 
+from config import LOG_FILE, LOG_FORMAT, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN
+
+# Structured fields callers may pass via `extra=`
+LOG_FIELDS = ('ticker', 'stage', 'duration', 'signal')
+
+_listener = None
+_queue_handler = None
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format records as one JSON object per line with the structured fields"""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in LOG_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records without formatting them on the caller's thread
+    
+    The stock QueueHandler formats and copies every record so it can be
+    pickled; the queue here is in-process, so only the message arguments
+    are merged and formatting is left to the listener thread.
+    """
+    
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def _file_handler(log_file, rotate_when, max_bytes, backup_count):
+    """Time-based rotation when rotate_when is set, size-based otherwise"""
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backup_count, encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+
+def setup_logging(log_file=LOG_FILE, fmt=LOG_FORMAT, max_bytes=LOG_MAX_BYTES,
+                  backup_count=LOG_BACKUP_COUNT, rotate_when=LOG_ROTATE_WHEN,
+                  console=True, force=False):
+    """Route the root logger through a queue so file I/O runs on a listener thread
+    
+    fmt='json' writes JSON lines to the file; the console stays human-readable.
+    Safe to call repeatedly; pass force=True to rebuild the handlers. Root
+    handlers added by anyone else are left in place.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        if not force:
+            return _listener
+        shutdown_logging()
+    
+    text_formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s")
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(text_formatter)
+        handlers.append(console_handler)
+    if log_file:
+        file_handler = _file_handler(log_file, rotate_when, max_bytes, backup_count)
+        file_handler.setFormatter(JsonLinesFormatter() if fmt == 'json' else text_formatter)
+        handlers.append(file_handler)
+    
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    _queue_handler = _DeferredFormatQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(logging.INFO)
+    
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging():
+    """Flush queued records and close the log handlers"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = None
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+atexit.register(shutdown_logging)
+
 def get_logger(name=__name__):
     """Set up logging configuration"""
-    logging.basicConfig(
-        format="%(asctime)s %(levelname)s: %(message)s",
-        level=logging.INFO,
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('algo_trading.log', encoding='utf-8')
-        ]
-    )
+    setup_logging()
     return logging.getLogger(name)
 
 def format_currency(amount):
@@ -31,13 +125,11 @@ def validate_data(df, ticker):
     if df.empty:
         return False, f"No data available for {ticker}"
     
-    # Handle multi-level column names from yfinance
-    if isinstance(df.columns, pd.MultiIndex):
-        # Get the first level (Price) as column names
-        df.columns = df.columns.get_level_values(0)
+    # Handle multi-level column names from yfinance without touching the caller's frame
+    columns = df.columns.get_level_values(0) if isinstance(df.columns, pd.MultiIndex) else df.columns
     
     required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in required_columns if col not in columns]
     
     if missing_columns:
         return False, f"Missing columns for {ticker}: {missing_columns}"
@@ -173,6 +173,345 @@ def test_strategy():
         print(f"❌ Strategy test failed: {e}")
         return False
 
+def test_strategy_engine():
+    """Test that RULE_STRATEGY compiled alone or fused with another strategy equals generate_signals"""
+    print("\n🧩 Testing strategy engine...")
+    
+    try:
+        from golden import load_fixture, FIXTURES
+        from indicators import add_indicators
+        from strategy import generate_signals, RULE_STRATEGY
+        from strategy_engine import Strategy, apply_strategy, generate_strategy_signals
+        
+        def signals(values):
+            return [v if v in ('BUY', 'SELL') else None for v in values]
+        
+        momentum = Strategy('momentum',
+                            buy="RSI < 35 and crossed_above(SMA20, SMA50)",
+                            sell="RSI > 65 or crossed_below(SMA20, SMA50)")
+        for name in FIXTURES:
+            df = add_indicators(load_fixture(name))
+            expected = signals(generate_signals(df)['signal'])
+            fused = generate_strategy_signals(df, [RULE_STRATEGY, momentum])
+            alone = signals(apply_strategy(df, RULE_STRATEGY)['signal'])
+            if signals(fused[RULE_STRATEGY.name]) != expected or alone != expected:
+                print(f"❌ Compiled rules differ from generate_signals on {name}")
+                return False
+            if signals(fused['momentum']) != signals(apply_strategy(df, momentum)['signal']):
+                print(f"❌ Fusing changed the momentum signals on {name}")
+                return False
+        
+        print("✅ Strategy engine matches generate_signals")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Strategy engine test failed: {e}")
+        return False
+
+def test_backtest_fills():
+    """Test the backtest fill model: costs and slippage, intrabar stops, next-open fills, input checks"""
+    print("\n🧮 Testing backtest fill model...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from backtest import backtest_signals
+        
+        df = pd.DataFrame({'Open': [99, 100, 98, 99, 103, 104], 'High': [101, 102, 99, 104, 105, 106],
+                           'Low': [98, 94, 96, 98, 102, 103], 'Close': [100, 101, 97, 103, 104, 105],
+                           'RSI': [25, 50, 50, 80, 50, 50]}, index=pd.bdate_range('2024-01-01', periods=6), dtype=float)
+        df['signal'] = ['BUY'] + [None] * 5
+        
+        def trade(**kwargs):
+            t = backtest_signals(df, **kwargs)['trades'][0]
+            return t['entry_price'], t['exit_price'], t['exit_reason'], t['days_held']
+        
+        # Close fills: the RSI exit on the fourth bar, no costs
+        if trade() != (100, 103, 'RSI_OVERBOUGHT', 3):
+            print(f"❌ Close fills wrong: {trade()}")
+            return False
+        
+        # Slippage moves both fills against the trade and costs are charged on both legs
+        t = backtest_signals(df, cost_bps=10, slippage_bps=5)['trades'][0]
+        entry, exit_ = 100 * 1.0005, 103 * 0.9995
+        if not np.allclose((t['entry_price'], t['exit_price'], t['costs'], t['pnl']),
+                           (entry, exit_, (entry + exit_) * 0.001, exit_ - entry - (entry + exit_) * 0.001)):
+            print(f"❌ Costs wrong: {t}")
+            return False
+        
+        # Intrabar the Low breaches the stop on the second bar and fills at the stop, or at a gapped Open
+        if trade(intrabar=True) != (100, 95, 'STOP_LOSS', 1):
+            print(f"❌ Intrabar stop wrong: {trade(intrabar=True)}")
+            return False
+        gapped = df.copy()
+        gapped.iloc[1, :3] = [93.0, 94.0, 92.0]
+        t = backtest_signals(gapped, intrabar=True)['trades'][0]
+        if (t['exit_price'], t['exit_reason']) != (93, 'STOP_LOSS'):
+            print(f"❌ Gap through the stop wrong: {t}")
+            return False
+        
+        # next_open enters at the next bar's Open and exits at the Open after the exit bar
+        if trade(fill_at='next_open') != (100, 103, 'RSI_OVERBOUGHT', 3):
+            print(f"❌ Next-open fills wrong: {trade(fill_at='next_open')}")
+            return False
+        
+        # Missing columns and an index without dates fail up front with a clear error
+        for frame, kwargs, expected in [(df.drop(columns=['High']), {'intrabar': True}, "['High']"),
+                                        (df.drop(columns=['Open']), {'fill_at': 'next_open'}, "['Open']"),
+                                        (df.reset_index(drop=True), {}, 'DatetimeIndex')]:
+            try:
+                backtest_signals(frame, **kwargs)
+                print(f"❌ No error for {kwargs}")
+                return False
+            except ValueError as e:
+                if expected not in str(e):
+                    print(f"❌ Unclear error: {e}")
+                    return False
+        bars = backtest_signals(df.reset_index(drop=True), hold_in_bars=True)['trades'][0]
+        if (bars['exit_price'], bars['days_held']) != (103, 3):
+            print(f"❌ Bar-count holding on a plain index wrong: {bars}")
+            return False
+        
+        print("✅ Backtest fill model working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Backtest fill model test failed: {e}")
+        return False
+
+def test_ml_backtest():
+    """Test walk-forward probabilities are out-of-sample and backtest_ml trades on them"""
+    print("\n🧠 Testing ML walk-forward backtest...")
+    
+    try:
+        import numpy as np
+        from golden import load_fixture
+        from indicators import add_indicators
+        from strategy import generate_signals
+        from ml_model import walk_forward_probabilities, FEATURE_COLUMNS
+        from backtest import backtest_ml, backtest_signals
+        
+        raw = load_fixture('random_walk')
+        df = add_indicators(raw)
+        prob = walk_forward_probabilities(df, min_train=100, retrain_every=50)
+        first = df.index.get_loc(df[FEATURE_COLUMNS].dropna().index[100])
+        if prob.iloc[:first].notna().any() or prob.iloc[first:].isna().any() or not prob.dropna().between(0, 1).all():
+            print("❌ Probabilities missing or present on the wrong bars")
+            return False
+        
+        # Changing bars from 300 on leaves every earlier probability unchanged
+        shocked = raw.copy()
+        shocked.iloc[300:, :4] *= 1.2
+        reprob = walk_forward_probabilities(add_indicators(shocked), min_train=100, retrain_every=50)
+        if not np.allclose(prob.iloc[:300], reprob.iloc[:300], equal_nan=True):
+            print("❌ Probabilities use bars after the one they score")
+            return False
+        
+        # backtest_ml enters only where the model (and in confirm mode the rules) says BUY
+        results = backtest_ml(df, min_train=100, retrain_every=50)
+        rule_buys = set(df.index[generate_signals(df)['signal'] == 'BUY'])
+        confirmed = backtest_ml(df, blend='confirm', min_train=100, retrain_every=50)
+        if set(results) != set(backtest_signals(generate_signals(df))) or not results['total'] \
+                or any(prob[t['entry_date']] <= 0.6 for t in results['trades']) \
+                or any(t['entry_date'] not in rule_buys or prob[t['entry_date']] <= 0.6 for t in confirmed['trades']):
+            print("❌ ML backtest entered on the wrong bars")
+            return False
+        if backtest_ml(df, buy_threshold=1.0, min_train=100, retrain_every=50)['total'] != 0:
+            print("❌ Unreachable threshold still traded")
+            return False
+        
+        print("✅ ML walk-forward backtest working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ ML walk-forward backtest test failed: {e}")
+        return False
+
+def test_batch_predictions():
+    """Test that batched predictions and the backfill equal per-ticker predict_next_day"""
+    print("\n📦 Testing batched ML predictions...")
+    
+    try:
+        import numpy as np
+        from golden import load_fixture, FIXTURES
+        from indicators import add_indicators
+        from ml_model import (prepare_features, train_and_eval, predict_next_day, stack_features, predict_batch,
+                              predictions_by_ticker, backfill_predictions)
+        
+        frames = {name: add_indicators(load_fixture(name)) for name in FIXTURES}
+        models = {name: train_and_eval(*prepare_features(df))['model'] for name, df in frames.items()}
+        if models['short_history'] is not None:
+            print("❌ Expected no model for the short fixture")
+            return False
+        
+        def same(a, b):
+            return a['prediction'] == b['prediction'] and np.allclose(
+                [a['probability'], a['up_probability'], a['down_probability']],
+                [b['probability'], b['up_probability'], b['down_probability']])
+        
+        # Latest bar of every ticker in one pass; tickers without a model are left out
+        batched = predictions_by_ticker(predict_batch(models, stack_features(frames, latest_only=True)))
+        expected = {name: predict_next_day(models[name], df) for name, df in frames.items()}
+        if set(batched) != {name for name, p in expected.items() if p is not None} \
+                or not all(same(batched[name], expected[name]) for name in batched):
+            print("❌ Batched latest predictions differ from predict_next_day")
+            return False
+        
+        # The backfill scores every bar as predict_next_day would on the history up to it
+        backfill = backfill_predictions(models, frames)
+        for name in batched:
+            rows = backfill[backfill['Ticker'] == name]
+            df = frames[name]
+            for i in (0, len(rows) // 2, len(rows) - 1):
+                row = rows.iloc[i]
+                if not same(row, predict_next_day(models[name], df.loc[:row['Date']])):
+                    print(f"❌ Backfill differs for {name} on {row['Date']}")
+                    return False
+        
+        # One shared model scores every ticker with a complete feature row
+        shared = predictions_by_ticker(predict_batch(models['random_walk'], stack_features(frames, latest_only=True)))
+        if not set(batched) <= set(shared) or not all(
+                same(shared[name], predict_next_day(models['random_walk'], frames[name])) for name in shared):
+            print("❌ Shared-model batch differs from predict_next_day")
+            return False
+        
+        print("✅ Batched predictions match predict_next_day")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Batched predictions test failed: {e}")
+        return False
+
+def test_robustness():
+    """Test Monte Carlo robustness: daily P&L sums to the trades, intervals bracket the backtest, seeds repeat"""
+    print("\n🎲 Testing Monte Carlo robustness...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from golden import load_fixture
+        from indicators import add_indicators
+        from strategy import generate_signals
+        from backtest import backtest_signals
+        from robustness import monte_carlo, strategy_daily_pnl, confidence_interval, _max_drawdown
+        
+        if _max_drawdown(np.array([[1.0, -2.0, 3.0, -4.0]]))[0] != 4.0:
+            print("❌ Max drawdown wrong")
+            return False
+        interval = confidence_interval(np.arange(101.0), confidence=0.90)
+        if not np.allclose((interval['lower'], interval['median'], interval['upper']), (5.0, 50.0, 95.0)):
+            print(f"❌ Confidence interval wrong: {interval}")
+            return False
+        
+        df = generate_signals(add_indicators(load_fixture('crash_rebound')))
+        bt_results = backtest_signals(df, cost_bps=10)
+        daily = strategy_daily_pnl(bt_results['trades'], df['Close'])
+        if not np.isclose(daily.sum(), bt_results['net_pnl']):
+            print("❌ Daily P&L does not sum to the trades' P&L")
+            return False
+        
+        # A trade dated outside the price series is dropped instead of landing on the first bar
+        stray = dict(bt_results['trades'][0], entry_date=df.index[0] - pd.Timedelta(days=30), pnl=1000.0)
+        shifted = strategy_daily_pnl([stray] + bt_results['trades'], df['Close'])
+        if not np.allclose(shifted, daily):
+            print("❌ Trade outside the price series changed the daily P&L")
+            return False
+        
+        report = monte_carlo(bt_results, df['Close'], n_sims=500, seed=7)
+        again = monte_carlo(bt_results, df['Close'], n_sims=500, seed=7)
+        for method in ('trades', 'paths'):
+            net = report[method]['net_pnl']
+            if not net['lower'] <= bt_results['net_pnl'] <= net['upper'] or not 0 <= report[method]['prob_loss'] <= 1:
+                print(f"❌ {method} interval does not bracket the backtest: {net}")
+                return False
+        if report != again:
+            print("❌ Same seed gave different simulations")
+            return False
+        
+        # Splitting across processes keeps the simulation count
+        split = monte_carlo(bt_results, df['Close'], n_sims=501, seed=7, workers=2)
+        if split['n_sims'] != 501 or split['trades'] is None:
+            print("❌ Multi-process run failed")
+            return False
+        if monte_carlo({'trades': []}, df['Close'])['trades'] is not None:
+            print("❌ No trades should give no intervals")
+            return False
+        
+        print("✅ Monte Carlo robustness working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Monte Carlo robustness test failed: {e}")
+        return False
+
+def test_tuning():
+    """Test the hyperparameter search: fold layout, successive halving with fold reuse, saved configs"""
+    print("\n🎛️ Testing hyperparameter tuning...")
+    
+    try:
+        import os
+        import tempfile
+        import numpy as np
+        import tuning
+        from tuning import fold_slices, tune, candidate_configs, save_best_configs, load_best_configs, SEARCH_SPACE
+        
+        # Contiguous folds, most recent first, with one bar dropped between train and test
+        folds = fold_slices(120, n_splits=5)
+        if len(folds) != 5 or folds[0][1].stop != 120 or any(train.start != 0 or test.start != train.stop + 1
+                                                             for train, test in folds):
+            print(f"❌ Fold layout wrong: {folds}")
+            return False
+        
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(300, 4))
+        y = (X[:, 0] + rng.normal(scale=0.5, size=300) > 0).astype(int)
+        datasets = {'A.NS': (X, y), 'B.NS': (X[::-1].copy(), y[::-1].copy()), 'TINY.NS': (X[:4], y[:4])}
+        configs = candidate_configs({'tree': SEARCH_SPACE['tree']})
+        
+        fitted = []
+        score_folds = tuning._score_folds
+        def counting(X, y, fold_list, config):
+            fitted.extend((float(X[0, 0]), tuning._config_key(config), train.stop) for train, _ in fold_list)
+            return score_folds(X, y, fold_list, config)
+        tuning._score_folds = counting
+        try:
+            best = tune(datasets, configs, n_splits=5, eta=3, n_jobs=1)
+        finally:
+            tuning._score_folds = score_folds
+        
+        # Per ticker: 9 candidates on 1 fold, the best 3 on 2 more, the winner on the last 2; no fold fitted twice
+        if set(best) != {'A.NS', 'B.NS'} or len(fitted) != 2 * (9 + 3 * 2 + 2) or len(set(fitted)) != len(fitted):
+            print(f"❌ Successive halving fitted {len(fitted)} folds for {sorted(best)}")
+            return False
+        X_a, y_a = datasets['A.NS']
+        winner = {'family': best['A.NS']['family'], 'params': best['A.NS']['params']}
+        if best['A.NS']['n_folds'] != 5 or not np.isclose(
+                best['A.NS']['cv_accuracy'], np.mean(score_folds(X_a, y_a, fold_slices(300, 5), winner))):
+            print(f"❌ Winner not scored on every fold: {best['A.NS']}")
+            return False
+        
+        # Saved configs are only served to the feature version they were tuned on
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tuning.json')
+            save_best_configs({'A.NS': best['A.NS']}, path, 'v1', {'A.NS': 300})
+            save_best_configs({'B.NS': best['B.NS']}, path, 'v2')
+            if set(load_best_configs(path, 'v2')) != {'B.NS'} or set(load_best_configs(path)) != {'A.NS', 'B.NS'} \
+                    or load_best_configs(path, 'v1')['A.NS'] != winner or load_best_configs(path, 'v3'):
+                print("❌ Feature-version filtering wrong")
+                return False
+            with open(path, 'w') as f:
+                f.write('{not json')
+            if load_best_configs(path, 'v1') != {} or load_best_configs(os.path.join(tmp, 'missing.json')) != {}:
+                print("❌ Unreadable tuning file not ignored")
+                return False
+        
+        print("✅ Hyperparameter tuning working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Hyperparameter tuning test failed: {e}")
+        return False
+
 def test_telegram():
     """Test Telegram integration"""
     print("\n📱 Testing Telegram integration...")
@@ -201,6 +540,1374 @@ def test_telegram():
         print(f"❌ Telegram test failed: {e}")
         return False
 
+def test_async_fetch():
+    """Test concurrent fetching against a local fake data source"""
+    print("\n⚡ Testing async fetch...")
+    
+    try:
+        import time
+        import pandas as pd
+        from data_fetch import fetch_many, CircuitBreaker
+        
+        index = pd.date_range('2024-01-01', periods=60, freq='B', name='Date')
+        frame = pd.DataFrame({col: 100.0 for col in ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']}, index=index)
+        calls = {}
+        
+        def fake_source(ticker, period, interval):
+            calls[ticker] = calls.get(ticker, 0) + 1
+            time.sleep(0.1)
+            if ticker == 'DOWN.NS':
+                raise ConnectionError("upstream down")
+            if ticker == 'FLAKY.NS' and calls[ticker] == 1:
+                raise TimeoutError("first attempt times out")
+            return frame
+        
+        tickers = [f"T{i}.NS" for i in range(100)] + ['DOWN.NS', 'FLAKY.NS']
+        start = time.perf_counter()
+        results = fetch_many(tickers, source=fake_source, concurrency=100, retries=2, backoff=0.01)
+        elapsed = time.perf_counter() - start
+        
+        ok = sum(1 for r in results.values() if r['ok'])
+        print(f"   Fetched {ok}/{len(tickers)} tickers in {elapsed:.2f}s")
+        
+        if ok != 101 or results['DOWN.NS']['attempts'] != 3 or results['FLAKY.NS']['attempts'] != 2:
+            print("❌ Unexpected fetch results")
+            return False
+        if elapsed > 2.0:
+            print("❌ Fetches did not run concurrently")
+            return False
+        
+        # Circuit breaker stops calling a dead upstream
+        calls.clear()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        results = fetch_many([f"X{i}.NS" for i in range(10)],
+                             source=lambda t, p, i: fake_source('DOWN.NS', p, i),
+                             concurrency=1, retries=0, breaker=breaker)
+        if breaker.state != 'open' or calls['DOWN.NS'] != 3:
+            print("❌ Circuit breaker did not open")
+            return False
+        
+        # Threads abandoned by timeouts keep their slot, so later calls wait for it
+        # instead of timing out queued behind them in the executor
+        def slow_source(ticker, period, interval):
+            time.sleep(0.6 if ticker.startswith('HANG') else 0.05)
+            return frame
+        results = fetch_many(['HANG1.NS', 'HANG2.NS'] + [f"Q{i}.NS" for i in range(8)], source=slow_source,
+                             concurrency=3, timeout=0.2, retries=0)
+        if [r['ok'] for r in results.values()] != [False, False] + [True] * 8:
+            print(f"❌ Calls starved behind timed-out threads: {[r['error'] for r in results.values()]}")
+            return False
+        
+        # A source that never returns holds one slot; the other tickers still fetch, and
+        # once hung calls hold every slot the rest fail after the timeout instead of waiting
+        import threading
+        release = threading.Event()
+        def hung_source(ticker, period, interval):
+            if ticker == 'HUNG.NS':
+                release.wait()
+            return frame
+        try:
+            results = fetch_many(['HUNG.NS'] + [f"H{i}.NS" for i in range(6)], source=hung_source,
+                                 concurrency=2, timeout=0.2, retries=0)
+            if [r['ok'] for r in results.values()] != [False] + [True] * 6:
+                print(f"❌ Tickers blocked behind a hung call: {[r['error'] for r in results.values()]}")
+                return False
+            start = time.perf_counter()
+            results = fetch_many(['HUNG.NS'] + [f"H{i}.NS" for i in range(6)], source=hung_source,
+                                 concurrency=1, timeout=0.2, retries=1, backoff=0.01)
+            elapsed = time.perf_counter() - start
+        finally:
+            release.set()
+        if any(r['ok'] for r in results.values()) or elapsed > 1.0 \
+                or not results['H5.NS']['error'].startswith('TimeoutError: No fetch slot'):
+            print(f"❌ Hung call stalled the queue for {elapsed:.2f}s")
+            return False
+        
+        # The Yahoo Finance source goes through per-ticker objects, so downloads run concurrently
+        import data_fetch
+        active, peak = [0], [0]
+        class FakeTicker:
+            def __init__(self, ticker):
+                self.ticker = ticker
+            def history(self, **kwargs):
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                active[0] -= 1
+                return frame.assign(Close=float(len(self.ticker))).tz_localize('Asia/Kolkata')
+        real_ticker = data_fetch.yf.Ticker
+        data_fetch.yf.Ticker = FakeTicker
+        try:
+            results = fetch_many([f"Y{'X' * i}.NS" for i in range(6)], concurrency=6)
+        finally:
+            data_fetch.yf.Ticker = real_ticker
+        if peak[0] < 2 or any(r['data']['Close'].iloc[0] != len(t) or r['data'].index.tz is not None
+                              for t, r in results.items()):
+            print(f"❌ Yahoo Finance downloads wrong or serialized: {peak[0]} at once")
+            return False
+        
+        print("✅ Async fetch works (concurrency, retries, circuit breaker)")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Async fetch test failed: {e}")
+        return False
+
+def test_metrics_endpoint():
+    """Test the Prometheus metrics endpoint with a local scrape"""
+    print("\n📡 Testing metrics endpoint...")
+    
+    try:
+        from urllib.request import urlopen
+        from metrics import MetricsRegistry, start_metrics_server
+        
+        registry = MetricsRegistry()
+        signals = registry.counter('test_signals_total', 'Signals emitted')
+        latency = registry.histogram('test_fetch_latency_seconds', 'Fetch latency', buckets=(0.1, 1.0))
+        tickers = registry.gauge('test_tickers_scanned', 'Tickers scanned')
+        
+        signals.inc(signal='BUY')
+        signals.inc(2, signal='SELL')
+        latency.observe(0.05, status='ok')
+        latency.observe(0.5, status='ok')
+        tickers.set(3)
+        
+        server = start_metrics_server(port=0, metrics_registry=registry)
+        try:
+            port = server.server_address[1]
+            with urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        
+        expected = [
+            '# TYPE test_signals_total counter',
+            'test_signals_total{signal="SELL"} 2',
+            'test_fetch_latency_seconds_bucket{status="ok",le="0.1"} 1',
+            'test_fetch_latency_seconds_bucket{status="ok",le="+Inf"} 2',
+            'test_fetch_latency_seconds_count{status="ok"} 2',
+            'test_tickers_scanned 3',
+        ]
+        missing = [line for line in expected if line not in body.splitlines()]
+        if missing:
+            print(f"❌ Missing metric lines: {missing}")
+            return False
+        
+        print("✅ Metrics endpoint scraped successfully")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Metrics endpoint test failed: {e}")
+        return False
+
+def test_logging():
+    """Test JSON-lines logging: structured fields, size rotation, caller handlers left in place"""
+    print("\n📝 Testing structured logging...")
+    
+    try:
+        import json
+        import logging
+        import logging.handlers
+        import os
+        import tempfile
+        from utils import setup_logging, shutdown_logging
+        
+        class Collecting(logging.Handler):
+            def __init__(self):
+                super().__init__()
+                self.records = []
+        
+            def emit(self, record):
+                self.records.append(record)
+        
+        root = logging.getLogger()
+        caller = Collecting()
+        root.addHandler(caller)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'app.log')
+                setup_logging(log_file=path, fmt='json', max_bytes=500, backup_count=2, console=False, force=True)
+                setup_logging(log_file=path, fmt='json', max_bytes=500, backup_count=2, console=False, force=True)
+                if sum(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers) != 1:
+                    print("❌ Re-running setup left a stale queue handler")
+                    return False
+                log = logging.getLogger('test_logging')
+                for i in range(40):
+                    log.info("Scanned %d", i, extra={'ticker': 'TEST.NS', 'stage': 'scan'})
+                shutdown_logging()
+        
+                # The caller's handler stays attached and still sees every record
+                if caller not in root.handlers or len(caller.records) != 40:
+                    print("❌ Caller's log handler removed or starved")
+                    return False
+        
+                files = sorted(os.listdir(tmp))
+                if files != ['app.log', 'app.log.1', 'app.log.2']:
+                    print(f"❌ Rotation wrong: {files}")
+                    return False
+                for name in files:
+                    with open(os.path.join(tmp, name), encoding='utf-8') as f:
+                        entries = [json.loads(line) for line in f]
+                    if not entries or any(e['ticker'] != 'TEST.NS' or e['stage'] != 'scan' or e['level'] != 'INFO'
+                                          or not e['message'].startswith('Scanned ') for e in entries):
+                        print(f"❌ Bad JSON lines in {name}")
+                        return False
+                with open(path, encoding='utf-8') as f:
+                    if json.loads(f.readlines()[-1])['message'] != 'Scanned 39':
+                        print("❌ Latest record not in the live log file")
+                        return False
+        finally:
+            root.removeHandler(caller)
+            setup_logging(force=True)
+        
+        print("✅ Structured logging working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Structured logging test failed: {e}")
+        return False
+
+def test_data_quality():
+    """Test OHLCV repair: clean data untouched, bad ticks, splits, wicks and partial rows repaired"""
+    print("\n🧹 Testing data quality repair...")
+    
+    try:
+        import numpy as np
+        from golden import load_fixture, FIXTURES
+        from data_quality import repair_ohlcv, PRICE_COLUMNS
+        
+        # Clean fixtures, including a flat stretch before a random walk, come back unchanged
+        for name in FIXTURES:
+            df = load_fixture(name)
+            repaired, report = repair_ohlcv(df, name, align_calendar=False)
+            if report['repaired_rows'] or not np.array_equal(repaired[PRICE_COLUMNS].to_numpy(), df[PRICE_COLUMNS].to_numpy()):
+                print(f"❌ Clean fixture {name} was modified: {report}")
+                return False
+        
+        df = load_fixture('random_walk')
+        close = df.columns.get_loc('Close')
+        
+        # A one-bar spike that reverts is replaced by the previous close
+        spiked = df.copy()
+        spiked.iloc[200, close] *= 1.3
+        repaired, report = repair_ohlcv(spiked, align_calendar=False)
+        if report['bad_ticks'] != 1 or repaired['Close'].iloc[200] != df['Close'].iloc[199]:
+            print(f"❌ Bad tick not repaired: {report['bad_ticks']}")
+            return False
+        
+        # An unadjusted 1:2 split is detected and earlier history rescaled
+        split = df.copy()
+        split.iloc[250:, [split.columns.get_loc(c) for c in PRICE_COLUMNS]] /= 2
+        repaired, report = repair_ohlcv(split, align_calendar=False)
+        if [ratio for _, ratio in report['splits']] != [2.0] or report['splits'][0][0] != df.index[250].strftime('%Y-%m-%d'):
+            print(f"❌ Split not detected: {report['splits']}")
+            return False
+        if not np.allclose(repaired['Close'].to_numpy(), split['Close'].to_numpy() / np.where(np.arange(len(df)) < 250, 2, 1)):
+            print("❌ History before the split was not rescaled")
+            return False
+        
+        # A wick far outside the body is clipped to it
+        wick = df.copy()
+        body_high = max(df['Open'].iloc[300], df['Close'].iloc[300])
+        wick.iloc[300, wick.columns.get_loc('High')] = body_high * 1.5
+        repaired, report = repair_ohlcv(wick, align_calendar=False)
+        if report['wick_outliers'] != 1 or repaired['High'].iloc[300] != body_high:
+            print(f"❌ Wick outlier not clipped: {report['wick_outliers']}")
+            return False
+        
+        # A row with a missing open is filled from its close rather than dropped
+        partial = df.copy()
+        partial.iloc[100, partial.columns.get_loc('Open')] = np.nan
+        repaired, report = repair_ohlcv(partial, align_calendar=False)
+        if report['invalid_prices'] != 1 or len(repaired) != len(df) or repaired['Open'].iloc[100] != df['Close'].iloc[100]:
+            print(f"❌ Partial row not repaired: {report['invalid_prices']}")
+            return False
+        
+        print("✅ Data quality repair working")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Data quality test failed: {e}")
+        return False
+
+def test_feature_store():
+    """Test feature store appends, backfills and rewrites of a forming bar against a full rebuild"""
+    print("\n🗄️ Testing feature store...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from golden import _bars, _walk
+        from indicators import add_indicators
+        from feature_store import FeatureStore
+        
+        df = add_indicators(_bars(_walk(500, 71), 72))
+        
+        def rebuilt(frame):
+            with tempfile.TemporaryDirectory() as tmp:
+                fresh = FeatureStore(tmp)
+                fresh.update('T', frame)
+                return np.array(fresh.training_matrix('T')[1])
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            store = FeatureStore(tmp)
+            
+            # A 6-month scan first, then a 2-year frame backfills the earlier history
+            store.update('T', df.iloc[-125:-10])
+            if store.update('T', df.iloc[:-10]) != 490 or not np.array_equal(store.training_matrix('T')[1], rebuilt(df.iloc[:-10]), equal_nan=True):
+                print("❌ Longer history was not backfilled")
+                return False
+            
+            # New bars append; a later short frame keeps the accumulated history
+            if store.update('T', df.iloc[-125:-5]) != 6 or len(store.training_set('T')[1]) < 400:
+                print("❌ New bars should append to the stored history")
+                return False
+            
+            # A forming bar whose close moves rewrites only that bar and the target before it
+            forming = df.iloc[:-5].copy()
+            forming.iloc[-1, forming.columns.get_loc('Close')] *= 1.02
+            if store.update('T', forming.iloc[-125:]) != 2:
+                print("❌ Moved last close should rewrite two rows")
+                return False
+            if not np.array_equal(store.training_matrix('T')[1], rebuilt(forming), equal_nan=True):
+                print("❌ Rewritten rows differ from a rebuild")
+                return False
+            
+            # Re-adjusted history rebuilds from the frame
+            adjusted = df.copy()
+            adjusted[['Open', 'High', 'Low', 'Close']] *= 0.5
+            if store.update('T', adjusted) != len(adjusted):
+                print("❌ Re-adjusted history should rebuild the ticker")
+                return False
+        
+        print("✅ Feature store working")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Feature store test failed: {e}")
+        return False
+
+def test_paper_broker():
+    """Test paper orders: MOC fills match backtest_signals, MKT/LMT fills, cancels and reload"""
+    print("\n📒 Testing paper broker...")
+    
+    try:
+        import os
+        import tempfile
+        import pandas as pd
+        from golden import load_fixture
+        from indicators import add_indicators
+        from strategy import generate_signals
+        from backtest import _simulate
+        from paper_trading import PaperBroker
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            # Replaying the fixtures bar by bar with a MOC BUY per signal gives the backtest's trades
+            for name in ('random_walk', 'crash_rebound', 'buy_sell_conflict'):
+                df = generate_signals(add_indicators(load_fixture(name)))
+                expected, _, _ = _simulate(df)
+                broker = PaperBroker(os.path.join(tmp, f'{name}.db'))
+                for i, (date, row) in enumerate(df.iterrows()):
+                    if row['signal'] == 'BUY':
+                        broker.submit_order(name, 'BUY', 1, date)
+                    broker.on_bars({name: df.iloc[i:i + 1]})
+                trades = broker.trades()
+                actual = list(zip(pd.to_datetime(trades['entry_date']), pd.to_datetime(trades['exit_date']),
+                                  trades['entry_price'], trades['exit_price'], trades['exit_reason']))
+                wanted = [(t['entry_date'], t['exit_date'], t['entry_price'], t['exit_price'], t['exit_reason'])
+                          for t in expected]
+                pending = broker.conn.execute("SELECT COUNT(*) FROM orders WHERE status = 'PENDING'").fetchone()[0]
+                broker.close()
+                if actual != wanted or pending:
+                    print(f"❌ {name}: {len(actual)} paper trades vs {len(wanted)} backtest trades, {pending} pending")
+                    return False
+        
+            index = pd.bdate_range('2024-01-01', periods=6)
+            bars = pd.DataFrame({'Open': [100, 101, 103, 99, 98, 97], 'High': [102, 104, 104, 100, 99, 98],
+                                 'Low': [99, 100, 98, 97, 96, 95], 'Close': [101, 103, 99, 98, 97, 96],
+                                 'RSI': [50, 50, 50, 80, 50, 50], 'signal': [None] * 6}, index=index)
+            path = os.path.join(tmp, 'orders.db')
+            broker = PaperBroker(path)
+        
+            # MOC fills at the signal bar's Close; RSI 80 on the fourth bar exits the position
+            broker.submit_order('X', 'BUY', 10, index[0])
+            # A MOC BUY for the exit bar is cancelled, not filled at the next Open
+            broker.submit_order('X', 'BUY', 10, index[3])
+            broker.on_bars({'X': bars.iloc[:5]})
+            statuses = dict(broker.conn.execute("SELECT signal_date, status FROM orders"))
+            trades = broker.trades()
+            if len(trades) != 1 or trades['entry_price'][0] != 101 or trades['exit_reason'][0] != 'RSI_OVERBOUGHT':
+                print(f"❌ MOC round trip wrong: {trades.to_dict('records')}")
+                return False
+            if statuses[index[3].isoformat()] != 'CANCELLED' or 'X' in broker.positions:
+                print(f"❌ MOC order on an exit bar not cancelled: {statuses}")
+                return False
+        
+            # A MOC order whose bar has already been processed is cancelled on the next bar
+            late = broker.submit_order('Y', 'BUY', 10, index[0])
+            broker.on_bars({'Y': bars.iloc[1:2]})
+            if broker.conn.execute("SELECT status FROM orders WHERE id = ?", (late,)).fetchone()[0] != 'CANCELLED':
+                print("❌ Late MOC order not cancelled")
+                return False
+        
+            # MKT fills at the next bar's Open; a BUY LMT fills at the limit once Low reaches it
+            broker.submit_order('Z', 'BUY', 10, index[1], order_type='MKT')
+            broker.submit_order('W', 'BUY', 10, index[1], order_type='LMT', limit_price=98.5)
+            broker.on_bars({'Z': bars.iloc[1:3], 'W': bars.iloc[1:3]})
+            if broker.positions['Z']['entry_price'] != 103 or broker.positions['W']['entry_price'] != 98.5:
+                print(f"❌ MKT/LMT fills wrong: {broker.position_notional()}")
+                return False
+            cash = broker.cash
+            broker.close()
+        
+            # Positions, cash and the last bar seen survive a restart
+            broker = PaperBroker(path)
+            reloaded = (set(broker.positions), broker.cash, broker.last_dates['Z'])
+            broker.close()
+            if reloaded != ({'Z', 'W'}, cash, index[2]):
+                print(f"❌ Broker state not reloaded: {reloaded}")
+                return False
+        
+        print("✅ Paper broker working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Paper broker test failed: {e}")
+        return False
+
+def test_risk_covariance():
+    """Test the rolling covariance: matches pandas, masks missing closes, commits only closed bars"""
+    print("\n🛡️ Testing risk covariance...")
+    
+    try:
+        import os
+        import tempfile
+        from datetime import datetime
+        import numpy as np
+        import pandas as pd
+        import main
+        from config import TICKERS
+        from risk import RollingCovariance
+        
+        rng = np.random.default_rng(3)
+        tickers = ['A.NS', 'B.NS', 'C.NS']
+        closes = pd.DataFrame(1000 * np.exp(np.cumsum(rng.normal(0, 0.01, (150, 3)), axis=0)),
+                              index=pd.bdate_range('2024-01-01', periods=150), columns=tickers)
+        
+        # Incremental updates (including a drift rebuild) equal the window's sample covariance
+        covariance = RollingCovariance(tickers, window=60).update_from_closes(closes)
+        expected = closes.pct_change().iloc[-60:].cov().to_numpy()
+        if not np.allclose(covariance.covariance(), expected):
+            print("❌ Covariance differs from pandas")
+            return False
+        
+        # A missing close is left out of its pairs instead of counting as a 0 return
+        gappy = closes.copy()
+        gappy.iloc[120, 2] = np.nan
+        gappy.iloc[:10, 1] = np.nan
+        covariance = RollingCovariance(tickers, window=60).update_from_closes(gappy)
+        expected = gappy.pct_change(fill_method=None).iloc[-60:].cov().to_numpy()
+        if not np.allclose(covariance.covariance(), expected):
+            print("❌ Missing closes not masked")
+            return False
+        
+        # Saving and resuming gives the same state as one pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'risk.npz')
+            RollingCovariance(tickers, window=60).update_from_closes(gappy.iloc[:100]).save(path)
+            resumed = RollingCovariance.load(path, tickers, window=60).update_from_closes(gappy)
+            if not np.allclose(resumed.covariance(), covariance.covariance()) or resumed.last_date != gappy.index[-1]:
+                print("❌ Resumed covariance differs")
+                return False
+        
+            # A daily bar is only committed once the session has closed
+            frames = {t: pd.DataFrame({'Close': closes.iloc[:, i % 3]}) for i, t in enumerate(TICKERS)}
+            last = closes.index[-1]
+            saved = main.RISK_STATE_FILE, main.ist_now
+            main.RISK_STATE_FILE = os.path.join(tmp, 'scan.npz')
+            try:
+                committed = []
+                for hour in (14, 16):
+                    main.ist_now = lambda: datetime(last.year, last.month, last.day, hour)
+                    main.check_risk([], frames)
+                    committed.append(RollingCovariance.load(main.RISK_STATE_FILE, TICKERS, main.RISK_WINDOW).last_date)
+            finally:
+                main.RISK_STATE_FILE, main.ist_now = saved
+            if committed != [closes.index[-2], last]:
+                print(f"❌ Forming bar committed: {committed}")
+                return False
+        
+        print("✅ Risk covariance working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Risk covariance test failed: {e}")
+        return False
+
+def test_screener():
+    """Test the cross-sectional screens: panel latest values, filters, ranks and relative strength"""
+    print("\n🔎 Testing screener...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from golden import load_fixture, FIXTURES
+        from indicators import add_indicators
+        from screener import IndicatorPanel, relative_strength, run_screens, screen, screen_rows
+        
+        # Every fixture re-dated to end on the same day
+        frames = {}
+        for name in FIXTURES:
+            df = add_indicators(load_fixture(name))
+            frames[name] = df.set_axis(pd.bdate_range(end='2024-06-28', periods=len(df), name='Date'))
+        panel = IndicatorPanel(frames)
+        latest = panel.latest()
+        
+        # Each ticker's latest values come from its own last bars, whatever its length
+        for name, df in frames.items():
+            expected = (df['RSI'].iloc[-1], df['Close'].iloc[-1] / df['Close'].iloc[-21] - 1)
+            if not np.allclose((latest.loc[name, 'RSI'], latest.loc[name, 'return_20']), expected):
+                print(f"❌ Latest values wrong for {name}")
+                return False
+        
+        # A ticker whose feed stopped before the latest date is left out, not ranked on stale values
+        stale = dict(frames, trend_up=frames['trend_up'].iloc[:-3])
+        stale_latest = IndicatorPanel(stale).latest()
+        if not stale_latest.loc['trend_up'].isna().all() \
+                or 'trend_up' in screen(stale_latest, rank_by='RSI').index \
+                or not stale_latest.drop(index='trend_up').equals(latest.drop(index='trend_up')):
+            print("❌ Stale ticker still in the latest cross-section")
+            return False
+        
+        # Updating one ticker at a time (a new bar, the window rolling on) matches a rebuild
+        extended = {name: df.iloc[1:] for name, df in frames.items()}
+        extended['random_walk'] = pd.concat([frames['random_walk'], frames['random_walk'].iloc[-1:].set_axis(
+            pd.DatetimeIndex([pd.Timestamp('2024-07-01')], name='Date'))]).iloc[1:]
+        incremental = IndicatorPanel(frames)
+        for name in ['random_walk'] + [n for n in extended if n != 'random_walk']:
+            incremental.update(name, extended[name])
+        rebuilt = IndicatorPanel(extended)
+        if set(incremental.panels) != set(rebuilt.panels) or not all(
+                incremental.panels[f].equals(rebuilt.panels[f]) for f in rebuilt.panels) \
+                or not incremental.latest().equals(rebuilt.latest()):
+            print("❌ Incremental panel update differs from a rebuild")
+            return False
+        
+        # Filters keep only matching tickers, ranked best first
+        result = screen(latest, filters=[('RSI', '>', 40)], rank_by='RSI', ascending=False, top=3)
+        ranked = latest.loc[latest['RSI'] > 40, 'RSI'].sort_values(ascending=False).head(3)
+        if list(result.index) != list(ranked.index) or list(result['rank']) != [1, 2, 3]:
+            print(f"❌ Screen order wrong: {list(result.index)}")
+            return False
+        
+        # Relative strength subtracts the benchmark's return over the same window
+        benchmark = frames['random_walk']['Close'] * 0.5
+        strength = relative_strength(panel, benchmark)
+        expected = latest['return_20'] - (benchmark.iloc[-1] / benchmark.iloc[-21] - 1)
+        if not np.allclose(strength, expected):
+            print("❌ Relative strength wrong")
+            return False
+        results = run_screens(panel, benchmark, top=2)
+        rows = screen_rows(results)
+        if set(results) != {'oversold_volume_spike', 'overbought', 'momentum_20d', 'relative_strength'} \
+                or len(rows) != sum(len(r) for r in results.values()):
+            print(f"❌ Standard screens wrong: {list(results)}")
+            return False
+        
+        # A panel shorter than the window gives NaN instead of raising
+        short = IndicatorPanel({name: df.iloc[-15:] for name, df in frames.items()})
+        if not relative_strength(short, benchmark.iloc[-15:]).isna().all() or 'relative_strength' in run_screens(short, benchmark):
+            print("❌ Short panel not handled")
+            return False
+        
+        print("✅ Screener working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Screener test failed: {e}")
+        return False
+
+def test_reporting():
+    """Test the report tables and that sinks write only what changed, each failing on its own"""
+    print("\n🧾 Testing reporting...")
+    
+    try:
+        import os
+        import tempfile
+        from unittest.mock import MagicMock
+        import reporting
+        from golden import load_fixture
+        from indicators import add_indicators
+        from strategy import generate_signals
+        from backtest import backtest_signals
+        from excel_integration import ExcelManager
+        from reporting import Report, Sink, ExcelSink, SheetsSink, HtmlSink, TelegramSink, ScreensSink, render_report
+        from subscriptions import Subscriber, SubscriptionRouter
+        
+        try:
+            Sink()
+            print("❌ Sink without write() could be created")
+            return False
+        except TypeError:
+            pass
+        
+        class RecordingSink(Sink):
+            name = 'recording'
+        
+            def __init__(self, key):
+                super().__init__(key)
+                self.writes = []
+        
+            def write(self, report, tables):
+                self.writes.append(sorted(tables))
+                return True
+        
+        class BrokenSink(RecordingSink):
+            name = 'broken'
+        
+            def write(self, report, tables):
+                super().write(report, tables)
+                raise IOError("disk full")
+        
+        reporting._sink_state.clear()
+        df = generate_signals(add_indicators(load_fixture('random_walk')))
+        report = Report()
+        report.set_summary({'Total Trades': 3, 'Wins': 2, 'Losses': 1, 'Net P&L': 12.5, 'Win Ratio (%)': 66.67})
+        report.set_ml_results({'RW.NS': {'model': object(), 'accuracy': 0.55,
+                                         'prediction': {'prediction': 'UP', 'up_probability': 0.7, 'down_probability': 0.3}},
+                               'NOMODEL.NS': {'model': None}})
+        results = backtest_signals(df)
+        report.add_backtest('RW.NS', results, df['Close'])
+        report.set_screens([['momentum_20d', 1, 'RW.NS', 0.12, 1.5, 1010.0]])
+        
+        tables = report.tables()
+        if set(tables) != {'Summary', 'Analytics', 'Backtest_Trades', 'Equity_Curves', 'Screens'} \
+                or len(tables['Analytics']) != 2 or len(tables['Backtest_Trades']) != results['total'] + 1:
+            print(f"❌ Unexpected report tables: {list(tables)}")
+            return False
+        curves = report.equity_curves()
+        if abs(curves['Portfolio'].iloc[-1] - results['net_pnl']) > 1e-6 * max(1.0, abs(results['net_pnl'])):
+            print("❌ Equity curve does not end at the backtest's net P&L")
+            return False
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            recording, broken = RecordingSink(tmp), BrokenSink(tmp)
+            worksheets = {name: MagicMock() for name in ('Summary', 'Analytics', 'Screens')}
+            sent = []
+            html_path = os.path.join(tmp, 'report.html')
+            excel = ExcelManager(os.path.join(tmp, 'report.xlsx'))
+            screen_sends = []
+            router = SubscriptionRouter([Subscriber('desk', 7), Subscriber('it-desk', 8, tickers=['TCS.NS'])],
+                                        send=lambda text, chat_id=None, session=None: screen_sends.append((chat_id, text)) or True)
+            sinks = [recording, broken, SheetsSink(worksheets), HtmlSink(html_path),
+                     TelegramSink(lambda text: sent.append(text) or True), ExcelSink(excel), ScreensSink(router.broadcast)]
+        
+            # A failing sink is reported without stopping the others
+            rendered = render_report(report, sinks)
+            if rendered != {'recording': True, 'broken': False, 'sheets': True, 'html': True, 'telegram': True,
+                            'excel': True, 'screens': True}:
+                print(f"❌ Unexpected sink results: {rendered}")
+                return False
+            if recording.writes != [sorted(tables)] or not sent or 'Net P&L: ₹12.50' not in sent[0]:
+                print(f"❌ First render incomplete: {recording.writes}")
+                return False
+            # Screens go to every subscribed destination through the router
+            if sorted(chat for chat, _ in screen_sends) != ['7', '8'] or '*momentum_20d*: RW.NS (0.12)' not in screen_sends[0][1]:
+                print(f"❌ Screens not sent to every destination: {screen_sends}")
+                return False
+            worksheets['Summary'].update.assert_called_once_with(tables['Summary'])
+            if 'RW.NS' not in open(html_path, encoding='utf-8').read() \
+                    or excel.read_sheet('Summary')['Metric'].tolist() != list(report.summary):
+                print("❌ HTML or Excel report missing content")
+                return False
+        
+            # Unchanged tables are skipped; a changed summary is the only table rewritten
+            render_report(report, sinks)
+            report.set_summary(dict(report.summary, Wins=3))
+            render_report(report, sinks)
+            router.close()
+            if recording.writes != [sorted(tables), ['Summary']] or len(sent) != 2 or len(screen_sends) != 2 \
+                    or worksheets['Analytics'].update.call_count != 1 or worksheets['Summary'].update.call_count != 2:
+                print(f"❌ Unchanged tables rewritten: {recording.writes}")
+                return False
+            # The failed sink retries everything it never wrote
+            if broken.writes != [sorted(tables)] * 3:
+                print(f"❌ Failed sink did not retry: {broken.writes}")
+                return False
+        
+        print("✅ Reporting working")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Reporting test failed: {e}")
+        return False
+
+def test_golden_outputs():
+    """Test indicators, signals and backtests against the golden reference outputs"""
+    print("\n🥇 Testing golden outputs...")
+    
+    try:
+        from golden import check, FIXTURES
+        
+        failures = check()
+        for failure in failures:
+            print(f"❌ {failure}")
+        if failures:
+            return False
+        
+        print(f"✅ Golden outputs match for {len(FIXTURES)} fixtures")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Golden output test failed: {e}")
+        return False
+
+def test_tick_aggregator():
+    """Test tick-to-bar aggregation by replaying a tick file"""
+    print("\n⏱️ Testing tick aggregator...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from tick_aggregator import TickAggregator, BarPipeline, replay_file
+        
+        rng = np.random.default_rng(0)
+        n = 50_000
+        start = pd.Timestamp('2024-01-01 09:15').value
+        timestamps = start + np.sort(rng.integers(0, 3 * 3600 * 10**9, n))
+        # 5% of ticks arrive up to 1.5s late, inside the 2s lateness window
+        timestamps -= (rng.random(n) < 0.05) * rng.integers(0, 1_500_000_000, n)
+        ticks = pd.DataFrame({
+            'timestamp': timestamps,
+            'symbol': np.array(['AAA', 'BBB', 'CCC'])[rng.integers(0, 3, n)],
+            'price': 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, n))),
+            'size': rng.integers(1, 100, n)
+        })
+        
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'ticks.csv')
+            ticks.to_csv(path, index=False)
+            aggregator = TickAggregator('1m', lateness=2.0)
+            pipeline = BarPipeline(aggregator)
+            replay_file(path, aggregator)
+        
+        ticks['Date'] = pd.to_datetime(ticks['timestamp']).dt.floor('1min')
+        ticks = ticks.sort_values(['symbol', 'timestamp'], kind='stable')
+        expected = ticks.groupby(['symbol', 'Date']).agg(
+            Open=('price', 'first'), High=('price', 'max'), Low=('price', 'min'),
+            Close=('price', 'last'), Volume=('size', 'sum'))
+        for symbol in ['AAA', 'BBB', 'CCC']:
+            bars = aggregator.history(symbol)[['Open', 'High', 'Low', 'Close', 'Volume']]
+            if not np.array_equal(bars.to_numpy(), expected.loc[symbol].to_numpy()):
+                print(f"❌ Bars for {symbol} differ from a resample of the ticks")
+                return False
+        
+        # A catch-up completing more bars than the window scores every new bar once, as a full-history run would
+        from indicators import add_indicators
+        ticks = ticks.sort_values('timestamp', kind='stable')
+        caught_up = TickAggregator('1m', lateness=2.0)
+        replay = BarPipeline(caught_up, window=60)
+        caught_up.add_ticks(ticks['symbol'].to_numpy(), ticks['timestamp'].to_numpy(),
+                            ticks['price'].to_numpy(dtype=float), ticks['size'].to_numpy(dtype=float))
+        caught_up.close_all()
+        expected = set()
+        for symbol in ['AAA', 'BBB', 'CCC']:
+            history = add_indicators(caught_up.history(symbol))
+            signals = replay.compiled.evaluate(history)[replay.strategy.name]
+            expected.update((symbol, date, signal) for date, signal in zip(history.index, signals) if signal is not None)
+        if not expected or len(replay.signals) != len(set(replay.signals)) or set(replay.signals) != expected:
+            print(f"❌ Catch-up signals differ: {len(replay.signals)} emitted, {len(expected)} expected")
+            return False
+        
+        # A tick for a bar that has already completed is dropped
+        late = aggregator.add_ticks(['AAA'], [start], [1.0], [1.0])
+        if late is not None or aggregator.stats['late'] != 1:
+            print("❌ Late tick was not dropped")
+            return False
+        
+        print("✅ Tick aggregator working")
+        print(f"   Bars: {aggregator.stats['bars']}, intraday signals: {len(pipeline.signals)}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Tick aggregator test failed: {e}")
+        return False
+
+def test_subscription_router():
+    """Test routing signals to subscribers and batching per destination"""
+    print("\n📨 Testing subscription router...")
+    
+    try:
+        import pandas as pd
+        from subscriptions import Subscriber, SubscriptionRouter
+        
+        subscribers = [
+            Subscriber('default', 1),
+            Subscriber('it-desk', 2, tickers=['TCS.NS', 'INFY.NS']),
+            Subscriber('energy-buys', 3, tickers=['RELIANCE.NS'], signals=['BUY']),
+            Subscriber('oversold', 4, signals=['BUY'], filters={'RSI': [None, 30]}),
+            Subscriber('it-desk-copy', 2, tickers=['TCS.NS']),
+        ]
+        sent = []
+        router = SubscriptionRouter(subscribers, send=lambda text, chat_id=None, session=None: sent.append(chat_id) or True)
+        
+        def signal(ticker, kind, rsi):
+            row = {'Close': 100.0, 'RSI': rsi, 'SMA20': 99.0, 'SMA50': 98.0}
+            return {'ticker': ticker, 'signal': kind, 'date': pd.Timestamp('2024-01-02'), 'row': row}
+        
+        signals = [signal('TCS.NS', 'BUY', 25.0), signal('RELIANCE.NS', 'SELL', 75.0),
+                   signal('RELIANCE.NS', 'BUY', 40.0), signal('WIPRO.NS', 'BUY', 28.0)]
+        for sig in signals:
+            expected = [s for s in subscribers if s.matches(sig)]
+            if router.match(sig) != expected:
+                print(f"❌ Indexed match differs from a linear scan for {sig['ticker']} {sig['signal']}")
+                return False
+        
+        batches = router.route(signals)
+        expected = {'1': 4, '2': 1, '3': 1, '4': 2}
+        if {chat: len(batch) for chat, batch in batches.items()} != expected:
+            print(f"❌ Unexpected batches: {batches}")
+            return False
+        
+        delivered = router.dispatch(signals)
+        router.close()
+        if sorted(sent) != ['1', '2', '3', '4'] or not all(delivered.values()):
+            print(f"❌ Expected one message per destination, sent to {sent}")
+            return False
+        
+        print("✅ Subscription router working")
+        print(f"   Destinations: {len(delivered)}, messages: {len(sent)}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Subscription router test failed: {e}")
+        return False
+
+def test_resumable_backtest():
+    """Test that a backtest resumed bar by bar matches a full re-run"""
+    print("\n⏯️ Testing resumable backtest...")
+    
+    try:
+        import json
+        from golden import load_fixture
+        from indicators import add_indicators
+        from strategy import generate_signals
+        from backtest import backtest_signals, resume_backtest
+        
+        signals_df = generate_signals(add_indicators(load_fixture('random_walk')))
+        params = {'cost_bps': 12, 'slippage_bps': 5, 'fill_at': 'next_open'}
+        full = backtest_signals(signals_df, **params)
+        
+        state = None
+        bars_processed = 0
+        for end in range(100, len(signals_df) + 1):
+            results, state = resume_backtest(signals_df.iloc[:end], state, **params)
+            state = json.loads(json.dumps(state))
+            bars_processed += state['bars_processed']
+        
+        keys = ['entry_date', 'exit_date', 'entry_price', 'exit_price', 'pnl', 'exit_reason', 'days_held']
+        if [[t[k] for k in keys] for t in results['trades']] != [[t[k] for k in keys] for t in full['trades']]:
+            print("❌ Resumed trades differ from a full re-run")
+            return False
+        if results['net_pnl'] != full['net_pnl']:
+            print("❌ Resumed net P&L differs from a full re-run")
+            return False
+        
+        # Re-adjusting earlier bars rebuilds the backtest even when the last Close is unchanged
+        _, state = resume_backtest(signals_df.iloc[:300], None, **params)
+        adjusted = signals_df.iloc[:301].copy()
+        adjusted.iloc[:299, adjusted.columns.get_loc('Close')] *= 0.5
+        for frame, rebuilt in ((signals_df.iloc[:301], False), (adjusted, True)):
+            _, resumed = resume_backtest(frame, json.loads(json.dumps(state)), **params)
+            if (resumed['bars_processed'] == 301) != rebuilt:
+                print(f"❌ Resume check wrong: {resumed['bars_processed']} bars simulated")
+                return False
+        
+        print("✅ Resumable backtest working")
+        print(f"   Trades: {results['total']}, bars simulated: {bars_processed} over {len(signals_df) - 99} runs")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Resumable backtest test failed: {e}")
+        return False
+
+def test_scheduler():
+    """Test trading-calendar cadences, catch-up, overlap and off-peak handling"""
+    print("\n🕐 Testing scheduler...")
+    
+    try:
+        import asyncio
+        import json
+        import tempfile
+        from datetime import datetime, time
+        from scheduler import Scheduler, Job, Daily, Every, parse_cadence
+        
+        # Friday 2024-03-08 is an exchange holiday, so Thursday's close is followed by Monday
+        scans = Every(15)
+        if scans.occurrences(datetime(2024, 3, 7, 15, 30), datetime(2024, 3, 11, 9, 29)):
+            print("❌ Cadence fired on a weekend or holiday")
+            return False
+        if scans.next_after(datetime(2024, 3, 7, 15, 30)) != datetime(2024, 3, 11, 9, 30):
+            print("❌ Next scan should be Monday 09:30")
+            return False
+        if repr(parse_cadence("at 09:00")) != "at 09:00" or repr(parse_cadence("every 5m")) != "every 5m" or parse_cadence("off"):
+            print("❌ Cadence parsing failed")
+            return False
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/scheduler_state.json"
+            with open(path, 'w') as f:
+                json.dump({'scan': '2024-03-07T15:30:00', 'retrain': '2024-03-07T18:00:00'}, f)
+            now = [datetime(2024, 3, 11, 9, 50)]
+            calls = []
+            scheduler = Scheduler(path, clock=lambda: now[0], max_sleep=0.05)
+            scan = scheduler.add(Job('scan', lambda: calls.append('scan'), scans, priority=0))
+            scheduler.add(Job('retrain', lambda: calls.append('retrain'), Daily(time(9, 40)), priority=5,
+                              lane='background', off_peak=True))
+            
+            # Missed 09:30 and 09:45 scans catch up as one run; the retrain is held until the close
+            if scheduler.collect(now[0]) != ['scan', 'retrain'] or scheduler.stats['coalesced'] != 1:
+                print(f"❌ Catch-up should queue one scan and one retrain, stats {scheduler.stats}")
+                return False
+            job, due = scheduler.next_ready(now[0])
+            if job is not scan or due != datetime(2024, 3, 11, 9, 45) or scheduler.next_ready(now[0]) is not None:
+                print("❌ Only the scan may start during the session")
+                return False
+            
+            # A scan still running at 10:00 and 10:15 gets one follow-up run, never an overlapping one
+            scheduler.start(job)
+            scheduler.collect(datetime(2024, 3, 11, 10, 0))
+            scheduler.collect(datetime(2024, 3, 11, 10, 16))
+            if scheduler.next_ready(datetime(2024, 3, 11, 10, 16)) is not None or scheduler.stats['coalesced'] != 2:
+                print("❌ Overrunning scan should coalesce, not overlap")
+                return False
+            scheduler.finish(job, due, True)
+            
+            # After the close the event loop runs the pending scan and the held retrain
+            now[0] = datetime(2024, 3, 11, 18, 30)
+            asyncio.run(scheduler.run(until=lambda s: s.idle))
+            if sorted(calls) != ['retrain', 'scan']:
+                print(f"❌ Expected one scan and one retrain after the close, ran {calls}")
+                return False
+            with open(path) as f:
+                state = json.load(f)
+            if state != {'scan': '2024-03-11T15:30:00', 'retrain': '2024-03-11T09:40:00'}:
+                print(f"❌ Unexpected saved state {state}")
+                return False
+        
+        # The scans share one group; the retrain stays out of it so it never holds a scan back
+        from main import build_scheduler
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs = build_scheduler(f"{tmp}/state.json").jobs
+        if {jobs[name].group for name in ('pre_open', 'scan', 'eod')} != {'scan'} or jobs['retrain'].group == 'scan' \
+                or jobs['retrain'].lane == jobs['scan'].lane:
+            print(f"❌ Unexpected job groups: {({name: job.group for name, job in jobs.items()})}")
+            return False
+        
+        # Feature-store writes from a scan and a retrain running side by side take turns
+        import threading
+        import time
+        import feature_store
+        from golden import load_fixture
+        from indicators import add_indicators
+        frame = add_indicators(load_fixture('random_walk'))
+        active, peak = [0], [0]
+        compute = feature_store.FeatureStore.compute
+        def tracked(self, df):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            active[0] -= 1
+            return compute(self, df)
+        feature_store.FeatureStore.compute = tracked
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                writers = [threading.Thread(target=feature_store.FeatureStore(tmp).update, args=(ticker, frame))
+                           for ticker in ('A.NS', 'B.NS', 'C.NS')]
+                for writer in writers:
+                    writer.start()
+                for writer in writers:
+                    writer.join()
+                rows = [feature_store.FeatureStore(tmp).training_matrix(t)[1].shape[0] for t in ('A.NS', 'B.NS', 'C.NS')]
+        finally:
+            feature_store.FeatureStore.compute = compute
+        if peak[0] != 1 or len(set(rows)) != 1:
+            print(f"❌ Feature-store writes overlapped: {peak[0]} at once")
+            return False
+        
+        # Signals alerted by one scan are skipped by the next
+        import pandas as pd
+        from subscriptions import AlertLog
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/alerted.json"
+            signal = {'ticker': 'TCS.NS', 'signal': 'BUY', 'date': pd.Timestamp('2024-03-11')}
+            old = dict(signal, date=pd.Timestamp('2023-01-02'))
+            alert_log = AlertLog(path)
+            alert_log.add([signal, old])
+            alert_log.save()
+            reloaded = AlertLog(path)
+            if not reloaded.seen(signal) or reloaded.seen(dict(signal, signal='SELL')) or reloaded.seen(old):
+                print("❌ Alert log should keep recent alerted signals and prune old ones")
+                return False
+        
+        # A signal no destination received stays unalerted and goes out again with the next scan
+        from subscriptions import Subscriber, SubscriptionRouter
+        row = {'Close': 100.0, 'RSI': 25.0, 'SMA20': 99.0, 'SMA50': 98.0}
+        fresh = dict(signal, date=pd.Timestamp('2024-03-12'), row=row)
+        unrouted = dict(fresh, ticker='INFY.NS')
+        up, sent = [False], []
+        def send(text, chat_id=None, session=None):
+            sent.append(chat_id)
+            return up[0]
+        alert_log = AlertLog()
+        for _ in range(3):
+            router = SubscriptionRouter([Subscriber('desk', 5, tickers=['TCS.NS'])], send=send)
+            pending = [s for s in (fresh, unrouted) if not alert_log.seen(s)]
+            alert_log.add(router.delivered_signals(pending, router.dispatch(pending)))
+            up[0] = True
+        if sent != ['5', '5'] or not alert_log.seen(fresh) or not alert_log.seen(unrouted):
+            print(f"❌ Failed alert should be retried once on the next scan, sent {sent}")
+            return False
+        
+        print("✅ Scheduler working")
+        print(f"   Runs: {scheduler.stats['runs']}, coalesced: {scheduler.stats['coalesced']}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Scheduler test failed: {e}")
+        return False
+
+def test_instruments():
+    """Test the symbol master and the multi-instrument series store"""
+    print("\n🧾 Testing instrument model...")
+    
+    try:
+        import os
+        import tempfile
+        from datetime import date
+        import numpy as np
+        from golden import load_fixture
+        from indicators import add_indicators
+        from strategy import generate_signals, RULE_STRATEGY
+        from strategy_engine import Strategy, col, sma, shift, compile_strategies
+        from instruments import SymbolMaster, SeriesStore, CALL, PUT, FUTURE, INDEX, load_symbol_master, save_symbol_master
+        
+        master = SymbolMaster.from_tickers(['TCS.NS', 'INFY.NS'])
+        master.add('NIFTY', INDEX)
+        near, far = date(2024, 3, 28), date(2024, 4, 25)
+        for expiry in (near, far):
+            master.add_future('NIFTY', expiry, lot_size=50)
+            for strike in (21900, 22000, 22100):
+                master.add_option('NIFTY', expiry, strike, CALL, lot_size=50)
+                master.add_option('NIFTY', expiry, strike, PUT, lot_size=50)
+        
+        if master['NIFTY24MAR22000CE'].strike != 22000 or master[3].symbol != 'NIFTY24MARFUT':
+            print("❌ Lookup by symbol or id failed")
+            return False
+        if len(master.for_underlying('NIFTY')) != 15 or len(master.for_underlying('NIFTY', kind=FUTURE)) != 2:
+            print("❌ Lookup by underlying failed")
+            return False
+        if master.expiries('NIFTY') != [near, far] or master.expiries('NIFTY', as_of=date(2024, 4, 1)) != [far]:
+            print("❌ Expiry listing failed")
+            return False
+        chain = master.chain('NIFTY', near)
+        if list(chain.index) != [21900, 22000, 22100] or master[int(chain.loc[22100, PUT])].symbol != 'NIFTY24MAR22100PE':
+            print(f"❌ Unexpected option chain:\n{chain}")
+            return False
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'symbol_master.csv')
+            save_symbol_master(master, path)
+            if not load_symbol_master(path).to_frame().equals(master.to_frame()):
+                print("❌ Symbol master did not round-trip through CSV")
+                return False
+        
+        # Three instruments of different lengths in one store, plus a late correction to one bar
+        df = load_fixture('random_walk')
+        frames = {0: df.iloc[:40], 5: df, 9: df.iloc[100:] * 1.1}
+        store = SeriesStore.from_frames(frames)
+        fixed = df.iloc[[-1]].copy()
+        fixed['Close'] += 1.0
+        store.put(5, fixed)
+        frames[5] = df.copy()
+        frames[5].iloc[-1, frames[5].columns.get_loc('Close')] += 1.0
+        if len(store) != sum(len(f) for f in frames.values()) or list(store.instrument_ids) != [0, 5, 9]:
+            print("❌ Store merge or de-duplication failed")
+            return False
+        
+        store.add_indicators()
+        signals = store.signals(RULE_STRATEGY)[RULE_STRATEGY.name]
+        for instrument_id, frame in frames.items():
+            expected = generate_signals(add_indicators(frame))
+            for column in ('SMA20', 'SMA50', 'RSI', 'MACD', 'MACD_SIGNAL'):
+                if not np.array_equal(store.get(instrument_id, column), expected[column].to_numpy(), equal_nan=True):
+                    print(f"❌ Store {column} differs from add_indicators for instrument {instrument_id}")
+                    return False
+            if list(signals[store.rows(instrument_id)]) != list(expected['signal']):
+                print(f"❌ Store signals differ from generate_signals for instrument {instrument_id}")
+                return False
+        
+        # Look-back ops must not see the previous instrument's rows
+        probe = compile_strategies(Strategy('probe', buy=col('Close') > sma(col('Close'), 3), sell=col('Close') < shift(col('Close'), 2)))
+        grouped = probe.evaluate(store.columns, groups=np.repeat([0, 1, 2], [len(frames[i]) for i in (0, 5, 9)]))['probe']
+        alone = np.concatenate([probe.evaluate(store.frame(i))['probe'] for i in (0, 5, 9)])
+        if list(grouped) != list(alone):
+            print("❌ Grouped evaluation leaked across instruments")
+            return False
+        
+        print("✅ Instrument model working")
+        print(f"   Instruments: {len(master)}, store rows: {len(store)}, {store.nbytes / 1024:.0f} KB")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Instrument model test failed: {e}")
+        return False
+
+def test_streaming_backtest():
+    """Test that chunked streaming signals and backtests match the in-memory run exactly"""
+    print("\n🌊 Testing streaming backtest...")
+    
+    try:
+        import os
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from golden import load_fixture, BACKTESTS
+        from indicators import add_indicators
+        from strategy import generate_signals
+        from backtest import backtest_signals, backtest_stream
+        from streaming import stream_signals, read_ohlcv_chunks, WARMUP_BARS
+        
+        # Minute bars with a few missing closes, so the carried EMA state is exercised too
+        rng = np.random.default_rng(7)
+        close = 500 * np.exp(np.cumsum(rng.normal(0, 0.002, 3000)))
+        minute = pd.DataFrame({'Open': close * (1 + rng.normal(0, 0.0005, 3000)), 'High': close * 1.001,
+                               'Low': close * 0.999, 'Close': close, 'Volume': rng.integers(100, 5000, 3000).astype(float)},
+                              index=pd.date_range('2024-01-01 09:15', periods=3000, freq='min', name='Date'))
+        minute.iloc[[100, 101, 1500], 3] = np.nan
+        
+        for name, df, sizes in (('random_walk', load_fixture('random_walk'), (25, 100)), ('minute', minute, (90, 1000))):
+            expected = generate_signals(add_indicators(df))
+            for size in sizes:
+                chunks = [df.iloc[i:i + size] for i in range(0, len(df), size)]
+                streamed = pd.concat(list(stream_signals(chunks)))
+                for column in ('SMA20', 'SMA50', 'RSI', 'MACD', 'MACD_SIGNAL'):
+                    if not np.array_equal(streamed[column].to_numpy(), expected[column].to_numpy(), equal_nan=True):
+                        print(f"❌ {name}: streamed {column} differs with {size}-bar chunks")
+                        return False
+                if list(streamed['signal']) != list(expected['signal']):
+                    print(f"❌ {name}: streamed signals differ with {size}-bar chunks")
+                    return False
+                for config, params in BACKTESTS.items():
+                    full = backtest_signals(expected, **params)
+                    chunked = backtest_stream(chunks, **params)
+                    if chunked['trades'] != full['trades'] or chunked['net_pnl'] != full['net_pnl']:
+                        print(f"❌ {name}/{config}: streamed backtest differs with {size}-bar chunks")
+                        return False
+        
+        # Reading a CSV in chunks gives the same bars as reading it whole; with holds
+        # measured in bars, memory is bounded by chunk + warm-up + longest hold
+        params = {'hold_in_bars': True, 'max_hold_days': 30}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'minute.csv')
+            minute.to_csv(path)
+            chunked = backtest_stream(read_ohlcv_chunks(path, chunk_bars=250), **params)
+        full = backtest_signals(generate_signals(add_indicators(minute)), **params)
+        if chunked['trades'] != full['trades'] or chunked['bars'] != len(minute):
+            print("❌ Backtest over CSV chunks differs from the in-memory run")
+            return False
+        if chunked['peak_rows'] > 250 + WARMUP_BARS + 31:
+            print(f"❌ Streaming held {chunked['peak_rows']} rows at once")
+            return False
+        
+        print("✅ Streaming backtest working")
+        print(f"   Trades: {chunked['total']}, peak rows held: {chunked['peak_rows']} of {chunked['bars']}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Streaming backtest test failed: {e}")
+        return False
+
+def test_shared_data():
+    """Test worker processes over shared memory, and that segments are cleaned up after crashes"""
+    print("\n🧠 Testing shared-memory data plane...")
+    
+    try:
+        import os
+        import signal
+        import subprocess
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        from multiprocessing import resource_tracker
+        from multiprocessing.shared_memory import SharedMemory
+        import numpy as np
+        from golden import load_fixture
+        from instruments import SeriesStore
+        from strategy import RULE_STRATEGY
+        from shared_data import SegmentRegistry, shared_signals, sweep_stale_segments, SIGNAL_CODES, SEGMENT_PREFIX, SHM_DIR
+        
+        def leftovers():
+            return [name for name in os.listdir(SHM_DIR) if name.startswith(f"{SEGMENT_PREFIX}{os.getpid()}_")]
+        
+        frames = {i: load_fixture(name) for i, name in enumerate(('random_walk', 'crash_rebound', 'flat_then_moves', 'buy_sell_conflict'))}
+        store = SeriesStore.from_frames(frames)
+        results = shared_signals(store, workers=2)
+        
+        expected = SeriesStore.from_frames(frames).add_indicators()
+        codes = np.select([expected.signals(RULE_STRATEGY)[RULE_STRATEGY.name] == label for label in SIGNAL_CODES],
+                          list(SIGNAL_CODES.values()), 0)
+        for column in ('SMA20', 'SMA50', 'RSI', 'MACD', 'MACD_SIGNAL'):
+            if not np.array_equal(results[column], expected.columns[column], equal_nan=True):
+                print(f"❌ Shared-memory {column} differs from the in-process store")
+                return False
+        if not np.array_equal(results['signal'], codes):
+            print("❌ Shared-memory signals differ from the in-process store")
+            return False
+        if leftovers():
+            print(f"❌ Segments left after a clean run: {leftovers()}")
+            return False
+        
+        # A worker killed mid-run fails the call, and the parent still unlinks everything
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            os.kill(pool.submit(os.getpid).result(), signal.SIGKILL)
+            try:
+                shared_signals(store, pool=pool)
+                print("❌ Killed worker went unnoticed")
+                return False
+            except BrokenProcessPool:
+                pass
+        if leftovers():
+            print(f"❌ Segments left after a worker crash: {leftovers()}")
+            return False
+        
+        # A segment whose owner died without cleaning up is swept by the next registry
+        dead = subprocess.Popen(['true'])
+        dead.wait()
+        orphan = SharedMemory(name=f"{SEGMENT_PREFIX}{dead.pid}_test", create=True, size=64)
+        resource_tracker.unregister(orphan._name, 'shared_memory')
+        orphan.close()
+        with SegmentRegistry() as registry:
+            registry.create((8,), float, 0.0)
+            if os.path.exists(os.path.join(SHM_DIR, orphan.name)):
+                print("❌ Stale segment from a dead process was not swept")
+                return False
+        if leftovers() or sweep_stale_segments():
+            print("❌ Registry left segments behind")
+            return False
+        
+        print("✅ Shared-memory data plane working")
+        print(f"   Rows: {len(store)}, signals: {int(np.count_nonzero(results['signal']))}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Shared-memory test failed: {e}")
+        return False
+
+def test_latency_budget():
+    """Test alert path latency traces, percentiles and deferral of slow writes over budget"""
+    print("\n⏱️ Testing alert latency budget...")
+    
+    try:
+        from datetime import datetime
+        import pandas as pd
+        from metrics import Histogram
+        from latency import LatencyTrace, LatencyTracker, DeferredWrites, bar_close_time
+        from subscriptions import signal_text
+        
+        now = [100.0]
+        clock = lambda: now[0]
+        
+        def trace_for(delay):
+            trace = LatencyTrace(clock).mark('start').mark('fetch', now[0] + 0.5)
+            now[0] += delay
+            return trace.mark('indicators').mark('signal')
+        
+        # Writes always wait for the alerts; within budget they then run inline
+        import threading
+        events = []
+        writes = DeferredWrites(budget=10)
+        fresh = trace_for(2.0)
+        writes.submit(fresh, events.append, 'log fresh')
+        if events or len(writes.pending) != 1:
+            print(f"❌ Write ran before the alert: {events}")
+            return False
+        events.append('alert')
+        now[0] += 1.0
+        fresh.mark('alert')
+        if not writes.flush() or events != ['alert', 'log fresh'] or writes.pending:
+            print(f"❌ Write within budget did not run inline after the alert: {events}")
+            return False
+        
+        # Once a signal is over budget the writes run on a background thread
+        release = threading.Event()
+        stale = trace_for(15.0)
+        writes.submit(stale, lambda: release.wait(5) and events.append('log stale'))
+        stale.mark('alert')
+        inline = writes.flush()
+        running = events[-1] != 'log stale'
+        release.set()
+        writes.wait()
+        if inline or not running or events[-1] != 'log stale':
+            print(f"❌ Over-budget writes should run in the background: {events}")
+            return False
+        if [stage for stage, _ in stale.marks] != ['start', 'fetch', 'indicators', 'signal', 'alert', 'log']:
+            print(f"❌ Unexpected stale trace: {stale.marks}")
+            return False
+        if abs(stale.stages()['fetch'] - 0.5) > 1e-9 or abs(stale.total() - 15.0) > 1e-9:
+            print(f"❌ Unexpected stage latencies: {stale.stages()}")
+            return False
+        writes = DeferredWrites(budget=0)
+        writes.submit(trace_for(1e6), events.append, 'never backgrounded')
+        if not writes.flush() or events[-1] != 'never backgrounded':
+            print("❌ A zero budget ran writes in the background")
+            return False
+        
+        histogram = Histogram('test_alert_latency_seconds', 'test')
+        tracker = LatencyTracker(window=3, histogram=histogram)
+        for delay in (1.0, 2.0, 3.0, 4.0):
+            trace = trace_for(delay).mark('alert')
+            tracker.record(trace)
+        stats = tracker.summary()
+        if list(stats)[:4] != ['fetch', 'indicators', 'signal', 'alert'] or stats['indicators']['count'] != 3:
+            print(f"❌ Unexpected summary: {stats}")
+            return False
+        if abs(stats['indicators']['p50'] - 2.5) > 1e-9 or abs(stats['total']['p99'] - 3.98) > 1e-9:
+            print(f"❌ Unexpected percentiles: {stats}")
+            return False
+        if histogram.value(stage='total')['count'] != 4 or tracker.percentiles('log') is not None:
+            print("❌ Histogram or empty-stage percentiles wrong")
+            return False
+        
+        # Daily bars close at 15:30 IST; an alert reports how long after the close it went out
+        bar_close = bar_close_time(pd.Timestamp('2024-03-11'))
+        if bar_close != datetime(2024, 3, 11, 15, 30) or \
+                bar_close_time(pd.Timestamp('2024-03-11 10:15'), '15m') != datetime(2024, 3, 11, 10, 30):
+            print("❌ Unexpected bar close times")
+            return False
+        ticker_trace = LatencyTrace(clock, lambda: datetime(2024, 3, 11, 15, 31)).mark('start')
+        trace = ticker_trace.fork(bar_close)
+        now[0] += 120
+        trace.mark('risk').mark('alert')
+        row = {'Close': 100.0, 'RSI': 25.0, 'SMA20': 99.0, 'SMA50': 98.0}
+        text = signal_text({'ticker': 'TCS.NS', 'signal': 'BUY', 'date': pd.Timestamp('2024-03-11'), 'row': row, 'trace': trace})
+        if trace.bar_age('alert') != 180 or ticker_trace.marks != trace.marks[:1] or \
+                not text.endswith("Bar closed 2024-03-11 15:30 IST, 3m ago"):
+            print(f"❌ Bar age not reported: {trace.bar_age('alert')} / {text!r}")
+            return False
+        tracker.record(trace)
+        if tracker.percentiles('bar_age')['p50'] != 180:
+            print("❌ Bar age percentiles not recorded")
+            return False
+        
+        print("✅ Alert latency budget working")
+        print(f"   Indicators p50/p95: {stats['indicators']['p50']:.2f}s / {stats['indicators']['p95']:.2f}s")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Latency budget test failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🚀 Starting Algo Trading System Tests\n")
@@ -210,7 +1917,31 @@ def main():
         ("Data Fetch", test_data_fetch),
         ("Indicators", test_indicators),
         ("Strategy", test_strategy),
-        ("Telegram", test_telegram)
+        ("Strategy Engine", test_strategy_engine),
+        ("Backtest Fills", test_backtest_fills),
+        ("ML Backtest", test_ml_backtest),
+        ("Batch Predictions", test_batch_predictions),
+        ("Robustness", test_robustness),
+        ("Tuning", test_tuning),
+        ("Telegram", test_telegram),
+        ("Async Fetch", test_async_fetch),
+        ("Metrics Endpoint", test_metrics_endpoint),
+        ("Logging", test_logging),
+        ("Data Quality", test_data_quality),
+        ("Feature Store", test_feature_store),
+        ("Paper Broker", test_paper_broker),
+        ("Risk Covariance", test_risk_covariance),
+        ("Screener", test_screener),
+        ("Reporting", test_reporting),
+        ("Golden Outputs", test_golden_outputs),
+        ("Tick Aggregator", test_tick_aggregator),
+        ("Subscription Router", test_subscription_router),
+        ("Resumable Backtest", test_resumable_backtest),
+        ("Scheduler", test_scheduler),
+        ("Instruments", test_instruments),
+        ("Streaming Backtest", test_streaming_backtest),
+        ("Shared Memory", test_shared_data),
+        ("Latency Budget", test_latency_budget)
     ]
     
     passed = 0